@@ -13,6 +13,10 @@ import os
 import sys
 import time
 
+from deepseek_integration import DeepSeekIntegration
+from generation_options import options_for, GenerationOptions
+from circuit_breaker import CircuitOpenError
+
 class AutoAgentGUI:
     def __init__(self, root):
         self.root = root
@@ -52,7 +56,11 @@ class AutoAgentGUI:
         
         # Initialize Ollama connection
         self.model_name = "deepseek-r1:8b"  # Default model
-        self.ollama_url = "http://localhost:11434/api/generate"
+        # One pooled client serves both the connection check and every chat request
+        self.deepseek = DeepSeekIntegration(self.model_name, check_availability=False)
+        # Follow-up messages continue from Ollama's context instead of resending the conversation
+        self.session = self.deepseek.create_session()
+        self.generation_options = options_for("chat")
         self.is_connected = False
         self.check_ollama_connection()
         
@@ -169,35 +177,33 @@ class AutoAgentGUI:
         """Check if Ollama is running and the model is available"""
         def check():
             try:
-                response = requests.get("http://localhost:11434/api/tags")
-                if response.status_code == 200:
-                    models = response.json().get("models", [])
-                    model_names = [model["name"] for model in models]
-                    
-                    if self.model_name.split(":")[0] in [m.split(":")[0] for m in model_names]:
-                        self.is_connected = True
-                        self.connection_status.config(
-                            text="Connected to DeepSeek R1",
-                            foreground="#A3BE8C"
-                        )
-                    else:
-                        self.add_message("system", f"DeepSeek R1 model not found. Please run 'ollama pull {self.model_name}' in your terminal.")
-                        self.connection_status.config(
-                            text=f"Model {self.model_name} not found",
-                            foreground="#BF616A"
-                        )
+                model_names = self.deepseek.list_models()
+                
+                if self.model_name.split(":")[0] in [m.split(":")[0] for m in model_names]:
+                    self.is_connected = True
+                    self.deepseek.is_available = True
+                    self.connection_status.config(
+                        text="Connected to DeepSeek R1",
+                        foreground="#A3BE8C"
+                    )
                 else:
-                    self.add_message("error", "Failed to connect to Ollama API.")
+                    self.add_message("system", f"DeepSeek R1 model not found. Please run 'ollama pull {self.model_name}' in your terminal.")
                     self.connection_status.config(
-                        text="Failed to connect to Ollama",
+                        text=f"Model {self.model_name} not found",
                         foreground="#BF616A"
                     )
-            except requests.exceptions.ConnectionError:
+            except (requests.exceptions.ConnectionError, CircuitOpenError):
                 self.add_message("error", "Ollama is not running. Please start Ollama and try again.")
                 self.connection_status.config(
                     text="Ollama not running",
                     foreground="#BF616A"
                 )
+            except requests.exceptions.RequestException:
+                self.add_message("error", "Failed to connect to Ollama API.")
+                self.connection_status.config(
+                    text="Failed to connect to Ollama",
+                    foreground="#BF616A"
+                )
         
         # Run the check in a separate thread to avoid blocking the UI
         threading.Thread(target=check, daemon=True).start()
@@ -253,22 +259,13 @@ class AutoAgentGUI:
             return
         
         try:
-            # Prepare the request
-            data = {
-                "model": self.model_name,
-                "prompt": message,
-                "stream": False
-            }
-            
-            # Send the request to Ollama
-            response = requests.post(self.ollama_url, json=data)
+            # Send the request over the shared keep-alive connection
+            ai_response = self.session.send(message, options=self.generation_options)
             
-            if response.status_code == 200:
-                result = response.json()
-                ai_response = result.get("response", "No response received.")
-                self.add_message("assistant", ai_response)
+            if ai_response is not None:
+                self.add_message("assistant", ai_response or "No response received.")
             else:
-                self.add_message("error", f"Failed to get response: {response.status_code}")
+                self.add_message("error", "Failed to get response from DeepSeek R1.")
         except Exception as e:
             self.add_message("error", f"Error processing message: {str(e)}")
 
@@ -291,6 +288,7 @@ class AutoAgentGUI:
         self.chat_display.config(state=tk.NORMAL)
         self.chat_display.delete("1.0", tk.END)
         self.chat_display.config(state=tk.DISABLED)
+        self.session.reset()
         self.add_message("system", "Chat cleared.")
 
     def show_model_settings(self):
@@ -316,14 +314,14 @@ class AutoAgentGUI:
         
         # Temperature setting
         ttk.Label(settings_frame, text="Temperature:").grid(row=1, column=0, sticky=tk.W, pady=5)
-        temp_var = tk.DoubleVar(value=0.7)
+        temp_var = tk.DoubleVar(value=self.generation_options.temperature)
         temp_scale = ttk.Scale(settings_frame, from_=0.1, to=1.0, variable=temp_var, orient=tk.HORIZONTAL)
         temp_scale.grid(row=1, column=1, sticky=tk.W+tk.E, pady=5)
         ttk.Label(settings_frame, textvariable=temp_var).grid(row=1, column=2, sticky=tk.W, pady=5)
         
         # Max tokens setting
         ttk.Label(settings_frame, text="Max Tokens:").grid(row=2, column=0, sticky=tk.W, pady=5)
-        tokens_var = tk.IntVar(value=2048)
+        tokens_var = tk.IntVar(value=self.generation_options.num_predict)
         tokens_entry = ttk.Entry(settings_frame, textvariable=tokens_var)
         tokens_entry.grid(row=2, column=1, sticky=tk.W+tk.E, pady=5)
         
@@ -337,6 +335,12 @@ class AutoAgentGUI:
     def save_model_settings(self, model, temperature, max_tokens, window):
         """Save model settings and close the window"""
         self.model_name = model
+        self.deepseek.model_name = model
+        self.deepseek.is_available = False
+        self.generation_options = self.generation_options.merged(
+            GenerationOptions(temperature=temperature, num_predict=max_tokens)
+        )
+        self.is_connected = False
         self.model_info.config(text=f"Model: {self.model_name}")
         self.add_message("system", f"Model settings updated: {model}, temp={temperature}, max_tokens={max_tokens}")
         window.destroy()
@@ -14,11 +14,16 @@ import subprocess
 import os
 import sys
 import time
-from typing import Dict, List, Any, Optional, Tuple
+from typing import AsyncIterator, Callable, Dict, List, Any, Optional, Tuple
 from dataclasses import dataclass
 from enum import Enum
 import requests
-import ollama
+
+from ollama_async_client import AsyncOllamaClient
+from llm_scheduler import Priority
+from circuit_breaker import CircuitOpenError
+from synthesis_policy import StepDigest, SynthesisPolicy
+from confirmation_broker import ConfirmationBroker, ConsoleConfirmations
 
 # Configure logging
 logging.basicConfig(
@@ -75,12 +80,16 @@ class AutonomousAgent:
     """
     
     def __init__(self, ollama_host="localhost", ollama_port=11434):
-        self.ollama_client = ollama.Client(host=f"http://{ollama_host}:{ollama_port}")
+        self.ollama_client = AsyncOllamaClient(host=f"http://{ollama_host}:{ollama_port}")
         self.model_name = "deepseek-r1:8b"
         self.conversation_history = []
         self.task_history = []
-        self.blackbox_controller = BlackboxController()
+        # Confirmations and Blackbox hand-offs wait here for a front end without blocking the event loop
+        self.confirmations = ConfirmationBroker()
+        self.blackbox_controller = BlackboxController(self.confirmations)
         self.safety_monitor = SafetyMonitor()
+        # Trivial outcomes get a template reply; the rest are summarised by a streamed LLM call
+        self.synthesis_policy = SynthesisPolicy()
         
         # System prompt for DeepSeek R1
         self.system_prompt = """You are an autonomous AI agent named Jarvis. Your role is to:
@@ -124,9 +133,9 @@ Respond in JSON format with this structure:
     "overall_goal": "Summary of what will be accomplished"
 }"""
 
-    async def process_request(self, user_input: str) -> str:
+    async def process_request(self, user_input: str, on_sentence: Optional[Callable[[str], Any]] = None) -> str:
         """
-        Main entry point for processing user requests
+        Main entry point for processing user requests; on_sentence receives the reply as it is synthesized
         """
         logger.info(f"Processing user request: {user_input}")
         
@@ -141,7 +150,7 @@ Respond in JSON format with this structure:
             results = await self.execute_plan(plan)
             
             # Step 3: Synthesize and report results
-            final_result = await self.synthesize_results(user_input, plan, results)
+            final_result = await self.synthesize_results(user_input, plan, results, on_sentence)
             
             # Store in history
             self.conversation_history.append({
@@ -154,6 +163,9 @@ Respond in JSON format with this structure:
             
             return final_result
             
+        except (CircuitOpenError, ConnectionError) as e:
+            logger.warning(f"DeepSeek R1 unavailable: {e}")
+            return "⚠️ DeepSeek R1 is not reachable right now. Please check that Ollama is running and try again shortly."
         except Exception as e:
             logger.error(f"Error processing request: {e}")
             return f"I encountered an error: {str(e)}. Please try again."
@@ -180,22 +192,18 @@ Please analyze this request and create a detailed execution plan.
 """
 
         try:
-            # Get response from DeepSeek R1
-            response = self.ollama_client.chat(
+            # Stream the plan from DeepSeek R1 and stop the generation as soon as its JSON object closes
+            plan_data = await self.ollama_client.chat_json(
                 model=self.model_name,
                 messages=[
                     {"role": "system", "content": self.system_prompt},
                     {"role": "user", "content": prompt}
-                ]
+                ],
+                call_site="planning",
+                priority=Priority.PLANNING
             )
-            
-            # Parse the JSON response
-            response_text = response['message']['content']
-            logger.info(f"DeepSeek R1 response: {response_text}")
-            
-            # Extract JSON from response
-            plan_data = self.extract_json_from_response(response_text)
-            
+            logger.info(f"DeepSeek R1 response: {json.dumps(plan_data)}")
+
             if not plan_data or 'plan' not in plan_data:
                 logger.error("Invalid plan format from DeepSeek R1")
                 return None
@@ -216,6 +224,8 @@ Please analyze this request and create a detailed execution plan.
             logger.info(f"Created execution plan with {len(task_steps)} steps")
             return task_steps
             
+        except (CircuitOpenError, ConnectionError):
+            raise
         except Exception as e:
             logger.error(f"Error creating execution plan: {e}")
             return None
@@ -329,56 +339,34 @@ Please analyze this request and create a detailed execution plan.
                 error=str(e)
             )
 
-    async def synthesize_results(self, user_input: str, plan: List[TaskStep], results: List[ExecutionResult]) -> str:
+    async def synthesize_results(self, user_input: str, plan: List[TaskStep], results: List[ExecutionResult],
+                                 on_sentence: Optional[Callable[[str], Any]] = None) -> str:
         """
-        Use DeepSeek R1 to synthesize the results and create a user-friendly response
+        Create a user-friendly response from the results, using DeepSeek R1 only when a template will not do
         """
-        logger.info("Synthesizing results with DeepSeek R1")
-        
-        # Prepare summary of execution
-        execution_summary = []
-        for i, (step, result) in enumerate(zip(plan, results)):
-            execution_summary.append({
-                "step": step.description,
-                "success": result.success,
-                "output": result.output[:500] if result.output else "",  # Truncate long outputs
-                "error": result.error
-            })
+        steps = [StepDigest(step.description, result.success, result.output or "", result.error)
+                 for step, result in zip(plan, results)]
         
-        synthesis_prompt = f"""
-Based on the user request and execution results, provide a clear, helpful response.
-
-User request: {user_input}
-
-Execution results:
-{json.dumps(execution_summary, indent=2)}
-
-Please provide:
-1. A summary of what was accomplished
-2. Any important outputs or results
-3. Any issues encountered
-4. Next steps if applicable
-
-Be conversational and helpful, like Jarvis from Iron Man.
-"""
-
         try:
-            response = self.ollama_client.chat(
-                model=self.model_name,
-                messages=[
-                    {"role": "system", "content": "You are Jarvis, a helpful AI assistant. Provide clear, conversational responses about task results."},
-                    {"role": "user", "content": synthesis_prompt}
-                ]
-            )
-            
-            return response['message']['content']
-            
+            return await self.synthesis_policy.synthesize(user_input, steps, self.stream_synthesis, on_sentence)
         except Exception as e:
             logger.error(f"Error synthesizing results: {e}")
             # Fallback to simple summary
-            successful_steps = sum(1 for r in results if r.success)
-            total_steps = len(results)
-            return f"Task completed. {successful_steps}/{total_steps} steps executed successfully."
+            return self.synthesis_policy.fallback(steps)
+        finally:
+            logger.info(self.synthesis_policy.report())
+
+    def stream_synthesis(self, messages: List[Dict[str, str]]) -> AsyncIterator[str]:
+        """
+        Stream a DeepSeek R1 synthesis response
+        """
+        logger.info("Synthesizing results with DeepSeek R1")
+        return self.ollama_client.chat_stream(
+            model=self.model_name,
+            messages=messages,
+            call_site="synthesis",
+            priority=Priority.PLANNING
+        )
 
     def build_context(self) -> str:
         """
@@ -397,48 +385,29 @@ Be conversational and helpful, like Jarvis from Iron Man.
         
         return "\n".join(context_parts)
 
-    def extract_json_from_response(self, response_text: str) -> Dict:
-        """
-        Extract JSON from DeepSeek R1 response
-        """
-        try:
-            # Try to find JSON in the response
-            start_idx = response_text.find('{')
-            end_idx = response_text.rfind('}') + 1
-            
-            if start_idx != -1 and end_idx != -1:
-                json_str = response_text[start_idx:end_idx]
-                return json.loads(json_str)
-            else:
-                logger.error("No JSON found in response")
-                return None
-                
-        except json.JSONDecodeError as e:
-            logger.error(f"JSON decode error: {e}")
-            return None
-
     async def request_user_confirmation(self, step: TaskStep) -> bool:
         """
-        Request user confirmation for potentially dangerous operations
+        Request user confirmation for potentially dangerous operations from the attached front ends
         """
-        print(f"\n⚠️  CONFIRMATION REQUIRED ⚠️")
-        print(f"Step: {step.description}")
-        print(f"Safety Level: {step.safety_level.value}")
-        print(f"Code to generate: {step.code_to_generate}")
-        
+        details = [f"Code to generate: {step.code_to_generate}"]
         if step.safety_level == SafetyLevel.DANGEROUS:
-            print("🚨 WARNING: This operation could be dangerous!")
+            details.append("🚨 WARNING: This operation could be dangerous!")
         
-        response = input("Do you want to proceed? (y/n): ").lower().strip()
-        return response in ['y', 'yes']
+        return await self.confirmations.request(
+            f"Step {step.step_id}: {step.description}",
+            details,
+            level=step.safety_level.value
+        )
 
 class BlackboxController:
     """
     Controller for interacting with Blackbox AI to generate code
     """
     
-    def __init__(self):
+    def __init__(self, confirmations: Optional[ConfirmationBroker] = None):
         self.vscode_path = self.find_vscode_path()
+        # The user is told through the broker when generated code is ready
+        self.confirmations = confirmations or ConfirmationBroker()
         
     def find_vscode_path(self) -> str:
         """
@@ -473,14 +442,19 @@ class BlackboxController:
         
         try:
             # Open the file in VS Code (this will trigger Blackbox AI)
-            subprocess.run([self.vscode_path, temp_prompt_file], check=False)
+            await asyncio.to_thread(subprocess.run, [self.vscode_path, temp_prompt_file], check=False)
             
             # Wait for user to generate code with Blackbox AI
-            print(f"\n🤖 BLACKBOX AI CODE GENERATION")
-            print(f"Task: {step.description}")
-            print(f"File opened in VS Code: {temp_prompt_file}")
-            print("Please use Blackbox AI to generate the code, then press Enter to continue...")
-            input()
+            generated = await self.confirmations.request(
+                f"🤖 BLACKBOX AI CODE GENERATION - Task: {step.description}",
+                [f"File opened in VS Code: {temp_prompt_file}",
+                 "Please use Blackbox AI to generate the code, then approve to continue"],
+                level="handoff",
+                timeout=1800
+            )
+            if not generated:
+                logger.error("Blackbox AI code generation was not confirmed")
+                return None
             
             # Read the generated code
             with open(temp_prompt_file, 'r') as f:
@@ -611,15 +585,18 @@ async def main():
     Example usage of the Autonomous Agent
     """
     agent = AutonomousAgent()
+    console = ConsoleConfirmations(agent.confirmations)
     
     print("🤖 Autonomous DeepSeek R1 Agent with Blackbox AI")
     print("=" * 50)
     
     while True:
         try:
-            user_input = input("\nYou: ").strip()
+            user_input = (await console.input("\nYou: ")).strip()
             
             if user_input.lower() in ['quit', 'exit', 'bye']:
+                print(agent.synthesis_policy.report())
+                print(agent.confirmations.report())
                 print("Goodbye!")
                 break
             
@@ -627,10 +604,21 @@ async def main():
                 continue
             
             print("\n🧠 Processing with DeepSeek R1...")
-            result = await agent.process_request(user_input)
-            print(f"\n🤖 Jarvis: {result}")
+            streamed = []
+            
+            def show_sentence(sentence: str):
+                if not streamed:
+                    print("\n🤖 Jarvis: ", end="")
+                streamed.append(sentence)
+                print(sentence, end="", flush=True)
+            
+            result = await agent.process_request(user_input, on_sentence=show_sentence)
+            if streamed:
+                print()
+            else:
+                print(f"\n🤖 Jarvis: {result}")
             
-        except KeyboardInterrupt:
+        except (KeyboardInterrupt, EOFError):
             print("\nGoodbye!")
             break
         except Exception as e:
@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+Circuit Breaker for Ollama
+This module makes calls to Ollama fail fast while it is down: after repeated failures the
+circuit opens and calls are rejected immediately, a cheap health probe and then a single
+trial call decide when to let traffic through again, and idempotent calls get a few
+jittered retries.
+"""
+
+import time
+import random
+import asyncio
+import logging
+import threading
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, Type
+
+import requests
+
+logger = logging.getLogger("CircuitBreaker")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling a service whose circuit is open."""
+
+class CircuitBreaker:
+    """
+    Track failures of a service and reject calls while it is considered down.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 3, reset_timeout: float = 10.0,
+                 probe: Optional[Callable[[], bool]] = None):
+        """
+        Initialize the circuit breaker.
+
+        Args:
+            name (str): Name of the protected service, used in messages.
+            failure_threshold (int, optional): Consecutive failures that open the circuit. Defaults to 3.
+            reset_timeout (float, optional): Seconds the circuit stays open before a probe. Defaults to 10.0.
+            probe (Optional[Callable[[], bool]], optional): Quick health check run before the trial call
+                that closes the circuit again. Defaults to None (only the trial call).
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.probe = probe
+        self.state = CLOSED
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._counters = {"calls": 0, "failures": 0, "rejected": 0, "retries": 0, "opened": 0}
+
+    def allow(self) -> bool:
+        """
+        Check whether a call may proceed.
+
+        Once the reset timeout has passed, exactly one caller is let through as the trial call
+        and every other caller is rejected until its outcome is recorded with record_success()
+        or record_failure(), or the trial is abandoned with release_trial().
+
+        Returns:
+            bool: True if this call is the trial call of a half-open circuit.
+
+        Raises:
+            CircuitOpenError: If the circuit is open, another caller holds the trial, or the health
+                              probe failed.
+        """
+        with self._lock:
+            self._counters["calls"] += 1
+            if self.state == CLOSED:
+                return False
+            if self.state == OPEN and time.monotonic() - self._opened_at < self.reset_timeout:
+                self._counters["rejected"] += 1
+                raise CircuitOpenError(f"{self.name} is unavailable; retrying in "
+                                       f"{self.reset_timeout - (time.monotonic() - self._opened_at):.0f}s")
+            if self._probing:
+                # Another caller is already finding out whether the service is back; the claim
+                # is held until its trial call resolves
+                self._counters["rejected"] += 1
+                raise CircuitOpenError(f"{self.name} is unavailable; health check in progress")
+            self.state = HALF_OPEN
+            self._probing = True
+
+        healthy = True
+        if self.probe is not None:
+            try:
+                healthy = self.probe()
+            except Exception:
+                healthy = False
+        if not healthy:
+            with self._lock:
+                self._open()
+                self._counters["rejected"] += 1
+            raise CircuitOpenError(f"{self.name} is unavailable; health check failed")
+        return True
+
+    def release_trial(self):
+        """
+        Give up the trial call without an outcome, e.g. when it was cancelled, so the next
+        caller can try instead.
+        """
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._probing = False
+
+    def record_success(self):
+        """
+        Record a successful call, closing the circuit.
+        """
+        with self._lock:
+            if self.state != CLOSED:
+                logger.info(f"{self.name} is reachable again; closing circuit")
+            self.state = CLOSED
+            self._failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        """
+        Record a failed call, opening the circuit after enough consecutive failures.
+        """
+        with self._lock:
+            self._failures += 1
+            self._counters["failures"] += 1
+            if self.state == HALF_OPEN or self._failures >= self.failure_threshold:
+                self._open()
+
+    def call(self, fn: Callable[[], Any], retries: int = 0,
+             retry_on: Tuple[Type[BaseException], ...] = (ConnectionError,),
+             base_delay: float = 0.25, max_delay: float = 2.0,
+             failed: Optional[Callable[[Any], bool]] = None,
+             ignore: Tuple[Type[BaseException], ...] = ()) -> Any:
+        """
+        Call fn through the breaker, retrying the given errors with jittered backoff.
+
+        Only use retries for idempotent calls.
+
+        Args:
+            fn (Callable[[], Any]): The call to make.
+            retries (int, optional): Extra attempts after the first. Defaults to 0.
+            retry_on (Tuple[Type[BaseException], ...], optional): Errors worth retrying.
+                                                                 Defaults to (ConnectionError,).
+            base_delay (float, optional): Backoff before the first retry, in seconds. Defaults to 0.25.
+            max_delay (float, optional): Upper bound on any backoff, in seconds. Defaults to 2.0.
+            failed (Optional[Callable[[Any], bool]], optional): Marks a returned value as a failure of
+                the service, e.g. a 5xx response. The value is still returned. Defaults to None.
+            ignore (Tuple[Type[BaseException], ...], optional): Errors that show the service answered,
+                so they do not count as failures. Defaults to ().
+
+        Returns:
+            Any: The result of fn.
+
+        Raises:
+            CircuitOpenError: If the circuit is open.
+        """
+        for attempt in range(retries + 1):
+            trial = self.allow()
+            try:
+                result = fn()
+            except ignore:
+                self.record_success()
+                raise
+            except Exception as e:
+                self.record_failure()
+                if attempt == retries or not isinstance(e, retry_on):
+                    raise
+                self._counters["retries"] += 1
+                time.sleep(_backoff(attempt, base_delay, max_delay))
+                continue
+            except BaseException:
+                if trial:
+                    self.release_trial()
+                raise
+            self._record_result(result, failed)
+            return result
+
+    async def acall(self, fn: Callable[[], Awaitable[Any]], retries: int = 0,
+                    retry_on: Tuple[Type[BaseException], ...] = (ConnectionError,),
+                    base_delay: float = 0.25, max_delay: float = 2.0,
+                    failed: Optional[Callable[[Any], bool]] = None,
+                    ignore: Tuple[Type[BaseException], ...] = ()) -> Any:
+        """
+        Async version of call(); the health probe runs off the event loop.
+
+        Args:
+            fn (Callable[[], Awaitable[Any]]): Returns the coroutine to await.
+            retries (int, optional): Extra attempts after the first. Defaults to 0.
+            retry_on (Tuple[Type[BaseException], ...], optional): Errors worth retrying.
+            base_delay (float, optional): Backoff before the first retry, in seconds. Defaults to 0.25.
+            max_delay (float, optional): Upper bound on any backoff, in seconds. Defaults to 2.0.
+            failed (Optional[Callable[[Any], bool]], optional): See call().
+            ignore (Tuple[Type[BaseException], ...], optional): See call().
+
+        Returns:
+            Any: The result of the coroutine.
+
+        Raises:
+            CircuitOpenError: If the circuit is open.
+        """
+        for attempt in range(retries + 1):
+            trial = await self.aallow()
+            try:
+                result = await fn()
+            except ignore:
+                self.record_success()
+                raise
+            except Exception as e:
+                self.record_failure()
+                if attempt == retries or not isinstance(e, retry_on):
+                    raise
+                self._counters["retries"] += 1
+                await asyncio.sleep(_backoff(attempt, base_delay, max_delay))
+                continue
+            except BaseException:
+                # Cancelled while holding the trial
+                if trial:
+                    self.release_trial()
+                raise
+            self._record_result(result, failed)
+            return result
+
+    async def aallow(self) -> bool:
+        """
+        Async version of allow().
+
+        Returns:
+            bool: True if this call is the trial call of a half-open circuit.
+
+        Raises:
+            CircuitOpenError: If the circuit is open, another caller holds the trial, or the health
+                              probe failed.
+        """
+        if self.state == CLOSED:
+            return self.allow()
+        check = asyncio.ensure_future(asyncio.to_thread(self.allow))
+        try:
+            return await asyncio.shield(check)
+        except asyncio.CancelledError:
+            # The check keeps running in its thread; hand the trial back if it claims one
+            check.add_done_callback(self._release_abandoned_trial)
+            raise
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get the breaker's state and counters.
+
+        Returns:
+            Dict[str, Any]: State, consecutive failures and call counters.
+        """
+        with self._lock:
+            stats = dict(self._counters)
+            stats["state"] = self.state
+            stats["consecutive_failures"] = self._failures
+        return stats
+
+    def _release_abandoned_trial(self, check: asyncio.Future):
+        """Release a trial claimed by a check whose caller was cancelled."""
+        if not check.cancelled() and check.exception() is None and check.result():
+            self.release_trial()
+
+    def _record_result(self, result: Any, failed: Optional[Callable[[Any], bool]]):
+        """Record a returned value as a success, unless failed() says otherwise."""
+        if failed is not None and failed(result):
+            self.record_failure()
+        else:
+            self.record_success()
+
+    def _open(self):
+        """Open the circuit. Called with the lock held."""
+        if self.state != OPEN:
+            logger.warning(f"{self.name} is failing; opening circuit for {self.reset_timeout:.0f}s")
+            self._counters["opened"] += 1
+        self.state = OPEN
+        self._opened_at = time.monotonic()
+        self._probing = False
+
+def _backoff(attempt: int, base_delay: float, max_delay: float) -> float:
+    """Full-jitter exponential backoff."""
+    return random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+
+def http_probe(url: str, timeout: float = 1.0) -> Callable[[], bool]:
+    """
+    Build a health probe that GETs a URL.
+
+    Args:
+        url (str): The URL to check, e.g. Ollama's /api/tags.
+        timeout (float, optional): Seconds to wait for the connection and the response. Defaults to 1.0.
+
+    Returns:
+        Callable[[], bool]: Returns True if the URL answered with a non-5xx status.
+    """
+    def probe() -> bool:
+        try:
+            return requests.get(url, timeout=timeout).status_code < 500
+        except requests.exceptions.RequestException:
+            return False
+    return probe
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+def get_breaker(ollama_host: str) -> CircuitBreaker:
+    """
+    Get the circuit breaker shared by every client of an Ollama host in this process.
+
+    Args:
+        ollama_host (str): The Ollama host URL.
+
+    Returns:
+        CircuitBreaker: The host's breaker, probing /api/tags.
+    """
+    host = ollama_host.rstrip("/")
+    with _breakers_lock:
+        if host not in _breakers:
+            _breakers[host] = CircuitBreaker(f"Ollama at {host}", probe=http_probe(f"{host}/api/tags"))
+        return _breakers[host]
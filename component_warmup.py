@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Component Warm-up
+This module loads slow components (local models, inference managers) on a background thread
+right after start-up, so the first request does not pay for them. Each component has a
+readiness future that only the requests needing it wait on, and a status report shows
+warm-up progress and how long each component took to load.
+"""
+
+import time
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger("ComponentWarmup")
+
+PENDING = "pending"
+LOADING = "loading"
+READY = "ready"
+FAILED = "failed"
+
+@dataclass
+class _Component:
+    loader: Callable[[], Any]
+    future: Future = field(default_factory=Future)
+    state: str = PENDING
+    load_time: Optional[float] = None
+    error: Optional[str] = None
+
+class ComponentWarmup:
+    """
+    Loads registered components one after another on a daemon thread, in registration order.
+    """
+
+    def __init__(self):
+        """
+        Initialize the warm-up with no components.
+        """
+        self._components: Dict[str, _Component] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._started_at: Optional[float] = None
+
+    def add(self, name: str, loader: Callable[[], Any]) -> Future:
+        """
+        Register a component.
+
+        Args:
+            name (str): The component's name.
+            loader (Callable[[], Any]): Builds and returns the component; runs on the warm-up thread.
+
+        Returns:
+            Future: Resolves to the component, or to the loader's exception.
+        """
+        component = _Component(loader)
+        # Mark the future as running so a cancelled waiter cannot cancel the load itself
+        component.future.set_running_or_notify_cancel()
+        with self._lock:
+            if name in self._components:
+                raise ValueError(f"Component already registered: {name}")
+            self._components[name] = component
+        return component.future
+
+    def start(self):
+        """
+        Start loading the registered components in the background.
+        """
+        with self._lock:
+            if self._thread is not None:
+                return
+            if self._started_at is None:
+                self._started_at = time.monotonic()
+            self._thread = threading.Thread(target=self._run, name="ComponentWarmup", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        """Load every component that is still pending."""
+        while True:
+            with self._lock:
+                pending = [(name, component) for name, component in self._components.items()
+                           if component.state == PENDING]
+                if not pending:
+                    # Components added from now on are loaded by the next start()
+                    self._thread = None
+                    return
+            for name, component in pending:
+                self._load(name, component)
+
+    def _load(self, name: str, component: _Component):
+        """Load one component and resolve its future."""
+        component.state = LOADING
+        start = time.monotonic()
+        try:
+            value = component.loader()
+        except Exception as e:
+            component.load_time = time.monotonic() - start
+            component.error = str(e)
+            component.state = FAILED
+            component.future.set_exception(e)
+            logger.error(f"Warm-up of {name} failed after {component.load_time:.1f}s: {e}")
+            return
+        component.load_time = time.monotonic() - start
+        component.state = READY
+        component.future.set_result(value)
+        logger.info(f"{name} warmed up in {component.load_time:.1f}s")
+
+    def future(self, name: str) -> Future:
+        """
+        Get a component's readiness future.
+
+        Args:
+            name (str): The component's name.
+
+        Returns:
+            Future: Resolves to the component once it is loaded.
+        """
+        return self._components[name].future
+
+    def get(self, name: str, timeout: Optional[float] = None) -> Any:
+        """
+        Block until a component is loaded.
+
+        Args:
+            name (str): The component's name.
+            timeout (Optional[float], optional): Seconds to wait. Defaults to None (no limit).
+
+        Returns:
+            Any: The component.
+
+        Raises:
+            Exception: Whatever the component's loader raised.
+        """
+        self.start()
+        return self.future(name).result(timeout)
+
+    async def wait(self, name: str, timeout: Optional[float] = None) -> Any:
+        """
+        Wait for a component to be loaded without blocking the event loop.
+
+        Args:
+            name (str): The component's name.
+            timeout (Optional[float], optional): Seconds to wait. Defaults to None (no limit).
+
+        Returns:
+            Any: The component.
+
+        Raises:
+            Exception: Whatever the component's loader raised.
+        """
+        self.start()
+        return await asyncio.wait_for(asyncio.wrap_future(self.future(name)), timeout)
+
+    def status(self) -> Dict[str, Any]:
+        """
+        Get the warm-up progress.
+
+        Returns:
+            Dict[str, Any]: Counts of ready, failed and total components, whether warm-up is done,
+                            the seconds since it started, and each component's state, load time and error.
+        """
+        with self._lock:
+            components = dict(self._components)
+        states = [component.state for component in components.values()]
+        return {
+            "ready": states.count(READY),
+            "failed": states.count(FAILED),
+            "total": len(states),
+            "done": all(state in (READY, FAILED) for state in states),
+            "elapsed": time.monotonic() - self._started_at if self._started_at is not None else 0.0,
+            "components": {
+                name: {"state": component.state, "load_time": component.load_time, "error": component.error}
+                for name, component in components.items()
+            }
+        }
+
+    def report(self) -> str:
+        """
+        Summarise the warm-up progress in one line.
+
+        Returns:
+            str: Ready count and each component's state or load time.
+        """
+        status = self.status()
+        parts = []
+        for name, component in status["components"].items():
+            if component["state"] == READY:
+                parts.append(f"{name} {component['load_time']:.1f}s")
+            else:
+                parts.append(f"{name} {component['state']}")
+        return f"Warm-up: {status['ready']}/{status['total']} ready ({', '.join(parts)})"
@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+"""
+Asynchronous Confirmation Broker
+This module lets plan steps ask a human for confirmation without blocking the event loop.
+Pending confirmations are published to every attached front end (console, GUI, voice), which
+answer them from any thread; independent steps keep running while a confirmation is pending.
+Confirmations time out, and several pending ones can be approved or denied at once.
+"""
+
+import re
+import time
+import asyncio
+import logging
+import itertools
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+logger = logging.getLogger("ConfirmationBroker")
+
+APPROVED = "approved"
+DENIED = "denied"
+TIMED_OUT = "timed_out"
+UNATTENDED = "unattended"
+
+_APPROVE_WORDS = {"y", "yes", "approve", "ok", "okay", "proceed", "go"}
+_DENY_WORDS = {"n", "no", "deny", "cancel", "skip", "stop"}
+
+@dataclass
+class ConfirmationRequest:
+    """A question waiting for a human decision"""
+    request_id: int
+    title: str
+    details: List[str]
+    level: str
+    timeout: float
+    created_at: float = field(default_factory=time.time)
+    decision: Optional[str] = None
+    decided_at: Optional[float] = None
+    _future: Optional[asyncio.Future] = field(default=None, repr=False)
+    _loop: Optional[asyncio.AbstractEventLoop] = field(default=None, repr=False)
+
+    @property
+    def approved(self) -> bool:
+        return self.decision == APPROVED
+
+    def describe(self) -> str:
+        """
+        Format the request for display.
+
+        Returns:
+            str: The request id, level, title and details on separate lines.
+        """
+        lines = [f"[{self.request_id}] {self.level.upper()}: {self.title}"]
+        lines.extend(f"    {line}" for line in self.details)
+        return "\n".join(lines)
+
+class ConfirmationBroker:
+    """
+    Publishes confirmation requests to attached front ends and collects their decisions.
+    """
+
+    def __init__(self, default_timeout: float = 300.0):
+        """
+        Initialize the broker.
+
+        Args:
+            default_timeout (float, optional): Seconds a request waits for a decision before it is
+                                               denied. Defaults to 300.0.
+        """
+        self.default_timeout = default_timeout
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._pending: Dict[int, ConfirmationRequest] = {}
+        self._front_ends: Dict[int, tuple] = {}
+        self._front_end_ids = itertools.count(1)
+        self._counters = {APPROVED: 0, DENIED: 0, TIMED_OUT: 0, UNATTENDED: 0}
+        self._wait_times: List[float] = []
+
+    def attach(self, on_request: Callable[[ConfirmationRequest], Any],
+               on_resolved: Optional[Callable[[ConfirmationRequest], Any]] = None) -> int:
+        """
+        Attach a front end.
+
+        Args:
+            on_request (Callable[[ConfirmationRequest], Any]): Called on the event loop with each new request,
+                including requests already pending when the front end attaches.
+            on_resolved (Optional[Callable[[ConfirmationRequest], Any]], optional): Called once a request has
+                been decided or timed out. Defaults to None.
+
+        Returns:
+            int: Handle for detach().
+        """
+        with self._lock:
+            handle = next(self._front_end_ids)
+            self._front_ends[handle] = (on_request, on_resolved)
+            pending = list(self._pending.values())
+        for request in pending:
+            self._notify(on_request, request)
+        return handle
+
+    def detach(self, handle: int):
+        """
+        Detach a front end.
+
+        Args:
+            handle (int): The handle returned by attach().
+        """
+        with self._lock:
+            self._front_ends.pop(handle, None)
+
+    async def request(self, title: str, details: Iterable[str] = (), level: str = "yellow",
+                      timeout: Optional[float] = None) -> bool:
+        """
+        Ask the attached front ends for a decision and wait for it without blocking the event loop.
+
+        Args:
+            title (str): What is being confirmed.
+            details (Iterable[str], optional): Extra lines shown with the request. Defaults to ().
+            level (str, optional): Safety level shown with the request. Defaults to "yellow".
+            timeout (Optional[float], optional): Seconds to wait before denying. Defaults to the broker's
+                                                 default_timeout.
+
+        Returns:
+            bool: True if a front end approved the request; False if it was denied, timed out or no
+                  front end is attached.
+        """
+        loop = asyncio.get_running_loop()
+        request = ConfirmationRequest(next(self._ids), title, list(details), level,
+                                      self.default_timeout if timeout is None else timeout,
+                                      _future=loop.create_future(), _loop=loop)
+        with self._lock:
+            front_ends = list(self._front_ends.values())
+            if front_ends:
+                self._pending[request.request_id] = request
+        if not front_ends:
+            logger.warning(f"No front end attached to confirm: {title}")
+            self._finish(request, UNATTENDED)
+            return False
+
+        logger.info(f"Waiting for confirmation {request.request_id}: {title}")
+        for on_request, _ in front_ends:
+            self._notify(on_request, request)
+        try:
+            await asyncio.wait_for(asyncio.shield(request._future), request.timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Confirmation {request.request_id} timed out after {request.timeout:.0f}s")
+            self._decide(request, TIMED_OUT)
+        except asyncio.CancelledError:
+            self._decide(request, DENIED)
+            raise
+        return request.approved
+
+    def _notify(self, callback: Callable[[ConfirmationRequest], Any], request: ConfirmationRequest):
+        """Call a front end without letting its errors reach the step."""
+        try:
+            callback(request)
+        except Exception as e:
+            logger.error(f"Confirmation front end failed: {e}")
+
+    def _decide(self, request: ConfirmationRequest, decision: str) -> bool:
+        """Record a decision on the event loop; the first decision wins."""
+        with self._lock:
+            if self._pending.pop(request.request_id, None) is None:
+                return False
+        self._finish(request, decision)
+        if not request._future.done():
+            request._future.set_result(decision)
+        with self._lock:
+            front_ends = list(self._front_ends.values())
+        for _, on_resolved in front_ends:
+            if on_resolved is not None:
+                self._notify(on_resolved, request)
+        return True
+
+    def _finish(self, request: ConfirmationRequest, decision: str):
+        request.decision = decision
+        request.decided_at = time.time()
+        with self._lock:
+            self._counters[decision] += 1
+            if decision in (APPROVED, DENIED):
+                self._wait_times = (self._wait_times + [request.decided_at - request.created_at])[-1000:]
+        logger.info(f"Confirmation {request.request_id} {decision}: {request.title}")
+
+    def resolve(self, request_id: int, approved: bool) -> bool:
+        """
+        Decide a pending request. Safe to call from any thread.
+
+        Args:
+            request_id (int): The request to decide.
+            approved (bool): Whether to approve it.
+
+        Returns:
+            bool: False if no such request is pending.
+        """
+        with self._lock:
+            request = self._pending.get(request_id)
+        if request is None:
+            return False
+        decision = APPROVED if approved else DENIED
+        try:
+            on_loop = asyncio.get_running_loop() is request._loop
+        except RuntimeError:
+            on_loop = False
+        if on_loop:
+            return self._decide(request, decision)
+        request._loop.call_soon_threadsafe(self._decide, request, decision)
+        return True
+
+    def resolve_many(self, approved: bool, request_ids: Optional[Iterable[int]] = None) -> List[int]:
+        """
+        Decide several pending requests at once. Safe to call from any thread.
+
+        Args:
+            approved (bool): Whether to approve them.
+            request_ids (Optional[Iterable[int]], optional): The requests to decide. Defaults to every
+                                                             pending request.
+
+        Returns:
+            List[int]: The ids that were pending and are now decided.
+        """
+        if request_ids is None:
+            request_ids = [request.request_id for request in self.pending()]
+        return [request_id for request_id in request_ids if self.resolve(request_id, approved)]
+
+    def answer(self, text: str) -> Optional[List[int]]:
+        """
+        Decide pending requests from a typed or spoken answer: "yes" or "no" decides the oldest pending
+        request, "yes all" every pending request, and "yes 2 5" the listed requests.
+
+        Args:
+            text (str): The answer.
+
+        Returns:
+            Optional[List[int]]: The ids that were decided, or None if the text is not an answer.
+        """
+        words = re.sub(r"[^a-z0-9 ]+", " ", text.lower()).split()
+        if not words or words[0] not in _APPROVE_WORDS | _DENY_WORDS:
+            return None
+        approved = words[0] in _APPROVE_WORDS
+        rest = [word for word in words[1:] if word not in {"to", "the", "them", "everything"}]
+        if not rest:
+            pending = self.pending()
+            return self.resolve_many(approved, [pending[0].request_id] if pending else [])
+        if rest == ["all"]:
+            return self.resolve_many(approved)
+        if all(word.isdigit() for word in rest):
+            return self.resolve_many(approved, [int(word) for word in rest])
+        return None
+
+    def pending(self) -> List[ConfirmationRequest]:
+        """
+        Get the requests waiting for a decision.
+
+        Returns:
+            List[ConfirmationRequest]: Pending requests, oldest first.
+        """
+        with self._lock:
+            return sorted(self._pending.values(), key=lambda request: request.request_id)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get the confirmation counters.
+
+        Returns:
+            Dict[str, Any]: Counts per decision, the number pending and the average time to a human decision.
+        """
+        with self._lock:
+            stats = dict(self._counters)
+            stats["pending"] = len(self._pending)
+            wait_times = list(self._wait_times)
+        stats["avg_wait"] = sum(wait_times) / len(wait_times) if wait_times else None
+        return stats
+
+    def report(self) -> str:
+        """
+        Summarise confirmations in one line.
+
+        Returns:
+            str: Counts per decision and the average wait for a decision.
+        """
+        stats = self.stats()
+        wait = f", avg {stats['avg_wait']:.1f}s to decide" if stats["avg_wait"] is not None else ""
+        return (f"Confirmations: {stats[APPROVED]} approved, {stats[DENIED]} denied, "
+                f"{stats[TIMED_OUT]} timed out{wait}")
+
+class ConsoleConfirmations:
+    """
+    Console front end. A single thread reads stdin: while confirmations are pending, lines answer
+    them; otherwise they are handed to the caller of input().
+    """
+
+    HELP = "Answer with y/n (oldest), 'y all' / 'n all', or 'y <id> ...' / 'n <id> ...'"
+
+    def __init__(self, broker: ConfirmationBroker):
+        """
+        Attach the console to a broker.
+
+        Args:
+            broker (ConfirmationBroker): The broker to answer.
+        """
+        self.broker = broker
+        self._lines: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._handle = broker.attach(self.show_request, self.show_resolution)
+
+    def show_request(self, request: ConfirmationRequest):
+        """Print a new confirmation request."""
+        print(f"\n⚠️  JARVIS CONFIRMATION REQUIRED ⚠️\n{request.describe()}")
+        print(f"({self.HELP}; denied after {request.timeout:.0f}s)")
+
+    def show_resolution(self, request: ConfirmationRequest):
+        """Print how a request was decided when nobody typed the answer."""
+        if request.decision == TIMED_OUT:
+            print(f"\n⏱️  Confirmation [{request.request_id}] timed out: {request.title}")
+
+    async def input(self, prompt: str = "") -> str:
+        """
+        Read the next line that is not a confirmation answer.
+
+        Args:
+            prompt (str, optional): Printed before waiting. Defaults to "".
+
+        Returns:
+            str: The line.
+
+        Raises:
+            EOFError: If stdin is closed.
+        """
+        self._start()
+        print(prompt, end="", flush=True)
+        line = await self._lines.get()
+        if line is None:
+            raise EOFError("stdin closed")
+        return line
+
+    def close(self):
+        """
+        Detach from the broker.
+        """
+        self.broker.detach(self._handle)
+
+    def _start(self):
+        """Start the stdin reader on first use."""
+        if self._thread is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._lines = asyncio.Queue()
+        self._thread = threading.Thread(target=self._read, name="ConsoleConfirmations", daemon=True)
+        self._thread.start()
+
+    def _read(self):
+        """Read stdin until it closes."""
+        while True:
+            try:
+                line = input()
+            except (EOFError, OSError):
+                self._loop.call_soon_threadsafe(self._lines.put_nowait, None)
+                return
+            if self.broker.pending():
+                decided = self.broker.answer(line)
+                if decided is None:
+                    print(self.HELP)
+                elif decided:
+                    print(f"✅ Answered confirmation {', '.join(map(str, decided))}")
+                else:
+                    print("No matching confirmation is pending")
+                continue
+            self._loop.call_soon_threadsafe(self._lines.put_nowait, line)
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Context Window Manager
+This module keeps the messages sent to DeepSeek R1 inside a token budget: the system prompt
+and the most recent turns are sent verbatim, and older turns are folded into a rolling
+summary that is produced in the background. Summarizing starts before the budget is full,
+so turns being folded are still sent while the summary is produced.
+"""
+
+import logging
+import threading
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger("ContextWindow")
+
+# Rough per-message cost of the chat template around the content
+MESSAGE_OVERHEAD_TOKENS = 4
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the number of tokens in a piece of text.
+
+    Uses the common approximation of four characters per token, which is close enough for
+    budgeting without loading the model's tokenizer.
+
+    Args:
+        text (str): The text to measure.
+
+    Returns:
+        int: Estimated number of tokens.
+    """
+    return (len(text) + 3) // 4
+
+def estimate_message_tokens(message: Dict[str, str]) -> int:
+    """
+    Estimate the number of tokens a chat message takes in the prompt.
+
+    Args:
+        message (Dict[str, str]): A message with 'role' and 'content' keys.
+
+    Returns:
+        int: Estimated number of tokens, including the template overhead.
+    """
+    return estimate_tokens(message.get("content", "")) + MESSAGE_OVERHEAD_TOKENS
+
+class ContextWindowManager:
+    """
+    Select the messages to send for a conversation so the prompt stays within a token budget.
+    """
+
+    def __init__(self, summarize: Callable[[str, List[Dict[str, str]]], Optional[str]],
+                 max_tokens: int = 3072, keep_tokens: Optional[int] = None):
+        """
+        Initialize the context window manager.
+
+        Args:
+            summarize (Callable[[str, List[Dict[str, str]]], Optional[str]]): Folds messages into the
+                previous summary and returns the new summary, or None on failure. Called from a
+                background thread.
+            max_tokens (int, optional): Token budget for the prompt, which should leave room for the
+                                        reply within the model's num_ctx. Defaults to 3072.
+            keep_tokens (Optional[int], optional): Once the prompt grows past this many tokens, the older
+                                                   turns are folded into the summary; they are still sent,
+                                                   within max_tokens, until the summary is ready.
+                                                   Defaults to three quarters of max_tokens.
+        """
+        self.summarize = summarize
+        self.max_tokens = max_tokens
+        self.keep_tokens = max_tokens * 3 // 4 if keep_tokens is None else min(keep_tokens, max_tokens)
+        self.summary = ""
+        self.last_prompt_tokens = 0
+        self._summarized_upto = 0  # history index of the first message not yet in the summary
+        self._lock = threading.Lock()
+        self._summarizing = False
+        self._generation = 0
+
+    def reset(self):
+        """
+        Forget the rolling summary, e.g. when the conversation is reset.
+        """
+        with self._lock:
+            self.summary = ""
+            self._summarized_upto = 0
+            self.last_prompt_tokens = 0
+            self._generation += 1
+
+    def build(self, history: List[Dict[str, str]]) -> List[Dict[str, str]]:
+        """
+        Build the messages to send for a conversation.
+
+        Args:
+            history (List[Dict[str, str]]): The full conversation, optionally starting with the system prompt.
+
+        Returns:
+            List[Dict[str, str]]: The system prompt if there is one, the rolling summary if there is one,
+                                  and the most recent messages that fit in the budget.
+        """
+        if not history:
+            return []
+
+        with self._lock:
+            summary = self.summary
+            summarized_upto = self._summarized_upto
+
+        first = 1 if history[0].get("role") == "system" else 0
+        head = history[:first]
+        if summary:
+            head.append({"role": "system", "content": f"Summary of the earlier conversation:\n{summary}"})
+        used = sum(estimate_message_tokens(message) for message in head)
+        summarized_upto = max(first, summarized_upto)
+
+        # Walk back from the newest message; the latest one is always sent. Messages that are not
+        # in the summary yet, including any being summarized right now, are sent while they fit.
+        start = len(history)
+        keep_start = None
+        while start > summarized_upto:
+            cost = estimate_message_tokens(history[start - 1])
+            if start < len(history) and used + cost > self.max_tokens:
+                break
+            if keep_start is None and start < len(history) and used + cost > self.keep_tokens:
+                keep_start = start
+            used += cost
+            start -= 1
+        if keep_start is None:
+            keep_start = start
+
+        # Fold everything older than the kept turns into the summary ahead of time
+        if keep_start > summarized_upto:
+            self._schedule_summary(summary, history[summarized_upto:keep_start], keep_start)
+
+        self.last_prompt_tokens = used
+        return head + history[start:]
+
+    def _schedule_summary(self, previous: str, messages: List[Dict[str, str]], end: int):
+        """Fold messages that fell out of the window into the summary in the background."""
+        with self._lock:
+            if self._summarizing:
+                return
+            self._summarizing = True
+            generation = self._generation
+
+        def run():
+            try:
+                summary = self.summarize(previous, list(messages))
+                if summary:
+                    with self._lock:
+                        # Skip the result if the conversation was reset meanwhile
+                        if self._generation == generation:
+                            self.summary = summary.strip()
+                            self._summarized_upto = end
+            except Exception as e:
+                logger.warning(f"Failed to summarize conversation: {e}")
+            finally:
+                with self._lock:
+                    self._summarizing = False
+
+        threading.Thread(target=run, daemon=True).start()
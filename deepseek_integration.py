@@ -7,19 +7,93 @@ This script provides functions to interact with DeepSeek R1 through Ollama.
 import os
 import sys
 import json
+import asyncio
 import requests
+from requests.adapters import HTTPAdapter
 import time
 import threading
-from typing import Dict, List, Optional, Union, Callable, Generator
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Union, Callable, Generator, Iterator, AsyncGenerator
+
+from llm_cache import ResponseCache
+from single_flight import SingleFlight, request_key
+from llm_scheduler import LLMScheduler, Priority, RequestCancelled, get_default_scheduler
+from model_residency import cached_availability, invalidate_availability
+from context_window import ContextWindowManager
+from generation_options import GenerationOptions, options_for, prompt_budget
+from ndjson_stream import iter_ndjson, batch_tokens
+from circuit_breaker import CircuitOpenError, get_breaker
+from llm_metrics import MetricsRegistry, get_default_registry
+from reasoning_filter import ReasoningFilter, strip_reasoning
+from streaming_json import first_json_object
+from llm_router import CHAT, LLMRouter, NoBackendAvailable, create_default_router
+
+@dataclass
+class BatchResult:
+    """
+    Results of generate_many/chat_many, in the order of the inputs.
+    
+    A failed item's result is None and its error is recorded under its index.
+    """
+    results: List[Any]
+    errors: Dict[int, str] = field(default_factory=dict)
+    tokens: int = 0
+    elapsed: float = 0.0
+    
+    @property
+    def succeeded(self) -> int:
+        """Number of items that produced a result."""
+        return len(self.results) - len(self.errors)
+    
+    @property
+    def tokens_per_second(self) -> float:
+        """Aggregate generation throughput over the wall-clock time of the batch."""
+        return self.tokens / self.elapsed if self.elapsed > 0 else 0.0
 
 class DeepSeekIntegration:
-    def __init__(self, model_name: str = "deepseek-r1:8b", ollama_host: str = "http://localhost:11434"):
+    def __init__(self, model_name: str = "deepseek-r1:8b", ollama_host: str = "http://localhost:11434",
+                 pool_size: int = 4, connect_timeout: float = 5.0, read_timeout: float = 300.0,
+                 check_availability: bool = True, cache: Optional[ResponseCache] = None,
+                 coalesce: bool = True, scheduler: Optional[LLMScheduler] = None,
+                 availability_ttl: float = 30.0, default_options: Optional[GenerationOptions] = None,
+                 stream_flush_interval: float = 0.05, retries: int = 2,
+                 metrics: Optional[MetricsRegistry] = None, show_reasoning: bool = False,
+                 reasoning_sink: Optional[Callable[[str], None]] = None):
         """
         Initialize the DeepSeek R1 integration.
         
         Args:
             model_name (str, optional): The name of the DeepSeek model to use. Defaults to "deepseek-r1:8b".
             ollama_host (str, optional): The Ollama host URL. Defaults to "http://localhost:11434".
+            pool_size (int, optional): Maximum number of keep-alive connections kept open to Ollama.
+                                       Defaults to 4.
+            connect_timeout (float, optional): Seconds to wait for a TCP connection. Defaults to 5.0.
+            read_timeout (float, optional): Seconds to wait between bytes of a response. Defaults to 300.0,
+                                            which leaves room for a cold model load.
+            check_availability (bool, optional): Whether to query Ollama for the model on construction.
+                                                 Defaults to True.
+            cache (Optional[ResponseCache], optional): Response cache for generate/chat. Defaults to None
+                                                       (caching disabled).
+            coalesce (bool, optional): Whether concurrent identical requests share one generation.
+                                       Defaults to True.
+            scheduler (Optional[LLMScheduler], optional): Scheduler that orders and limits requests to
+                                                          Ollama. Defaults to the process-wide scheduler.
+            availability_ttl (float, optional): Seconds an availability check is reused, and the minimum
+                                                time between pull attempts. Defaults to 30.0.
+            default_options (Optional[GenerationOptions], optional): Options for calls that do not name a
+                                                                     call site. Defaults to the "chat" budget.
+            stream_flush_interval (float, optional): Seconds over which streamed tokens are batched into one
+                                                     chunk; 0 yields every token. Defaults to 0.05.
+            retries (int, optional): Extra attempts for a non-streaming request that could not connect.
+                                     Defaults to 2.
+            metrics (Optional[MetricsRegistry], optional): Registry that receives per-call latency and
+                                                           throughput. Defaults to the process-wide registry.
+            show_reasoning (bool, optional): Keep the model's <think> blocks in returned and streamed text.
+                                             Defaults to False.
+            reasoning_sink (Optional[Callable[[str], None]], optional): Receives the reasoning text that is
+                                                                        filtered out, e.g. for debugging.
+                                                                        Defaults to None.
         """
         self.model_name = model_name
         self.ollama_host = ollama_host.rstrip("/")
@@ -27,8 +101,125 @@ class DeepSeekIntegration:
         self.chat_url = f"{self.ollama_host}/api/chat"
         self.models_url = f"{self.ollama_host}/api/tags"
         
+        # Pooled keep-alive transport shared by every call made through this instance
+        self.timeout = (connect_timeout, read_timeout)
+        self.session = self._create_session(pool_size)
+        self.cache = cache
+        self.single_flight = SingleFlight() if coalesce else None
+        self.scheduler = scheduler or get_default_scheduler()
+        self.availability_ttl = availability_ttl
+        self.default_options = default_options or options_for("chat")
+        self.stream_flush_interval = stream_flush_interval
+        # Shared by every client of this host, so one outage is detected once
+        self.breaker = get_breaker(self.ollama_host)
+        self.retries = retries
+        self.metrics = metrics or get_default_registry()
+        self.show_reasoning = show_reasoning
+        self.reasoning_sink = reasoning_sink
+        # Time of the last request made on the user's behalf; background requests such as
+        # keep_alive refreshes do not count
+        self.last_used = time.monotonic()
+        self._last_pull_attempt = None
+        
         # Check if Ollama is running and the model is available
-        self.is_available = self._check_model_availability()
+        self.is_available = self.refresh_availability() if check_availability else False
+    
+    def _create_session(self, pool_size: int) -> requests.Session:
+        """
+        Create the HTTP session used to talk to Ollama.
+        
+        Args:
+            pool_size (int): Maximum number of connections kept alive in the pool.
+        
+        Returns:
+            requests.Session: A session whose connections are reused across requests.
+        """
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+    
+    def create_session(self, system_prompt: Optional[str] = None) -> "GenerationSession":
+        """
+        Start a multi-turn generate session that reuses Ollama's returned context.
+        
+        Args:
+            system_prompt (Optional[str], optional): System prompt for the conversation. Defaults to None.
+        
+        Returns:
+            GenerationSession: The new session.
+        """
+        return GenerationSession(self, system_prompt)
+    
+    def close(self):
+        """
+        Close the pooled connections to Ollama.
+        """
+        self.session.close()
+    
+    def list_models(self) -> List[str]:
+        """
+        List the models installed in Ollama.
+        
+        Returns:
+            List[str]: Names of the installed models.
+        
+        Raises:
+            requests.exceptions.RequestException: If Ollama cannot be reached or returns an error.
+            CircuitOpenError: If Ollama has been failing and is not being called.
+        """
+        response = self.breaker.call(
+            lambda: self.session.get(self.models_url, timeout=self.timeout),
+            retries=self.retries,
+            retry_on=(requests.exceptions.ConnectionError,),
+            failed=lambda response: response.status_code >= 500
+        )
+        response.raise_for_status()
+        models = response.json().get("models", [])
+        return [model["name"] for model in models]
+    
+    def _post(self, url: str, data: Dict, stream: bool = False, timeout=None) -> requests.Response:
+        """
+        POST to Ollama through the circuit breaker.
+        
+        Connection failures are retried with jittered backoff unless the response is streamed;
+        5xx responses count against the breaker but are still returned.
+        
+        Args:
+            url (str): The endpoint to call.
+            data (Dict): The request body.
+            stream (bool, optional): Whether to stream the response body. Defaults to False.
+            timeout (optional): Overrides the (connect, read) timeout. Defaults to None.
+        
+        Returns:
+            requests.Response: The response.
+        
+        Raises:
+            CircuitOpenError: If Ollama has been failing and is not being called.
+            requests.exceptions.RequestException: If the request failed.
+        """
+        return self.breaker.call(
+            lambda: self.session.post(url, json=data, stream=stream, timeout=timeout or self.timeout),
+            retries=0 if stream else self.retries,
+            retry_on=(requests.exceptions.ConnectionError,),
+            failed=lambda response: response.status_code >= 500
+        )
+    
+    def visible_text(self, text: str, show_reasoning: Optional[bool] = None) -> str:
+        """
+        Remove the model's reasoning from a response unless it should be shown.
+        
+        Args:
+            text (str): The response text.
+            show_reasoning (Optional[bool], optional): Overrides the instance setting. Defaults to None.
+        
+        Returns:
+            str: The text to show, speak and store.
+        """
+        if self.show_reasoning if show_reasoning is None else show_reasoning:
+            return text
+        return strip_reasoning(text, self.reasoning_sink)
     
     def _check_model_availability(self) -> bool:
         """
@@ -38,29 +229,60 @@ class DeepSeekIntegration:
             bool: True if the model is available, False otherwise.
         """
         try:
-            response = requests.get(self.models_url)
-            if response.status_code == 200:
-                models = response.json().get("models", [])
-                model_names = [model["name"] for model in models]
-                
-                # Check if the model is available (exact match or prefix match)
-                model_prefix = self.model_name.split(":")[0]
-                for name in model_names:
-                    if name == self.model_name or name.startswith(f"{model_prefix}:"):
-                        return True
-                
-                print(f"Model {self.model_name} not found. Available models: {', '.join(model_names)}")
-                return False
-            else:
-                print(f"Failed to get models list: {response.status_code}")
-                return False
-        except requests.exceptions.ConnectionError:
+            model_names = self.list_models()
+            
+            # Check if the model is available (exact match or prefix match)
+            model_prefix = self.model_name.split(":")[0]
+            for name in model_names:
+                if name == self.model_name or name.startswith(f"{model_prefix}:"):
+                    return True
+            
+            print(f"Model {self.model_name} not found. Available models: {', '.join(model_names)}")
+            return False
+        except requests.exceptions.HTTPError as e:
+            print(f"Failed to get models list: {e.response.status_code}")
+            return False
+        except (requests.exceptions.ConnectionError, CircuitOpenError):
             print("Ollama is not running. Please start Ollama and try again.")
             return False
         except Exception as e:
             print(f"Error checking model availability: {e}")
             return False
     
+    def refresh_availability(self, force: bool = False) -> bool:
+        """
+        Check if the model is available, reusing a check made within availability_ttl seconds.
+        
+        Args:
+            force (bool, optional): Ignore any cached result. Defaults to False.
+        
+        Returns:
+            bool: True if the model is available, False otherwise.
+        """
+        if force:
+            invalidate_availability(self.ollama_host, self.model_name)
+        return cached_availability(self.ollama_host, self.model_name,
+                                   self._check_model_availability, self.availability_ttl)
+    
+    def ensure_available(self) -> bool:
+        """
+        Make sure the model is available, pulling it at most once per availability_ttl seconds.
+        
+        Returns:
+            bool: True if the model is available, False otherwise.
+        """
+        if self.is_available:
+            return True
+        self.is_available = self.refresh_availability()
+        if self.is_available:
+            return True
+        
+        now = time.monotonic()
+        if self._last_pull_attempt is not None and now - self._last_pull_attempt < self.availability_ttl:
+            return False
+        self._last_pull_attempt = now
+        return self.pull_model()
+    
     def pull_model(self) -> bool:
         """
         Pull the specified model if it's not already available.
@@ -73,13 +295,16 @@ class DeepSeekIntegration:
         
         try:
             print(f"Pulling model {self.model_name}...")
-            response = requests.post(
+            # Pulling can take minutes, so only the connect phase is bounded
+            response = self._post(
                 f"{self.ollama_host}/api/pull",
-                json={"name": self.model_name}
+                {"name": self.model_name, "stream": False},
+                timeout=(self.timeout[0], None)
             )
             
             if response.status_code == 200:
                 print(f"Model {self.model_name} pulled successfully.")
+                invalidate_availability(self.ollama_host, self.model_name)
                 self.is_available = True
                 return True
             else:
@@ -89,6 +314,77 @@ class DeepSeekIntegration:
             print(f"Error pulling model: {e}")
             return False
     
+    def resolve_options(self, kwargs: Dict) -> GenerationOptions:
+        """
+        Work out the generation options for a call.
+        
+        The call site's defaults (or default_options) are overlaid with an explicit options
+        object and then with loose keyword arguments such as temperature or max_tokens.
+        
+        Args:
+            kwargs (Dict): Parameters passed by the caller.
+        
+        Returns:
+            GenerationOptions: The options to send.
+        """
+        call_site = kwargs.get("call_site")
+        options = options_for(call_site) if call_site else self.default_options
+        return options.merged(kwargs.get("options")).merged(GenerationOptions.from_kwargs(kwargs))
+    
+    def _apply_options(self, data: Dict, kwargs: Dict) -> Dict:
+        """
+        Add the generation options and the other supported request fields from kwargs to a request body.
+        
+        Args:
+            data (Dict): The request body to update.
+            kwargs (Dict): Parameters passed by the caller.
+        
+        Returns:
+            Dict: The updated request body.
+        """
+        data.update(self.resolve_options(kwargs).to_request())
+        for key in ("system", "context"):
+            if key in kwargs:
+                data[key] = kwargs[key]
+        return data
+    
+    def _pop_schedule(self, kwargs: Dict) -> Dict:
+        """
+        Remove the scheduling parameters from kwargs.
+        
+        Args:
+            kwargs (Dict): Parameters passed by the caller.
+        
+        Returns:
+            Dict: Keyword arguments for LLMScheduler.slot().
+        """
+        return {
+            "priority": kwargs.pop("priority", Priority.INTERACTIVE),
+            "session": kwargs.pop("session", None),
+            "supersede": kwargs.pop("supersede", False)
+        }
+    
+    def _cache_key(self, endpoint: str, content, kwargs: Dict, use_cache: Optional[bool]) -> Optional[str]:
+        """
+        Get the cache key for a request, or None when the cache should be bypassed.
+        
+        Args:
+            endpoint (str): "generate" or "chat".
+            content: The prompt or list of messages.
+            kwargs (Dict): Parameters passed by the caller.
+            use_cache (Optional[bool]): True forces caching, False bypasses it, and None caches
+                                        only deterministic requests.
+        
+        Returns:
+            Optional[str]: The cache key, or None if the response should not be cached.
+        """
+        if self.cache is None or use_cache is False:
+            return None
+        options = self._apply_options({}, kwargs)
+        if use_cache is None and not ResponseCache.is_deterministic(options.get("options", {})):
+            return None
+        return ResponseCache.make_key(endpoint, self.model_name, content, options)
+    
     def generate(self, prompt: str, **kwargs) -> Optional[str]:
         """
         Generate a response for a single prompt.
@@ -96,45 +392,99 @@ class DeepSeekIntegration:
         Args:
             prompt (str): The prompt to send to the model.
             **kwargs: Additional parameters to pass to the model.
-                - temperature (float): Controls randomness. Higher values (e.g., 0.8) make output more random, 
-                  lower values (e.g., 0.2) make it more deterministic. Default is 0.7.
-                - max_tokens (int): Maximum number of tokens to generate. Default is 2048.
-                - top_p (float): Controls diversity via nucleus sampling. Default is 0.9.
-                - top_k (int): Controls diversity via top-k sampling. Default is 40.
-                - stop (List[str]): List of strings that stop generation when encountered.
+                - call_site (str): "planning", "synthesis", "chat", "voice" or "summary"; selects the
+                  default output budget and sampling. Defaults to default_options.
+                - options (GenerationOptions): Options that override the call site's defaults.
+                - Any GenerationOptions field (temperature, num_predict, num_ctx, num_thread, top_p,
+                  top_k, seed, stop, keep_alive, format) as a keyword argument.
+                - max_tokens (int): Alias for num_predict.
+                - use_cache (Optional[bool]): True forces the response cache, False bypasses it.
+                  By default only deterministic requests (temperature 0 or a seed) are cached.
+                - priority (Priority): Scheduling class of the request. Default is INTERACTIVE.
+                - session (str): Conversation the request belongs to, used for cancellation.
+                - supersede (bool): Cancel the session's earlier requests. Default is False.
+                - show_reasoning (bool): Keep the <think> block. Defaults to show_reasoning.
         
         Returns:
             Optional[str]: The generated response or None if generation failed.
+        
+        Raises:
+            RequestCancelled: If the request was superseded before it started.
+        """
+        schedule = self._pop_schedule(kwargs)
+        show_reasoning = kwargs.pop("show_reasoning", None)
+        cache_key = self._cache_key("generate", prompt, kwargs, kwargs.pop("use_cache", None))
+        if cache_key:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return self.visible_text(cached, show_reasoning)
+        
+        if not self.ensure_available():
+            return None
+        
+        # Prepare request data
+        data = self._apply_options({
+            "model": self.model_name,
+            "prompt": prompt,
+            "stream": False
+        }, kwargs)
+        
+        result = self._coalesce(self.generate_url, data, lambda: self._send_generate(data), schedule,
+                                kwargs.get("call_site"))
+        if result is None:
+            return None
+        text = result.get("response", "")
+        if cache_key:
+            self.cache.set(cache_key, text)
+        return self.visible_text(text, show_reasoning)
+    
+    def generate_turn(self, prompt: str, **kwargs) -> Optional[Dict]:
+        """
+        Generate a response and return Ollama's full result.
+        
+        The result's "context" can be passed back as the context parameter so the next turn
+        continues from the evaluated prompt instead of resending it.
+        
+        Args:
+            prompt (str): The prompt to send to the model.
+            **kwargs: Additional parameters to pass to the model (see generate), plus:
+                - system (str): System prompt for this request.
+                - context (List[int]): Context returned by a previous turn.
+        
+        Returns:
+            Optional[Dict]: The result with "response", "context" and the eval statistics, or None
+                            if generation failed.
+        
+        Raises:
+            RequestCancelled: If the request was superseded before it started.
         """
-        if not self.is_available and not self.pull_model():
+        schedule = self._pop_schedule(kwargs)
+        if not self.ensure_available():
             return None
         
+        data = self._apply_options({
+            "model": self.model_name,
+            "prompt": prompt,
+            "stream": False
+        }, kwargs)
+        return self._coalesce(self.generate_url, data, lambda: self._send_generate(data), schedule,
+                              kwargs.get("call_site"))
+    
+    def _send_generate(self, data: Dict) -> Optional[Dict]:
+        """
+        Send a non-streaming generate request.
+        
+        Args:
+            data (Dict): The request body.
+        
+        Returns:
+            Optional[Dict]: Ollama's result or None if generation failed.
+        """
         try:
-            # Prepare request data
-            data = {
-                "model": self.model_name,
-                "prompt": prompt,
-                "stream": False
-            }
-            
-            # Add optional parameters
-            if "temperature" in kwargs:
-                data["temperature"] = kwargs["temperature"]
-            if "max_tokens" in kwargs:
-                data["max_tokens"] = kwargs["max_tokens"]
-            if "top_p" in kwargs:
-                data["top_p"] = kwargs["top_p"]
-            if "top_k" in kwargs:
-                data["top_k"] = kwargs["top_k"]
-            if "stop" in kwargs:
-                data["stop"] = kwargs["stop"]
-            
-            # Send request
-            response = requests.post(self.generate_url, json=data)
+            response = self._post(self.generate_url, data)
             
             if response.status_code == 200:
-                result = response.json()
-                return result.get("response", "")
+                return response.json()
             else:
                 print(f"Generation failed with status code {response.status_code}")
                 print(response.text)
@@ -143,6 +493,218 @@ class DeepSeekIntegration:
             print(f"Error generating response: {e}")
             return None
     
+    def _coalesce(self, url: str, data: Dict, send: Callable[[], Optional[Dict]], schedule: Dict,
+                  call_site: Optional[str] = None) -> Optional[Dict]:
+        """
+        Send a request once a scheduler slot is free, sharing the result with identical
+        requests already in flight.
+        
+        Args:
+            url (str): The Ollama endpoint.
+            data (Dict): The request body.
+            send (Callable[[], Optional[Dict]]): Performs the request.
+            schedule (Dict): Keyword arguments for LLMScheduler.slot().
+            call_site (Optional[str], optional): Call site the timings are recorded under. Defaults to None.
+        
+        Returns:
+            Optional[Dict]: The result of send(), possibly produced for another caller.
+        """
+        def scheduled_send():
+            with self.scheduler.slot(**schedule) as ticket:
+                if ticket.priority != Priority.BACKGROUND:
+                    self.last_used = time.monotonic()
+                result = send()
+            if result is not None:
+                self.metrics.record_response(call_site, result, queue_time=ticket.queue_time)
+            return result
+        
+        if self.single_flight is None:
+            return scheduled_send()
+        return self.single_flight.do(request_key(url, data, schedule["session"]), scheduled_send)
+    
+    def iter_generate(self, prompt: str, **kwargs) -> Generator[str, None, None]:
+        """
+        Generate a response for a single prompt, yielding chunks as they arrive.
+        
+        Tokens are read from the connection only as fast as the caller consumes them, and
+        closing the generator early closes the connection so Ollama stops generating.
+        
+        Args:
+            prompt (str): The prompt to send to the model.
+            **kwargs: Additional parameters to pass to the model (see generate and generate_turn), plus:
+                - on_done (Callable[[Dict], None]): Called with the final chunk, which carries the
+                  "context" and the eval statistics.
+                - flush_interval (float): Seconds over which tokens are batched into one chunk.
+                  Defaults to stream_flush_interval.
+                - show_reasoning (bool): Stream the <think> block too. Defaults to show_reasoning.
+        
+        Yields:
+            str: Each chunk of the response.
+        
+        Raises:
+            RuntimeError: If the model is not available or Ollama reports an error.
+            RequestCancelled: If the request was superseded.
+            requests.exceptions.RequestException: If the request fails.
+        """
+        schedule = self._pop_schedule(kwargs)
+        on_done = kwargs.pop("on_done", None)
+        flush_interval = kwargs.pop("flush_interval", self.stream_flush_interval)
+        show_reasoning = kwargs.pop("show_reasoning", self.show_reasoning)
+        data = self._apply_options({
+            "model": self.model_name,
+            "prompt": prompt,
+            "stream": True
+        }, kwargs)
+        stream = self._coalesce_stream(self.generate_url, data, lambda chunk: chunk.get("response"), schedule,
+                                       kwargs.get("call_site"), show_reasoning, on_done)
+        yield from batch_tokens(stream, flush_interval)
+    
+    def iter_chat(self, messages: List[Dict[str, str]], **kwargs) -> Generator[str, None, None]:
+        """
+        Generate a response for a chat conversation, yielding chunks as they arrive.
+        
+        Args:
+            messages (List[Dict[str, str]]): List of message dictionaries with 'role' and 'content' keys.
+            **kwargs: Additional parameters to pass to the model (see generate), plus flush_interval
+                      (see iter_generate).
+        
+        Yields:
+            str: Each chunk of the response message content.
+        
+        Raises:
+            RuntimeError: If the model is not available or Ollama reports an error.
+            RequestCancelled: If the request was superseded.
+            requests.exceptions.RequestException: If the request fails.
+        """
+        schedule = self._pop_schedule(kwargs)
+        flush_interval = kwargs.pop("flush_interval", self.stream_flush_interval)
+        show_reasoning = kwargs.pop("show_reasoning", self.show_reasoning)
+        data = self._apply_options({
+            "model": self.model_name,
+            "messages": messages,
+            "stream": True
+        }, kwargs)
+        stream = self._coalesce_stream(self.chat_url, data, lambda chunk: chunk.get("message", {}).get("content"),
+                                       schedule, kwargs.get("call_site"), show_reasoning)
+        yield from batch_tokens(stream, flush_interval)
+    
+    def _coalesce_stream(self, url: str, data: Dict, extract: Callable[[Dict], Optional[str]],
+                         schedule: Dict, call_site: Optional[str] = None, show_reasoning: bool = False,
+                         on_done: Optional[Callable[[Dict], None]] = None) -> Iterator[str]:
+        """
+        Stream a request, subscribing to an identical stream already in flight if there is one.
+        
+        Subscribers that join late first receive the chunks produced so far.
+        
+        Args:
+            url (str): The Ollama endpoint.
+            data (Dict): The request body.
+            extract (Callable[[Dict], Optional[str]]): Returns the text carried by a decoded chunk.
+            schedule (Dict): Keyword arguments for LLMScheduler.slot().
+            call_site (Optional[str], optional): Call site the timings are recorded under. Defaults to None.
+            show_reasoning (bool, optional): Keep <think> blocks in the text. Defaults to False.
+            on_done (Optional[Callable[[Dict], None]], optional): Called with the final chunk. A stream with
+                                                                  a callback is never shared.
+        
+        Returns:
+            Iterator[str]: The chunks of the response.
+        """
+        if self.single_flight is None or on_done is not None:
+            return self._iter_stream(url, data, extract, schedule, call_site, show_reasoning, on_done)
+        key = request_key(url, data, schedule["session"]) + (":reasoning" if show_reasoning else "")
+        return self.single_flight.stream(key, lambda: self._iter_stream(url, data, extract, schedule, call_site,
+                                                                        show_reasoning))
+    
+    def _iter_stream(self, url: str, data: Dict, extract: Callable[[Dict], Optional[str]],
+                     schedule: Dict, call_site: Optional[str] = None, show_reasoning: bool = False,
+                     on_done: Optional[Callable[[Dict], None]] = None) -> Generator[str, None, None]:
+        """
+        Send a streaming request and yield the text extracted from each NDJSON chunk.
+        
+        The scheduler slot is held until the stream ends, and the stream stops early if the
+        request is superseded. Reasoning blocks are filtered out here, so time to the first
+        visible token is measured separately from time to the first token.
+        
+        Args:
+            url (str): The Ollama endpoint.
+            data (Dict): The request body.
+            extract (Callable[[Dict], Optional[str]]): Returns the text carried by a decoded chunk.
+            schedule (Dict): Keyword arguments for LLMScheduler.slot().
+            call_site (Optional[str], optional): Call site the timings are recorded under. Defaults to None.
+            show_reasoning (bool, optional): Keep <think> blocks in the text. Defaults to False.
+            on_done (Optional[Callable[[Dict], None]], optional): Called with the final chunk.
+        
+        Yields:
+            str: Each non-empty piece of text.
+        """
+        if not self.ensure_available():
+            raise RuntimeError(f"Model {self.model_name} is not available")
+        
+        with self.scheduler.slot(**schedule) as ticket, self._post(url, data, stream=True) as response:
+            sent = time.monotonic()
+            if ticket.priority != Priority.BACKGROUND:
+                self.last_used = sent
+            ttft = visible_ttft = None
+            reasoning = None if show_reasoning else ReasoningFilter(self.reasoning_sink)
+            if response.status_code != 200:
+                raise requests.exceptions.HTTPError(
+                    f"Streaming request failed with status code {response.status_code}: {response.text}",
+                    response=response
+                )
+            
+            # Decode straight from the raw bytes instead of splitting lines and parsing each one
+            chunks = iter_ndjson(response.iter_content(chunk_size=None),
+                                 on_error=lambda line, e: print(f"Failed to decode JSON: {line}"))
+            for chunk in chunks:
+                if ticket.cancelled.is_set():
+                    raise RequestCancelled("Request was superseded")
+                if "error" in chunk:
+                    raise RuntimeError(chunk["error"])
+                text = extract(chunk)
+                if text and ttft is None:
+                    ttft = time.monotonic() - sent
+                if reasoning is not None:
+                    text = reasoning.feed(text or "")
+                    if chunk.get("done"):
+                        text += reasoning.close()
+                if text:
+                    if visible_ttft is None:
+                        visible_ttft = time.monotonic() - sent
+                    yield text
+                if chunk.get("done"):
+                    self.metrics.record_response(call_site, chunk, queue_time=ticket.queue_time, ttft=ttft,
+                                                 visible_ttft=visible_ttft)
+                    if on_done is not None:
+                        on_done(chunk)
+    
+    async def aiter_generate(self, prompt: str, **kwargs) -> AsyncGenerator[str, None]:
+        """
+        Async-iterator version of iter_generate for use inside an event loop.
+        
+        Args:
+            prompt (str): The prompt to send to the model.
+            **kwargs: Additional parameters to pass to the model (see generate).
+        
+        Yields:
+            str: Each chunk of the response.
+        """
+        async for chunk in _iterate_in_thread(self.iter_generate(prompt, **kwargs)):
+            yield chunk
+    
+    async def aiter_chat(self, messages: List[Dict[str, str]], **kwargs) -> AsyncGenerator[str, None]:
+        """
+        Async-iterator version of iter_chat for use inside an event loop.
+        
+        Args:
+            messages (List[Dict[str, str]]): List of message dictionaries with 'role' and 'content' keys.
+            **kwargs: Additional parameters to pass to the model (see generate).
+        
+        Yields:
+            str: Each chunk of the response message content.
+        """
+        async for chunk in _iterate_in_thread(self.iter_chat(messages, **kwargs)):
+            yield chunk
+    
     def generate_stream(self, prompt: str, callback: Callable[[str], None], **kwargs) -> bool:
         """
         Generate a response for a single prompt with streaming output.
@@ -155,46 +717,12 @@ class DeepSeekIntegration:
         Returns:
             bool: True if generation was successful, False otherwise.
         """
-        if not self.is_available and not self.pull_model():
-            return False
-        
         try:
-            # Prepare request data
-            data = {
-                "model": self.model_name,
-                "prompt": prompt,
-                "stream": True
-            }
-            
-            # Add optional parameters
-            if "temperature" in kwargs:
-                data["temperature"] = kwargs["temperature"]
-            if "max_tokens" in kwargs:
-                data["max_tokens"] = kwargs["max_tokens"]
-            if "top_p" in kwargs:
-                data["top_p"] = kwargs["top_p"]
-            if "top_k" in kwargs:
-                data["top_k"] = kwargs["top_k"]
-            if "stop" in kwargs:
-                data["stop"] = kwargs["stop"]
-            
-            # Send request
-            response = requests.post(self.generate_url, json=data, stream=True)
-            
-            if response.status_code == 200:
-                for line in response.iter_lines():
-                    if line:
-                        try:
-                            chunk = json.loads(line)
-                            if "response" in chunk:
-                                callback(chunk["response"])
-                        except json.JSONDecodeError:
-                            print(f"Failed to decode JSON: {line}")
-                return True
-            else:
-                print(f"Streaming generation failed with status code {response.status_code}")
-                print(response.text)
-                return False
+            for chunk in self.iter_generate(prompt, **kwargs):
+                callback(chunk)
+            return True
+        except RequestCancelled:
+            return False
         except Exception as e:
             print(f"Error in streaming generation: {e}")
             return False
@@ -206,40 +734,106 @@ class DeepSeekIntegration:
         Args:
             messages (List[Dict[str, str]]): List of message dictionaries with 'role' and 'content' keys.
                 Example: [{"role": "user", "content": "Hello"}, {"role": "assistant", "content": "Hi there!"}]
-            **kwargs: Additional parameters to pass to the model.
+            **kwargs: Additional parameters to pass to the model (see generate, including use_cache
+                      and the scheduling parameters).
         
         Returns:
             Optional[Dict[str, str]]: The generated response message or None if generation failed.
+        
+        Raises:
+            RequestCancelled: If the request was superseded before it started.
+        """
+        schedule = self._pop_schedule(kwargs)
+        show_reasoning = kwargs.pop("show_reasoning", None)
+        cache_key = self._cache_key("chat", messages, kwargs, kwargs.pop("use_cache", None))
+        if cache_key:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return self._visible_message(cached, show_reasoning)
+        
+        if not self.ensure_available():
+            return None
+        
+        # Prepare request data
+        data = self._apply_options({
+            "model": self.model_name,
+            "messages": messages,
+            "stream": False
+        }, kwargs)
+        
+        result = self._coalesce(self.chat_url, data, lambda: self._send_chat(data), schedule,
+                                kwargs.get("call_site"))
+        message = result.get("message", {}) if result is not None else None
+        if message and cache_key:
+            self.cache.set(cache_key, message)
+        return self._visible_message(message, show_reasoning)
+    
+    def chat_json(self, messages: List[Dict[str, str]], **kwargs) -> Optional[Dict]:
+        """
+        Stream a chat response and return the first JSON object in it, stopping the generation
+        as soon as the object is complete.
+        
+        Args:
+            messages (List[Dict[str, str]]): List of message dictionaries with 'role' and 'content' keys.
+            **kwargs: Additional parameters to pass to the model (see iter_chat).
+        
+        Returns:
+            Optional[Dict]: The object, or None if the response did not contain one.
+        
+        Raises:
+            RuntimeError: If the model is not available or Ollama reports an error.
+            RequestCancelled: If the request was superseded.
+            requests.exceptions.RequestException: If the request fails.
+        """
+        return first_json_object(self.iter_chat(messages, **kwargs))
+    
+    def _visible_message(self, message: Optional[Dict[str, str]], show_reasoning: Optional[bool] = None) -> Optional[Dict[str, str]]:
+        """Return a copy of a chat message with the reasoning removed from its content."""
+        if not message or "content" not in message:
+            return message
+        return dict(message, content=self.visible_text(message["content"], show_reasoning))
+    
+    def chat_turn(self, messages: List[Dict[str, str]], **kwargs) -> Optional[Dict]:
+        """
+        Generate a chat response and return Ollama's full result.
+        
+        Args:
+            messages (List[Dict[str, str]]): List of message dictionaries with 'role' and 'content' keys.
+            **kwargs: Additional parameters to pass to the model (see generate).
+        
+        Returns:
+            Optional[Dict]: The result with "message" and the eval statistics, or None if generation failed.
+        
+        Raises:
+            RequestCancelled: If the request was superseded before it started.
         """
-        if not self.is_available and not self.pull_model():
+        schedule = self._pop_schedule(kwargs)
+        if not self.ensure_available():
             return None
         
+        data = self._apply_options({
+            "model": self.model_name,
+            "messages": messages,
+            "stream": False
+        }, kwargs)
+        return self._coalesce(self.chat_url, data, lambda: self._send_chat(data), schedule,
+                              kwargs.get("call_site"))
+    
+    def _send_chat(self, data: Dict) -> Optional[Dict]:
+        """
+        Send a non-streaming chat request.
+        
+        Args:
+            data (Dict): The request body.
+        
+        Returns:
+            Optional[Dict]: Ollama's result or None if generation failed.
+        """
         try:
-            # Prepare request data
-            data = {
-                "model": self.model_name,
-                "messages": messages,
-                "stream": False
-            }
-            
-            # Add optional parameters
-            if "temperature" in kwargs:
-                data["temperature"] = kwargs["temperature"]
-            if "max_tokens" in kwargs:
-                data["max_tokens"] = kwargs["max_tokens"]
-            if "top_p" in kwargs:
-                data["top_p"] = kwargs["top_p"]
-            if "top_k" in kwargs:
-                data["top_k"] = kwargs["top_k"]
-            if "stop" in kwargs:
-                data["stop"] = kwargs["stop"]
-            
-            # Send request
-            response = requests.post(self.chat_url, json=data)
+            response = self._post(self.chat_url, data)
             
             if response.status_code == 200:
-                result = response.json()
-                return result.get("message", {})
+                return response.json()
             else:
                 print(f"Chat generation failed with status code {response.status_code}")
                 print(response.text)
@@ -248,6 +842,83 @@ class DeepSeekIntegration:
             print(f"Error in chat generation: {e}")
             return None
     
+    def generate_many(self, prompts: List[str], max_workers: Optional[int] = None,
+                      progress: Optional[Callable[[int, int], None]] = None, **kwargs) -> BatchResult:
+        """
+        Generate responses for many independent prompts in parallel.
+        
+        Args:
+            prompts (List[str]): The prompts to send.
+            max_workers (Optional[int], optional): Requests in flight at once. Defaults to the scheduler's
+                                                   max_concurrent, which follows OLLAMA_NUM_PARALLEL.
+            progress (Optional[Callable[[int, int], None]], optional): Called with (completed, total) as
+                                                                       each prompt finishes. Defaults to None.
+            **kwargs: Additional parameters to pass to the model (see generate). The priority defaults
+                      to BACKGROUND so a batch does not hold up interactive requests.
+        
+        Returns:
+            BatchResult: The response texts in prompt order, with None for prompts that failed.
+        """
+        show_reasoning = kwargs.pop("show_reasoning", None)
+        return self._run_many(prompts, self.generate_turn,
+                              lambda result: self.visible_text(result.get("response", ""), show_reasoning),
+                              max_workers, progress, kwargs)
+    
+    def chat_many(self, conversations: List[List[Dict[str, str]]], max_workers: Optional[int] = None,
+                  progress: Optional[Callable[[int, int], None]] = None, **kwargs) -> BatchResult:
+        """
+        Generate responses for many independent conversations in parallel.
+        
+        Args:
+            conversations (List[List[Dict[str, str]]]): The message lists to send.
+            max_workers (Optional[int], optional): Requests in flight at once (see generate_many).
+            progress (Optional[Callable[[int, int], None]], optional): Called with (completed, total).
+            **kwargs: Additional parameters to pass to the model (see generate_many).
+        
+        Returns:
+            BatchResult: The response messages in input order, with None for conversations that failed.
+        """
+        show_reasoning = kwargs.pop("show_reasoning", None)
+        return self._run_many(conversations, self.chat_turn,
+                              lambda result: self._visible_message(result.get("message", {}), show_reasoning),
+                              max_workers, progress, kwargs)
+    
+    def _run_many(self, items: List, send: Callable[..., Optional[Dict]], extract: Callable[[Dict], Any],
+                  max_workers: Optional[int], progress: Optional[Callable[[int, int], None]],
+                  kwargs: Dict) -> BatchResult:
+        """
+        Send each item on a thread pool, collecting results in order and failures by index.
+        
+        The scheduler still bounds what reaches Ollama; the pool only keeps that many requests queued.
+        """
+        kwargs.setdefault("priority", Priority.BACKGROUND)
+        batch = BatchResult(results=[None] * len(items))
+        if not items:
+            return batch
+        
+        def run(item):
+            result = send(item, **kwargs)
+            if result is None:
+                raise RuntimeError("generation failed")
+            return result
+        
+        start = time.monotonic()
+        workers = max(1, min(max_workers or self.scheduler.max_concurrent, len(items)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="deepseek-batch") as executor:
+            futures = {executor.submit(run, item): index for index, item in enumerate(items)}
+            for completed, future in enumerate(as_completed(futures), 1):
+                index = futures[future]
+                try:
+                    result = future.result()
+                    batch.results[index] = extract(result)
+                    batch.tokens += result.get("eval_count", 0)
+                except Exception as e:
+                    batch.errors[index] = str(e) or type(e).__name__
+                if progress is not None:
+                    progress(completed, len(items))
+        batch.elapsed = time.monotonic() - start
+        return batch
+    
     def chat_stream(self, messages: List[Dict[str, str]], callback: Callable[[str], None], **kwargs) -> bool:
         """
         Generate a response for a chat conversation with streaming output.
@@ -260,64 +931,190 @@ class DeepSeekIntegration:
         Returns:
             bool: True if generation was successful, False otherwise.
         """
-        if not self.is_available and not self.pull_model():
-            return False
-        
         try:
-            # Prepare request data
-            data = {
-                "model": self.model_name,
-                "messages": messages,
-                "stream": True
-            }
-            
-            # Add optional parameters
-            if "temperature" in kwargs:
-                data["temperature"] = kwargs["temperature"]
-            if "max_tokens" in kwargs:
-                data["max_tokens"] = kwargs["max_tokens"]
-            if "top_p" in kwargs:
-                data["top_p"] = kwargs["top_p"]
-            if "top_k" in kwargs:
-                data["top_k"] = kwargs["top_k"]
-            if "stop" in kwargs:
-                data["stop"] = kwargs["stop"]
-            
-            # Send request
-            response = requests.post(self.chat_url, json=data, stream=True)
-            
-            if response.status_code == 200:
-                for line in response.iter_lines():
-                    if line:
-                        try:
-                            chunk = json.loads(line)
-                            if "message" in chunk and "content" in chunk["message"]:
-                                callback(chunk["message"]["content"])
-                        except json.JSONDecodeError:
-                            print(f"Failed to decode JSON: {line}")
-                return True
-            else:
-                print(f"Streaming chat generation failed with status code {response.status_code}")
-                print(response.text)
-                return False
+            for chunk in self.iter_chat(messages, **kwargs):
+                callback(chunk)
+            return True
+        except RequestCancelled:
+            return False
         except Exception as e:
             print(f"Error in streaming chat generation: {e}")
             return False
 
+class GenerationSession:
+    """
+    A multi-turn conversation over /api/generate that continues from the context Ollama returns,
+    so follow-up turns only send the new user message instead of re-evaluating the whole prompt.
+    """
+    
+    def __init__(self, deepseek: DeepSeekIntegration, system_prompt: Optional[str] = None):
+        """
+        Initialize the session.
+        
+        Args:
+            deepseek (DeepSeekIntegration): The integration used to send requests.
+            system_prompt (Optional[str], optional): System prompt for the conversation. Defaults to None.
+        """
+        self.deepseek = deepseek
+        self.system_prompt = system_prompt
+        self.turns = []  # (user, assistant) pairs, used to rebuild the prompt when the context is lost
+        self.context = None
+        self.context_model = None
+        self.stats = {"turns": 0, "continued": 0, "full_resends": 0,
+                      "prompt_eval_count": 0, "prompt_eval_seconds": 0.0}
+    
+    def reset(self):
+        """
+        Start a new conversation.
+        """
+        self.turns = []
+        self.context = None
+        self.context_model = None
+    
+    def send(self, prompt: str, **kwargs) -> Optional[str]:
+        """
+        Send a user turn and return the reply.
+        
+        Args:
+            prompt (str): The user's message.
+            **kwargs: Additional parameters to pass to the model (see DeepSeekIntegration.generate).
+        
+        Returns:
+            Optional[str]: The reply or None if generation failed.
+        """
+        request, extra = self._prepare(prompt)
+        result = self.deepseek.generate_turn(request, **extra, **kwargs)
+        if result is None:
+            return None
+        text = self.deepseek.visible_text(result.get("response", ""), kwargs.get("show_reasoning"))
+        self._record(prompt, text, result, "context" in extra)
+        return text
+    
+    def stream(self, prompt: str, **kwargs) -> Generator[str, None, None]:
+        """
+        Send a user turn and yield the reply as it is generated.
+        
+        Args:
+            prompt (str): The user's message.
+            **kwargs: Additional parameters to pass to the model (see DeepSeekIntegration.generate).
+        
+        Yields:
+            str: Each chunk of the reply.
+        """
+        request, extra = self._prepare(prompt)
+        final = {}
+        chunks = []
+        for chunk in self.deepseek.iter_generate(request, on_done=final.update, **extra, **kwargs):
+            chunks.append(chunk)
+            yield chunk
+        self._record(prompt, "".join(chunks), final, "context" in extra)
+    
+    def _prepare(self, prompt: str):
+        """Return the prompt to send and the extra request fields for the next turn."""
+        if self.context is not None and self.context_model == self.deepseek.model_name:
+            return prompt, {"context": self.context}
+        
+        # No usable context (new session, reset or model change): resend the whole conversation
+        self.context = None
+        extra = {"system": self.system_prompt} if self.system_prompt else {}
+        if not self.turns:
+            return prompt, extra
+        transcript = "\n\n".join(f"User: {user}\nAssistant: {assistant}" for user, assistant in self.turns)
+        return f"{transcript}\n\nUser: {prompt}\nAssistant:", extra
+    
+    def _record(self, prompt: str, reply: str, result: Dict, continued: bool):
+        """Store the turn and the context to continue from."""
+        self.turns.append((prompt, reply))
+        self.context = result.get("context")
+        self.context_model = self.deepseek.model_name
+        self.stats["turns"] += 1
+        self.stats["continued" if continued else "full_resends"] += 1
+        self.stats["prompt_eval_count"] += result.get("prompt_eval_count", 0)
+        self.stats["prompt_eval_seconds"] += result.get("prompt_eval_duration", 0) / 1e9
+
+async def _iterate_in_thread(iterator: Iterator[str], max_buffered: int = 32) -> AsyncGenerator[str, None]:
+    """
+    Drive a blocking iterator from a worker thread and expose it as an async generator.
+    
+    The bounded queue gives backpressure: the worker stops reading from the connection
+    while the consumer is behind, and stops altogether once the consumer goes away.
+    
+    Args:
+        iterator (Iterator[str]): A blocking iterator such as iter_chat().
+        max_buffered (int, optional): Maximum number of chunks buffered ahead of the consumer.
+    
+    Yields:
+        str: The items produced by the iterator.
+    """
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue(maxsize=max_buffered)
+    stop = threading.Event()
+    done = object()
+    
+    def produce():
+        outcome = done
+        try:
+            for item in iterator:
+                if stop.is_set():
+                    break
+                asyncio.run_coroutine_threadsafe(queue.put(item), loop).result()
+        except Exception as e:
+            outcome = e
+        finally:
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                close()
+        if not stop.is_set():
+            try:
+                asyncio.run_coroutine_threadsafe(queue.put(outcome), loop).result()
+            except Exception:
+                pass  # The event loop closed before the consumer finished
+    
+    threading.Thread(target=produce, daemon=True).start()
+    try:
+        while True:
+            item = await queue.get()
+            if item is done:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()
+        # Free a producer that may be blocked on a full queue
+        while not queue.empty():
+            queue.get_nowait()
+
 class AgentSystem:
     """
     A simple agent system that uses DeepSeek R1 for autonomous task execution.
     """
     
-    def __init__(self, model_name: str = "deepseek-r1:8b"):
+    def __init__(self, model_name: str = "deepseek-r1:8b", deepseek: Optional[DeepSeekIntegration] = None,
+                 context_tokens: Optional[int] = None, router: Optional[LLMRouter] = None):
         """
         Initialize the agent system.
         
         Args:
             model_name (str, optional): The name of the DeepSeek model to use. Defaults to "deepseek-r1:8b".
+            deepseek (Optional[DeepSeekIntegration], optional): An existing integration to share, so the
+                                                                agent reuses its pooled connections.
+                                                                Defaults to None (create a new one).
+            context_tokens (Optional[int], optional): Token budget for the messages sent on each turn; older
+                                                      turns are folded into a rolling summary. Defaults to
+                                                      what fits in num_ctx next to the longest reply.
+            router (Optional[LLMRouter], optional): Router for non-streaming replies and summaries, so they
+                                                    fall back to another backend when Ollama is down.
+                                                    Defaults to the standard router over this integration.
         """
-        self.deepseek = DeepSeekIntegration(model_name)
+        self.deepseek = deepseek or DeepSeekIntegration(model_name)
+        self.router = router or create_default_router(self.deepseek)
+        # A new request from the user supersedes one that is still queued or streaming
+        self.session_id = f"agent-{id(self)}"
         self.conversation_history = []
+        if context_tokens is None:
+            context_tokens = min(prompt_budget(call_site) for call_site in ("chat", "voice", "planning"))
+        self.context = ContextWindowManager(self._summarize_history, max_tokens=context_tokens)
         self.system_prompt = """You are an autonomous AI agent that can help users with various tasks. 
 You can understand complex instructions and break them down into steps.
 You should always think step by step and explain your reasoning.
@@ -339,6 +1136,41 @@ When you need to perform a specific action, clearly indicate what you're doing.
         Reset the conversation history, keeping only the system prompt.
         """
         self.conversation_history = [{"role": "system", "content": self.system_prompt}]
+        self.context.reset()
+    
+    def _summarize_history(self, summary: str, messages: List[Dict[str, str]]) -> Optional[str]:
+        """
+        Fold older messages into the rolling conversation summary.
+        
+        Args:
+            summary (str): The current summary, possibly empty.
+            messages (List[Dict[str, str]]): Messages that no longer fit in the context window.
+        
+        Returns:
+            Optional[str]: The updated summary or None if summarization failed.
+        """
+        transcript = "\n".join(f"{message['role']}: {message['content']}" for message in messages)
+        prompt = f"""Update the summary of a conversation between a user and an AI assistant.
+Keep facts, decisions, open tasks and user preferences. Be concise.
+
+Current summary:
+{summary or "(none)"}
+
+New messages:
+{transcript}
+
+Updated summary:"""
+        try:
+            result = self.router.chat(
+                [{"role": "user", "content": prompt}],
+                request_class=CHAT,
+                options=options_for("summary"),
+                call_site="summary",
+                priority=Priority.BACKGROUND
+            )
+        except NoBackendAvailable:
+            return None
+        return result.text
     
     def initialize(self):
         """
@@ -347,14 +1179,15 @@ When you need to perform a specific action, clearly indicate what you're doing.
         Returns:
             bool: True if initialization was successful, False otherwise.
         """
-        if not self.deepseek.is_available and not self.deepseek.pull_model():
+        if not self.deepseek.ensure_available():
             return False
         
         # Reset conversation and add system prompt
         self.reset_conversation()
         return True
     
-    def process_request(self, user_request: str, callback: Optional[Callable[[str], None]] = None) -> Optional[str]:
+    def process_request(self, user_request: str, callback: Optional[Callable[[str], None]] = None,
+                        call_site: str = "chat") -> Optional[str]:
         """
         Process a user request and generate a response.
         
@@ -362,49 +1195,57 @@ When you need to perform a specific action, clearly indicate what you're doing.
             user_request (str): The user's request.
             callback (Optional[Callable[[str], None]], optional): Function to call with each chunk of the response
                                                                  if streaming is desired.
+            call_site (str, optional): Selects the output budget, e.g. "voice" for spoken replies.
+                                       Defaults to "chat".
         
         Returns:
             Optional[str]: The generated response or None if processing failed.
+        
+        Raises:
+            RequestCancelled: If a newer request superseded this one.
         """
         # Add user message to conversation history
         self.add_message("user", user_request)
         
         # If callback is provided, use streaming
         if callback:
-            success = self.deepseek.chat_stream(
-                self.conversation_history,
-                callback,
-                temperature=0.7,
-                max_tokens=2048
-            )
+            # Collect the streamed chunks so the answer is generated only once
+            chunks = []
+            try:
+                for chunk in self.deepseek.iter_chat(
+                    self.context.build(self.conversation_history),
+                    call_site=call_site,
+                    session=self.session_id,
+                    supersede=True
+                ):
+                    callback(chunk)
+                    chunks.append(chunk)
+            except RequestCancelled:
+                raise
+            except Exception as e:
+                print(f"Error in streaming chat generation: {e}")
+                return None
             
-            if success:
-                # We need to get the full response to add to history
-                # This is a bit inefficient but necessary for maintaining context
-                response = self.deepseek.chat(
-                    self.conversation_history,
-                    temperature=0.7,
-                    max_tokens=2048
+            content = "".join(chunks)
+            self.add_message("assistant", content)
+            return content
+        else:
+            # Non-streaming response, on whichever backend the router picks
+            try:
+                result = self.router.chat(
+                    self.context.build(self.conversation_history),
+                    request_class=CHAT,
+                    options=options_for(call_site),
+                    call_site=call_site,
+                    session=self.session_id,
+                    supersede=True
                 )
-                
-                if response and "content" in response:
-                    self.add_message("assistant", response["content"])
-                    return response["content"]
+            except NoBackendAvailable as e:
+                print(f"Error in chat generation: {e}")
                 return None
-            else:
-                return None
-        else:
-            # Non-streaming response
-            response = self.deepseek.chat(
-                self.conversation_history,
-                temperature=0.7,
-                max_tokens=2048
-            )
             
-            if response and "content" in response:
-                self.add_message("assistant", response["content"])
-                return response["content"]
-            return None
+            self.add_message("assistant", result.text)
+            return result.text
     
     def execute_task(self, task_description: str, callback: Optional[Callable[[str], None]] = None) -> Optional[str]:
         """
@@ -423,7 +1264,7 @@ When you need to perform a specific action, clearly indicate what you're doing.
 Please help me break this down into steps and execute it. For each step, explain what you're doing and why.
 """
         
-        return self.process_request(prompt, callback)
+        return self.process_request(prompt, callback, call_site="planning")
 
 def main():
     """
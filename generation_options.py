@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Generation Options
+This module defines the typed generation options sent to Ollama and the default output
+budget for each call site, so a voice reply is not allowed to run as long as a plan.
+"""
+
+from dataclasses import dataclass, fields, replace
+from typing import Any, Dict, List, Optional, Union
+
+@dataclass
+class GenerationOptions:
+    """
+    Options for a single Ollama request.
+
+    Sampling and runtime fields go under the request's "options" object; keep_alive and
+    format are top-level request fields.
+    """
+    num_predict: Optional[int] = None
+    num_ctx: Optional[int] = None
+    num_thread: Optional[int] = None
+    temperature: Optional[float] = None
+    top_p: Optional[float] = None
+    top_k: Optional[int] = None
+    seed: Optional[int] = None
+    stop: Optional[List[str]] = None
+    keep_alive: Optional[Union[str, int]] = None
+    format: Optional[Union[str, Dict[str, Any]]] = None
+
+    # Fields sent at the top level of the request rather than under "options"
+    REQUEST_FIELDS = ("keep_alive", "format")
+
+    @classmethod
+    def from_kwargs(cls, kwargs: Dict[str, Any]) -> "GenerationOptions":
+        """
+        Build options from loose keyword arguments, accepting max_tokens for num_predict.
+
+        Args:
+            kwargs (Dict[str, Any]): Keyword arguments; unknown keys are ignored.
+
+        Returns:
+            GenerationOptions: The options that were given.
+        """
+        names = {field.name for field in fields(cls)}
+        values = {key: value for key, value in kwargs.items() if key in names}
+        if "max_tokens" in kwargs and "num_predict" not in values:
+            values["num_predict"] = kwargs["max_tokens"]
+        return cls(**values)
+
+    def merged(self, other: Optional["GenerationOptions"]) -> "GenerationOptions":
+        """
+        Overlay the fields that are set on another options object.
+
+        Args:
+            other (Optional[GenerationOptions]): Options that take precedence, or None.
+
+        Returns:
+            GenerationOptions: A new options object.
+        """
+        if other is None:
+            return self
+        overrides = {field.name: getattr(other, field.name) for field in fields(other)
+                     if getattr(other, field.name) is not None}
+        return replace(self, **overrides)
+
+    def to_request(self) -> Dict[str, Any]:
+        """
+        Map the options into the fields of an Ollama request body.
+
+        Returns:
+            Dict[str, Any]: "options" plus any top-level fields; unset values are left out.
+        """
+        request = {}
+        options = {}
+        for field in fields(self):
+            value = getattr(self, field.name)
+            if value is None:
+                continue
+            if field.name in self.REQUEST_FIELDS:
+                request[field.name] = value
+            else:
+                options[field.name] = value
+        if options:
+            request["options"] = options
+        return request
+
+# Context window for every call site. It fits deepseek-r1:8b's KV cache on a 4GB GPU, and
+# Ollama reloads the model whenever num_ctx changes, so the call sites share one value.
+CONTEXT_TOKENS = 4096
+# deepseek-r1 spends part of num_predict on its <think> block before the visible answer
+REASONING_TOKENS = 512
+# Room left in the window for the chat template and for low token estimates
+PROMPT_MARGIN_TOKENS = 256
+
+# Default budget and sampling per call site; each budget is the visible answer plus the reasoning
+CALL_SITE_OPTIONS = {
+    "planning": GenerationOptions(num_predict=1536 + REASONING_TOKENS, num_ctx=CONTEXT_TOKENS, temperature=0.2),
+    "synthesis": GenerationOptions(num_predict=768 + REASONING_TOKENS, num_ctx=CONTEXT_TOKENS, temperature=0.5),
+    "chat": GenerationOptions(num_predict=1024 + REASONING_TOKENS, num_ctx=CONTEXT_TOKENS, temperature=0.7),
+    "voice": GenerationOptions(num_predict=384 + REASONING_TOKENS, num_ctx=CONTEXT_TOKENS, temperature=0.7),
+    "summary": GenerationOptions(num_predict=512 + REASONING_TOKENS, num_ctx=CONTEXT_TOKENS, temperature=0.2),
+}
+
+def options_for(call_site: str, overrides: Optional[GenerationOptions] = None) -> GenerationOptions:
+    """
+    Get the default options for a call site.
+
+    Args:
+        call_site (str): One of the keys of CALL_SITE_OPTIONS.
+        overrides (Optional[GenerationOptions], optional): Fields that replace the defaults.
+
+    Returns:
+        GenerationOptions: The options to use.
+
+    Raises:
+        ValueError: If the call site is unknown.
+    """
+    if call_site not in CALL_SITE_OPTIONS:
+        raise ValueError(f"Unknown call site: {call_site}")
+    return CALL_SITE_OPTIONS[call_site].merged(overrides)
+
+def prompt_budget(call_site: str, margin: int = PROMPT_MARGIN_TOKENS) -> int:
+    """
+    Get the number of prompt tokens that fit in a call site's context window next to its reply.
+
+    Args:
+        call_site (str): One of the keys of CALL_SITE_OPTIONS.
+        margin (int, optional): Tokens kept free for the chat template. Defaults to PROMPT_MARGIN_TOKENS.
+
+    Returns:
+        int: num_ctx minus num_predict minus the margin.
+
+    Raises:
+        ValueError: If the call site is unknown.
+    """
+    options = options_for(call_site)
+    return options.num_ctx - options.num_predict - margin
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Simple Intent Fast Path
+This module recognises simple system commands ("cpu usage", "take a screenshot") with one
+compiled regular expression and answers them with native SystemControl calls, so they skip
+DeepSeek R1 planning, generated code and synthesis entirely.
+"""
+
+import os
+import re
+import time
+import logging
+import threading
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger("IntentMatcher")
+
+# Words that carry no intent; "what's my current cpu usage right now?" reduces to "cpu usage".
+# Articles and "to" are kept, so "what is a screenshot" and "how to get system info" are
+# questions for the planner rather than commands
+FILLER_WORDS = {
+    "about", "can", "check", "could", "current", "currently", "get", "give", "hey",
+    "how", "is", "jarvis", "me", "much", "my", "now", "of", "ok", "okay", "please", "right",
+    "s", "show", "tell", "the", "what", "whats", "would", "you"
+}
+
+# Each intent must match the whole reduced request, so anything more than the bare command
+# ("cpu usage over the last hour as a chart") falls through to the planner
+INTENT_PATTERNS = {
+    "system_info": r"system (?:info|information|details)",
+    "cpu_usage": r"(?:cpu|processor) (?:usage|load|utili[sz]ation|percent|percentage)",
+    "memory_usage": r"(?:memory|ram) (?:usage|use|used|free|available)|(?:free|available) (?:memory|ram)",
+    "disk_usage": r"(?:disk|storage) (?:usage|space|used|free)|free (?:disk )?space",
+    "battery": r"battery(?: status| level| percentage| life| charge)?",
+    "screenshot": r"(?:(?:take|capture|grab) (?:a )?)?(?:screenshot|screen shot|screen capture)"
+                  r"(?: and save it(?: in| into)? pictures(?: folder)?)?",
+}
+
+def normalise_command(text: str) -> str:
+    """
+    Reduce a request to its intent-bearing words.
+
+    Args:
+        text (str): The user's request.
+
+    Returns:
+        str: Lower-cased words without punctuation or filler words.
+    """
+    words = re.sub(r"[^a-z0-9]+", " ", text.lower()).split()
+    return " ".join(word for word in words if word not in FILLER_WORDS)
+
+class IntentMatcher:
+    """
+    Matches requests against all intents at once with a single compiled alternation.
+    """
+
+    def __init__(self, patterns: Optional[Dict[str, str]] = None):
+        """
+        Initialize the matcher.
+
+        Args:
+            patterns (Optional[Dict[str, str]], optional): Regular expression per intent name. Defaults to
+                                                           INTENT_PATTERNS.
+        """
+        patterns = patterns or INTENT_PATTERNS
+        self.intents = list(patterns)
+        self._regex = re.compile("|".join(f"(?P<{name}>{pattern})" for name, pattern in patterns.items()))
+
+    def match(self, text: str) -> Optional[str]:
+        """
+        Find the intent a request consists of.
+
+        Args:
+            text (str): The user's request.
+
+        Returns:
+            Optional[str]: The intent name, or None unless the whole request is one simple command.
+        """
+        match = self._regex.fullmatch(normalise_command(text))
+        return match.lastgroup if match else None
+
+def _system_info(system) -> str:
+    info = system.get_system_info()
+    return f"You are running {info['system']} {info['release']} on a {info['machine']} machine."
+
+def _cpu_usage(system) -> str:
+    return f"CPU usage is currently {system.get_cpu_usage():.1f} percent."
+
+def _memory_usage(system) -> str:
+    memory = system.get_memory_usage()
+    used_gb = memory["used"] / (1024**3)
+    total_gb = memory["total"] / (1024**3)
+    return f"Memory usage is {memory['percent']:.1f} percent. {used_gb:.1f} gigabytes used out of {total_gb:.1f} gigabytes total."
+
+def _disk_usage(system) -> str:
+    disk = system.get_disk_usage()
+    used_gb = disk["used"] / (1024**3)
+    total_gb = disk["total"] / (1024**3)
+    return f"Disk usage is {disk['percent']:.1f} percent. {used_gb:.1f} gigabytes used out of {total_gb:.1f} gigabytes total."
+
+def _battery(system) -> str:
+    battery = system.get_battery_status()
+    if not battery:
+        return "No battery information available."
+    status = "charging" if battery["power_plugged"] else "discharging"
+    return f"Battery is at {battery['percent']}% and {status}."
+
+def _screenshot(system) -> Optional[str]:
+    filename = f"screenshot_{time.strftime('%Y%m%d-%H%M%S')}.png"
+    save_path = os.path.join(os.path.expanduser("~"), "Pictures", filename)
+    os.makedirs(os.path.dirname(save_path), exist_ok=True)
+    if system.take_screenshot(save_path=save_path) is None:
+        return None
+    return f"Screenshot saved to {save_path}"
+
+HANDLERS: Dict[str, Callable[[Any], Optional[str]]] = {
+    "system_info": _system_info,
+    "cpu_usage": _cpu_usage,
+    "memory_usage": _memory_usage,
+    "disk_usage": _disk_usage,
+    "battery": _battery,
+    "screenshot": _screenshot,
+}
+
+def _create_system_control():
+    # system_control exits the interpreter when its GUI dependencies are missing
+    try:
+        from system_control import SystemControl
+        return SystemControl()
+    except (Exception, SystemExit) as e:
+        logger.warning(f"SystemControl unavailable, simple commands will be planned instead: {e}")
+        return None
+
+class FastPath:
+    """
+    Answers simple commands natively and keeps hit-rate and latency statistics.
+    """
+
+    def __init__(self, matcher: Optional[IntentMatcher] = None,
+                 system_factory: Callable[[], Any] = _create_system_control):
+        """
+        Initialize the fast path.
+
+        Args:
+            matcher (Optional[IntentMatcher], optional): The intent matcher. Defaults to one over INTENT_PATTERNS.
+            system_factory (Callable[[], Any], optional): Builds the SystemControl instance on first use;
+                                                          returning None disables the fast path.
+        """
+        self.matcher = matcher or IntentMatcher()
+        self.system_factory = system_factory
+        self._system = None
+        self._system_loaded = False
+        self._system_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._counters = {"requests": 0, "hits": 0, "fallbacks": 0}
+        self._latencies = []
+        self._intents: Dict[str, int] = {}
+
+    def match(self, text: str) -> Optional[str]:
+        """
+        Check whether a request can take the fast path.
+
+        Args:
+            text (str): The user's request.
+
+        Returns:
+            Optional[str]: The intent to run, or None.
+        """
+        intent = self.matcher.match(text)
+        with self._lock:
+            self._counters["requests"] += 1
+        return intent if intent in HANDLERS else None
+
+    def run(self, intent: str) -> Optional[str]:
+        """
+        Answer a matched intent with native calls. This blocks, so call it from a worker thread.
+
+        Args:
+            intent (str): The intent returned by match().
+
+        Returns:
+            Optional[str]: The response, or None if the command could not be handled natively and
+                           the request should be planned as usual.
+        """
+        start = time.perf_counter()
+        system = self._get_system()
+        response = None
+        if system is not None:
+            try:
+                response = HANDLERS[intent](system)
+            except Exception as e:
+                logger.error(f"Fast path for {intent} failed: {e}")
+        latency = time.perf_counter() - start
+
+        with self._lock:
+            if response is None:
+                self._counters["fallbacks"] += 1
+                return None
+            self._counters["hits"] += 1
+            self._intents[intent] = self._intents.get(intent, 0) + 1
+            self._latencies = (self._latencies + [latency])[-1000:]
+        logger.info(f"Fast path answered {intent} in {latency * 1000:.1f}ms")
+        return response
+
+    def _get_system(self):
+        """Build SystemControl once."""
+        with self._system_lock:
+            if not self._system_loaded:
+                self._system = self.system_factory()
+                self._system_loaded = True
+            return self._system
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get the fast path counters.
+
+        Returns:
+            Dict[str, Any]: Requests seen, hits, fallbacks, hit rate, hits per intent and average latency.
+        """
+        with self._lock:
+            stats = dict(self._counters)
+            stats["intents"] = dict(self._intents)
+            latencies = list(self._latencies)
+        stats["hit_rate"] = stats["hits"] / stats["requests"] if stats["requests"] else 0.0
+        stats["avg_latency"] = sum(latencies) / len(latencies) if latencies else None
+        return stats
+
+    def report(self) -> str:
+        """
+        Summarise the fast path in one line.
+
+        Returns:
+            str: Hits, hit rate and average latency.
+        """
+        stats = self.stats()
+        latency = f", avg {stats['avg_latency'] * 1000:.1f}ms" if stats["avg_latency"] is not None else ""
+        return f"Fast path: {stats['hits']}/{stats['requests']} requests ({stats['hit_rate']:.0%}){latency}"
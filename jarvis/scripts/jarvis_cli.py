@@ -7,6 +7,7 @@ Unified command-line interface for interacting with the JARVIS autonomous AI sys
 import asyncio
 from jarvis.scripts.autonomous_agent import JarvisAgent
 from jarvis.scripts.performance_dashboard import PerformanceDashboard
+from confirmation_broker import ConsoleConfirmations
 
 async def main():
     print("🤖 JARVIS Autonomous AI CLI")
@@ -14,12 +15,14 @@ async def main():
     print("=" * 50)
 
     agent = JarvisAgent()
+    # Reads stdin in the background, so confirmations can be answered while a request runs
+    console = ConsoleConfirmations(agent.confirmations)
     dashboard = PerformanceDashboard()
     dashboard.start()
 
     try:
         while True:
-            user_input = input("You: ").strip()
+            user_input = (await console.input("You: ")).strip()
             if user_input.lower() in ['exit', 'quit']:
                 print("JARVIS: Shutting down. Goodbye!")
                 break
@@ -30,7 +33,7 @@ async def main():
             result = await agent.process_request(user_input)
             print(f"\\n🤖 JARVIS: {result}\\n")
 
-    except KeyboardInterrupt:
+    except (KeyboardInterrupt, EOFError):
         print("\\nJARVIS: Interrupted. Exiting...")
 
     finally:
@@ -0,0 +1,95 @@
+"""
+Ollama Stand-In
+A local HTTP server that answers the parts of the Ollama API the tests use: /api/tags, and
+/api/generate and /api/chat with and without streaming. It records every request body.
+"""
+
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class OllamaStandIn:
+    """A local Ollama endpoint that replies with a fixed list of words"""
+
+    def __init__(self, words=("Hello", " there", " friend"), delay=0.0, models=("deepseek-r1:8b",)):
+        """
+        Args:
+            words: The reply, one streamed chunk per word
+            delay: Seconds before each chunk
+            models: Model names reported by /api/tags
+        """
+        self.words = list(words)
+        self.delay = delay
+        self.models = list(models)
+        self.requests = []  # (path, body)
+        self.failing = set()  # prompts, or last chat messages, answered with an error
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                self.reply({"models": [{"name": name} for name in server.models]})
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                server.requests.append((self.path, body))
+                number = len(server.requests)
+                if server.text_of(body) in server.failing:
+                    self.reply({"error": "model crashed"}, status=500)
+                    return
+                if not body.get("stream", True):
+                    time.sleep(server.delay * len(server.words))
+                    self.reply(server.chunk(self.path, "".join(server.words), True, number))
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.end_headers()
+                try:
+                    for index, word in enumerate(server.words):
+                        time.sleep(server.delay)
+                        chunk = server.chunk(self.path, word, index == len(server.words) - 1, number)
+                        self.wfile.write(json.dumps(chunk).encode() + b"\n")
+                        self.wfile.flush()
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # The client stopped reading
+
+            def reply(self, payload, status=200):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        threading.Thread(target=self.httpd.serve_forever, args=(0.05,), daemon=True).start()
+
+    def chunk(self, path, text, done, number):
+        """One response object; the final one carries the context and eval statistics"""
+        if path == "/api/chat":
+            chunk = {"message": {"role": "assistant", "content": text}, "done": done}
+        else:
+            chunk = {"response": text, "done": done}
+        if done:
+            chunk.update({"context": [number], "prompt_eval_count": 10, "prompt_eval_duration": 50_000_000,
+                          "eval_count": len(self.words), "eval_duration": 100_000_000})
+        return chunk
+
+    @staticmethod
+    def text_of(body):
+        """The prompt of a generate request or the last message of a chat request"""
+        if "messages" in body:
+            return body["messages"][-1]["content"] if body["messages"] else ""
+        return body.get("prompt", "")
+
+    def bodies(self, path="/api/generate"):
+        """The bodies of the requests sent to one endpoint"""
+        return [body for request_path, body in self.requests if request_path == path]
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -0,0 +1,70 @@
+import os
+import sys
+import time
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from deepseek_integration import DeepSeekIntegration
+from llm_scheduler import LLMScheduler, Priority
+from ollama_stand_in import OllamaStandIn
+
+class TestBatchGeneration(unittest.TestCase):
+    def setUp(self):
+        self.server = OllamaStandIn(delay=0.05)
+        self.scheduler = LLMScheduler(max_concurrent=4)
+        self.deepseek = DeepSeekIntegration(ollama_host=self.server.url, check_availability=False,
+                                            scheduler=self.scheduler, coalesce=False)
+
+    def tearDown(self):
+        self.deepseek.close()
+        self.server.stop()
+
+    def test_results_follow_prompt_order(self):
+        progress = []
+        prompts = [f"Prompt {index}" for index in range(8)]
+        batch = self.deepseek.generate_many(prompts, progress=lambda done, total: progress.append((done, total)))
+        self.assertEqual(batch.results, ["Hello there friend"] * 8)
+        self.assertEqual(sorted(body["prompt"] for body in self.server.bodies()), sorted(prompts))
+        self.assertEqual(progress, [(done, 8) for done in range(1, 9)])
+        self.assertEqual((batch.succeeded, batch.errors, batch.tokens), (8, {}, 24))
+
+    def test_prompts_run_in_parallel(self):
+        start = time.monotonic()
+        self.deepseek.generate_many([f"Prompt {index}" for index in range(4)])
+        # Each request takes about 0.15s on its own
+        self.assertLess(time.monotonic() - start, 0.45)
+
+    def test_failures_are_recorded_by_index(self):
+        self.server.failing = {"Prompt 1"}
+        batch = self.deepseek.generate_many(["Prompt 0", "Prompt 1", "Prompt 2"])
+        self.assertEqual(batch.results, ["Hello there friend", None, "Hello there friend"])
+        self.assertEqual(list(batch.errors), [1])
+        self.assertEqual(batch.succeeded, 2)
+
+    def test_batches_run_at_background_priority(self):
+        priorities = []
+        slot = self.scheduler.slot
+
+        def recording_slot(**kwargs):
+            priorities.append(kwargs.get("priority"))
+            return slot(**kwargs)
+
+        self.scheduler.slot = recording_slot
+        self.deepseek.generate_many(["Prompt 0", "Prompt 1"])
+        self.deepseek.generate_many(["Prompt 2"], priority=Priority.INTERACTIVE)
+        self.assertEqual(priorities, [Priority.BACKGROUND, Priority.BACKGROUND, Priority.INTERACTIVE])
+
+    def test_chat_many(self):
+        conversations = [[{"role": "user", "content": f"Question {index}"}] for index in range(3)]
+        batch = self.deepseek.chat_many(conversations, max_workers=2)
+        self.assertEqual([message["content"] for message in batch.results], ["Hello there friend"] * 3)
+        self.assertEqual(len(self.server.bodies("/api/chat")), 3)
+
+    def test_empty_batch(self):
+        batch = self.deepseek.generate_many([])
+        self.assertEqual((batch.results, batch.succeeded), ([], 0))
+        self.assertEqual(self.server.requests, [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+import os
+import sys
+import time
+import asyncio
+import threading
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+
+class Interrupted(BaseException):
+    """Stands in for KeyboardInterrupt without stopping the test run"""
+
+def fail():
+    raise ConnectionError("Connection refused")
+
+class TestCircuitBreaker(unittest.TestCase):
+    def open_breaker(self, **kwargs):
+        breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=0.05, **kwargs)
+        for _ in range(2):
+            with self.assertRaises(ConnectionError):
+                breaker.call(fail)
+        self.assertEqual(breaker.state, OPEN)
+        return breaker
+
+    def test_opens_after_consecutive_failures(self):
+        breaker = CircuitBreaker("test", failure_threshold=2)
+        with self.assertRaises(ConnectionError):
+            breaker.call(fail)
+        self.assertEqual(breaker.call(lambda: "ok"), "ok")
+        # A success resets the count, so two more failures are needed
+        with self.assertRaises(ConnectionError):
+            breaker.call(fail)
+        self.assertEqual(breaker.state, CLOSED)
+        with self.assertRaises(ConnectionError):
+            breaker.call(fail)
+        self.assertEqual(breaker.state, OPEN)
+
+        calls = []
+        with self.assertRaises(CircuitOpenError):
+            breaker.call(lambda: calls.append(1))
+        self.assertEqual(calls, [])
+        self.assertEqual(breaker.stats()["rejected"], 1)
+
+    def test_trial_call_closes_the_circuit(self):
+        breaker = self.open_breaker()
+        time.sleep(0.06)
+        self.assertEqual(breaker.call(lambda: "ok"), "ok")
+        self.assertEqual(breaker.state, CLOSED)
+
+    def test_failed_trial_reopens_the_circuit(self):
+        breaker = self.open_breaker()
+        time.sleep(0.06)
+        with self.assertRaises(ConnectionError):
+            breaker.call(fail)
+        self.assertEqual(breaker.state, OPEN)
+        with self.assertRaises(CircuitOpenError):
+            breaker.call(lambda: "ok")
+
+    def test_failed_health_probe_keeps_the_circuit_open(self):
+        breaker = self.open_breaker(probe=lambda: False)
+        time.sleep(0.06)
+        calls = []
+        with self.assertRaises(CircuitOpenError):
+            breaker.call(lambda: calls.append(1))
+        self.assertEqual(calls, [])
+        self.assertEqual(breaker.state, OPEN)
+
+    def test_only_one_caller_is_let_through_while_half_open(self):
+        breaker = self.open_breaker(probe=lambda: True)
+        time.sleep(0.06)
+        started = threading.Event()
+        release = threading.Event()
+
+        def trial():
+            started.set()
+            release.wait(5)
+            return "ok"
+
+        results = []
+        thread = threading.Thread(target=lambda: results.append(breaker.call(trial)))
+        thread.start()
+        started.wait(5)
+        self.assertEqual(breaker.state, HALF_OPEN)
+        for _ in range(3):
+            with self.assertRaises(CircuitOpenError):
+                breaker.call(lambda: "ok")
+
+        release.set()
+        thread.join(5)
+        self.assertEqual(results, ["ok"])
+        self.assertEqual(breaker.state, CLOSED)
+        self.assertEqual(breaker.call(lambda: "ok"), "ok")
+
+    def test_abandoned_trial_lets_the_next_caller_try(self):
+        breaker = self.open_breaker()
+        time.sleep(0.06)
+
+        def interrupted():
+            raise Interrupted()
+
+        with self.assertRaises(Interrupted):
+            breaker.call(interrupted)
+        self.assertEqual(breaker.call(lambda: "ok"), "ok")
+        self.assertEqual(breaker.state, CLOSED)
+
+    def test_cancelled_async_trial_is_released(self):
+        breaker = self.open_breaker()
+        time.sleep(0.06)
+
+        async def run():
+            async def slow():
+                await asyncio.sleep(5)
+
+            task = asyncio.create_task(breaker.acall(slow))
+            await asyncio.sleep(0.05)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+
+            async def ok():
+                return "ok"
+            return await breaker.acall(ok)
+
+        self.assertEqual(asyncio.run(run()), "ok")
+
+if __name__ == '__main__':
+    unittest.main()
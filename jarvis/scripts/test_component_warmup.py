@@ -0,0 +1,109 @@
+import os
+import sys
+import time
+import asyncio
+import threading
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from component_warmup import FAILED, PENDING, READY, ComponentWarmup
+
+class TestComponentWarmup(unittest.TestCase):
+    def test_components_load_in_the_background_in_order(self):
+        warmup = ComponentWarmup()
+        loaded = []
+        release = threading.Event()
+
+        def slow():
+            release.wait(5)
+            loaded.append("slow")
+            return "model"
+
+        warmup.add("slow", slow)
+        warmup.add("fast", lambda: loaded.append("fast") or "router")
+        self.assertEqual(warmup.status()["components"]["slow"]["state"], PENDING)
+        warmup.start()
+        # start() returns at once while the first component is still loading
+        self.assertFalse(warmup.status()["done"])
+        release.set()
+        self.assertEqual(warmup.get("fast", timeout=5), "router")
+        self.assertEqual(warmup.get("slow", timeout=5), "model")
+        self.assertEqual(loaded, ["slow", "fast"])
+        status = warmup.status()
+        self.assertTrue(status["done"])
+        self.assertEqual((status["ready"], status["total"]), (2, 2))
+        self.assertIn("slow", warmup.report())
+
+    def test_failed_component_raises_for_its_waiters_only(self):
+        warmup = ComponentWarmup()
+
+        def broken():
+            raise RuntimeError("CUDA out of memory")
+
+        warmup.add("broken", broken)
+        warmup.add("working", lambda: 42)
+        warmup.start()
+        with self.assertRaises(RuntimeError):
+            warmup.get("broken", timeout=5)
+        self.assertEqual(warmup.get("working", timeout=5), 42)
+        component = warmup.status()["components"]["broken"]
+        self.assertEqual((component["state"], component["error"]), (FAILED, "CUDA out of memory"))
+        self.assertEqual(warmup.status()["failed"], 1)
+
+    def test_get_starts_the_warmup(self):
+        warmup = ComponentWarmup()
+        warmup.add("router", lambda: "router")
+        self.assertEqual(warmup.get("router", timeout=5), "router")
+
+    def test_component_added_after_warmup_finished_is_loaded(self):
+        warmup = ComponentWarmup()
+        warmup.add("first", lambda: 1)
+        self.assertEqual(warmup.get("first", timeout=5), 1)
+        deadline = time.monotonic() + 5
+        while warmup._thread is not None and time.monotonic() < deadline:
+            time.sleep(0.01)
+        warmup.add("second", lambda: 2)
+        self.assertEqual(warmup.get("second", timeout=5), 2)
+        self.assertEqual(warmup.status()["components"]["second"]["state"], READY)
+
+    def test_duplicate_names_are_rejected(self):
+        warmup = ComponentWarmup()
+        warmup.add("router", lambda: None)
+        with self.assertRaises(ValueError):
+            warmup.add("router", lambda: None)
+
+    def test_wait_does_not_block_the_event_loop(self):
+        warmup = ComponentWarmup()
+        release = threading.Event()
+        warmup.add("model", lambda: release.wait(5) and "model")
+
+        async def run():
+            ticks = 0
+            waiter = asyncio.create_task(warmup.wait("model", timeout=5))
+            while not waiter.done():
+                ticks += 1
+                if ticks == 3:
+                    release.set()
+                await asyncio.sleep(0.01)
+            return await waiter, ticks
+
+        value, ticks = asyncio.run(run())
+        self.assertEqual(value, "model")
+        self.assertGreaterEqual(ticks, 3)
+
+    def test_cancelled_waiter_does_not_cancel_the_load(self):
+        warmup = ComponentWarmup()
+        release = threading.Event()
+        warmup.add("model", lambda: release.wait(5) and "model")
+
+        async def run():
+            with self.assertRaises(asyncio.TimeoutError):
+                await warmup.wait("model", timeout=0.01)
+
+        asyncio.run(run())
+        release.set()
+        self.assertEqual(warmup.get("model", timeout=5), "model")
+
+if __name__ == '__main__':
+    unittest.main()
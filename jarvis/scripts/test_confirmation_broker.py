@@ -0,0 +1,107 @@
+import os
+import sys
+import asyncio
+import threading
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from confirmation_broker import APPROVED, DENIED, TIMED_OUT, UNATTENDED, ConfirmationBroker
+
+class TestConfirmationBroker(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.broker = ConfirmationBroker(default_timeout=5)
+        self.requests = []
+        self.resolved = []
+        self.broker.attach(self.requests.append, self.resolved.append)
+
+    async def pending(self, count):
+        while len(self.broker.pending()) < count:
+            await asyncio.sleep(0.001)
+
+    async def test_approve(self):
+        task = asyncio.create_task(self.broker.request("Delete temp files", ["rm -rf /tmp/cache"]))
+        await self.pending(1)
+        request = self.requests[0]
+        self.assertIn("rm -rf /tmp/cache", request.describe())
+        self.assertTrue(self.broker.resolve(request.request_id, approved=True))
+        self.assertTrue(await task)
+        self.assertEqual(request.decision, APPROVED)
+        self.assertEqual(self.resolved, [request])
+        self.assertEqual(self.broker.pending(), [])
+
+    async def test_deny(self):
+        task = asyncio.create_task(self.broker.request("Format disk", level="red"))
+        await self.pending(1)
+        self.broker.resolve(self.requests[0].request_id, approved=False)
+        self.assertFalse(await task)
+        self.assertEqual(self.requests[0].decision, DENIED)
+        # A decided request cannot be decided again
+        self.assertFalse(self.broker.resolve(self.requests[0].request_id, approved=True))
+
+    async def test_timeout_denies(self):
+        self.assertFalse(await self.broker.request("Reboot", timeout=0.02))
+        self.assertEqual(self.requests[0].decision, TIMED_OUT)
+        self.assertEqual(self.broker.stats()[TIMED_OUT], 1)
+        self.assertEqual(self.broker.pending(), [])
+
+    async def test_no_front_end_denies(self):
+        broker = ConfirmationBroker()
+        self.assertFalse(await broker.request("Reboot"))
+        self.assertEqual(broker.stats()[UNATTENDED], 1)
+
+    async def test_resolved_from_another_thread(self):
+        task = asyncio.create_task(self.broker.request("Install package"))
+        await self.pending(1)
+        thread = threading.Thread(target=self.broker.resolve, args=(self.requests[0].request_id, True))
+        thread.start()
+        self.assertTrue(await asyncio.wait_for(task, 5))
+        thread.join(5)
+
+    async def test_other_steps_keep_running_while_pending(self):
+        confirmation = asyncio.create_task(self.broker.request("Risky step"))
+        await self.pending(1)
+        ran = []
+
+        async def independent_step():
+            ran.append("step")
+
+        await asyncio.wait_for(independent_step(), 1)
+        self.assertEqual(ran, ["step"])
+        self.assertFalse(confirmation.done())
+        self.broker.resolve_many(False)
+        self.assertFalse(await confirmation)
+
+    async def test_answers(self):
+        tasks = [asyncio.create_task(self.broker.request(f"Step {index}")) for index in range(4)]
+        await self.pending(4)
+        ids = [request.request_id for request in self.requests]
+        self.assertIsNone(self.broker.answer("what is this?"))
+        # "yes" decides the oldest pending request
+        self.assertEqual(self.broker.answer("yes"), ids[:1])
+        self.assertEqual(self.broker.answer(f"no {ids[2]}"), [ids[2]])
+        self.assertEqual(self.broker.answer("Yes, all"), [ids[1], ids[3]])
+        self.assertEqual(await asyncio.gather(*tasks), [True, True, False, True])
+        self.assertEqual(self.broker.answer("yes"), [])
+
+    async def test_late_front_end_sees_pending_requests(self):
+        task = asyncio.create_task(self.broker.request("Risky step"))
+        await self.pending(1)
+        late = []
+        handle = self.broker.attach(late.append)
+        self.assertEqual([request.title for request in late], ["Risky step"])
+        self.broker.detach(handle)
+        self.broker.resolve_many(True)
+        self.assertTrue(await task)
+
+    async def test_cancelled_request_is_denied(self):
+        task = asyncio.create_task(self.broker.request("Risky step"))
+        await self.pending(1)
+        task.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await task
+        self.assertEqual(self.requests[0].decision, DENIED)
+        self.assertEqual(self.broker.pending(), [])
+
+if __name__ == '__main__':
+    unittest.main()
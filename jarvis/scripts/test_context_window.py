@@ -0,0 +1,81 @@
+import os
+import sys
+import time
+import threading
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from context_window import ContextWindowManager, estimate_message_tokens
+
+def message(role, index):
+    # 40 characters, i.e. 10 tokens plus the template overhead
+    return {"role": role, "content": f"{role} message {index}".ljust(40, ".")}
+
+MESSAGE_TOKENS = estimate_message_tokens(message("user", 0))
+
+class BlockingSummarizer:
+    """Summarizes only when released, so builds can run while a summary is in flight"""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.calls = []
+
+    def __call__(self, previous, messages):
+        self.calls.append(list(messages))
+        self.release.wait(5)
+        return f"summary of {len(messages)} messages"
+
+def conversation(turns, system=True):
+    history = [{"role": "system", "content": "Be brief"}] if system else []
+    for index in range(turns):
+        history.append(message("user", index))
+        history.append(message("assistant", index))
+    return history
+
+class TestContextWindow(unittest.TestCase):
+    def test_short_conversation_is_sent_verbatim(self):
+        summarizer = BlockingSummarizer()
+        manager = ContextWindowManager(summarizer, max_tokens=1000)
+        history = conversation(3)
+        self.assertEqual(manager.build(history), history)
+        self.assertEqual(summarizer.calls, [])
+
+    def test_messages_being_summarized_are_still_sent(self):
+        summarizer = BlockingSummarizer()
+        manager = ContextWindowManager(summarizer, max_tokens=MESSAGE_TOKENS * 10, keep_tokens=MESSAGE_TOKENS * 4)
+        history = conversation(4)
+        window = manager.build(history)
+        # Everything fits in max_tokens, so nothing is dropped while the older turns are summarized
+        self.assertEqual(window, history)
+        self.assertEqual(len(summarizer.calls), 1)
+        self.assertEqual(summarizer.calls[0], history[1:6])
+
+        # While the summary is in flight, newer turns push out only what exceeds max_tokens
+        history.extend([message("user", 4), message("assistant", 4)])
+        window = manager.build(history)
+        self.assertEqual(window, history[:1] + history[2:])
+        self.assertEqual(len(summarizer.calls), 1)
+
+        summarizer.release.set()
+        # Wait for the background thread to record the result
+        for _ in range(100):
+            if manager.summary:
+                break
+            time.sleep(0.01)
+        window = manager.build(history)
+        self.assertEqual(window[1]["content"], "Summary of the earlier conversation:\nsummary of 5 messages")
+        self.assertEqual(window[2:], history[6:])
+
+    def test_history_without_a_system_prompt(self):
+        summarizer = BlockingSummarizer()
+        summarizer.release.set()
+        manager = ContextWindowManager(summarizer, max_tokens=MESSAGE_TOKENS * 3, keep_tokens=MESSAGE_TOKENS * 2)
+        history = conversation(2, system=False)
+        window = manager.build(history)
+        self.assertEqual(window, history[1:])
+        # The first user message is summarized rather than kept as if it were the system prompt
+        self.assertEqual(summarizer.calls[0], history[:2])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,42 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from generation_options import (CALL_SITE_OPTIONS, CONTEXT_TOKENS, REASONING_TOKENS, GenerationOptions, options_for,
+                                prompt_budget)
+
+class TestGenerationOptions(unittest.TestCase):
+    def test_request_fields(self):
+        options = GenerationOptions(num_predict=64, temperature=0.1, keep_alive="10m", format="json")
+        self.assertEqual(options.to_request(), {"keep_alive": "10m", "format": "json",
+                                                "options": {"num_predict": 64, "temperature": 0.1}})
+        self.assertEqual(GenerationOptions().to_request(), {})
+
+    def test_from_kwargs(self):
+        options = GenerationOptions.from_kwargs({"max_tokens": 100, "temperature": 0.3, "stream": True})
+        self.assertEqual(options, GenerationOptions(num_predict=100, temperature=0.3))
+        # An explicit num_predict wins over the max_tokens alias
+        self.assertEqual(GenerationOptions.from_kwargs({"max_tokens": 100, "num_predict": 50}).num_predict, 50)
+
+    def test_merged_keeps_unset_fields(self):
+        merged = options_for("voice", GenerationOptions(temperature=0.1))
+        self.assertEqual(merged.temperature, 0.1)
+        self.assertEqual(merged.num_predict, CALL_SITE_OPTIONS["voice"].num_predict)
+        self.assertIs(options_for("voice").merged(None), CALL_SITE_OPTIONS["voice"])
+
+    def test_call_sites_share_the_context_window_and_leave_room_for_reasoning(self):
+        for call_site, options in CALL_SITE_OPTIONS.items():
+            with self.subTest(call_site=call_site):
+                self.assertEqual(options.num_ctx, CONTEXT_TOKENS)
+                self.assertGreater(options.num_predict, REASONING_TOKENS)
+                self.assertGreater(prompt_budget(call_site), 0)
+        self.assertEqual(prompt_budget("chat", margin=0), CONTEXT_TOKENS - CALL_SITE_OPTIONS["chat"].num_predict)
+
+    def test_unknown_call_site(self):
+        with self.assertRaises(ValueError):
+            options_for("poetry")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from deepseek_integration import DeepSeekIntegration, GenerationSession
+from ollama_stand_in import OllamaStandIn
+
+class TestGenerationSession(unittest.TestCase):
+    def setUp(self):
+        self.server = OllamaStandIn(models=("deepseek-r1:8b", "llama3"))
+        self.deepseek = DeepSeekIntegration(ollama_host=self.server.url, check_availability=False)
+        self.session = GenerationSession(self.deepseek, system_prompt="Be brief.")
+
+    def tearDown(self):
+        self.deepseek.close()
+        self.server.stop()
+
+    def test_follow_up_turns_continue_from_the_context(self):
+        self.assertEqual(self.session.send("Hi"), "Hello there friend")
+        self.assertEqual("".join(self.session.stream("And then?")), "Hello there friend")
+        self.assertEqual(self.session.send("Thanks"), "Hello there friend")
+        first, second, third = self.server.bodies()
+        self.assertEqual((first["prompt"], first["system"]), ("Hi", "Be brief."))
+        self.assertNotIn("context", first)
+        # Only the new message is sent, together with the context of the turn before
+        self.assertEqual((second["prompt"], second["context"]), ("And then?", [1]))
+        self.assertEqual((third["prompt"], third["context"]), ("Thanks", [2]))
+        self.assertEqual(self.session.stats["continued"], 2)
+        self.assertEqual(self.session.stats["prompt_eval_count"], 30)
+
+    def test_conversation_is_resent_without_a_context(self):
+        self.session.send("Hi")
+        self.session.context = None
+        self.session.send("And then?")
+        body = self.server.bodies()[-1]
+        self.assertNotIn("context", body)
+        self.assertEqual(body["system"], "Be brief.")
+        self.assertEqual(body["prompt"], "User: Hi\nAssistant: Hello there friend\n\nUser: And then?\nAssistant:")
+        self.assertEqual(self.session.stats["full_resends"], 2)
+
+    def test_conversation_is_resent_after_a_model_switch(self):
+        self.session.send("Hi")
+        self.deepseek.model_name = "llama3"
+        self.session.send("And then?")
+        body = self.server.bodies()[-1]
+        self.assertEqual(body["model"], "llama3")
+        self.assertNotIn("context", body)
+        self.assertIn("User: Hi\nAssistant: Hello there friend", body["prompt"])
+        # The new model's context is used from then on
+        self.session.send("Thanks")
+        self.assertEqual(self.server.bodies()[-1]["context"], [2])
+
+    def test_reset_starts_a_new_conversation(self):
+        self.session.send("Hi")
+        self.session.reset()
+        self.session.send("Hello again")
+        body = self.server.bodies()[-1]
+        self.assertEqual(body["prompt"], "Hello again")
+        self.assertNotIn("context", body)
+
+if __name__ == '__main__':
+    unittest.main()
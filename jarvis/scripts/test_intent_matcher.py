@@ -0,0 +1,85 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from intent_matcher import FastPath, IntentMatcher, normalise_command
+
+class StandInSystem:
+    def __init__(self):
+        self.screenshots = []
+
+    def get_cpu_usage(self):
+        return 12.5
+
+    def get_battery_status(self):
+        return {"percent": 80, "power_plugged": True}
+
+    def take_screenshot(self, save_path):
+        self.screenshots.append(save_path)
+        return save_path
+
+class BrokenSystem:
+    def get_cpu_usage(self):
+        raise OSError("psutil failed")
+
+class TestIntentMatcher(unittest.TestCase):
+    def setUp(self):
+        self.matcher = IntentMatcher()
+
+    def test_normalise_command(self):
+        self.assertEqual(normalise_command("Jarvis, what's my current CPU usage right now?"), "cpu usage")
+
+    def test_simple_commands(self):
+        cases = {
+            "What is my current CPU usage right now?": "cpu_usage",
+            "processor load": "cpu_usage",
+            "How much free memory": "memory_usage",
+            "ram usage please": "memory_usage",
+            "free disk space": "disk_usage",
+            "Jarvis, what is the battery level?": "battery",
+            "show me the system info": "system_info",
+            "Take a screenshot": "screenshot",
+            "Take a screenshot and save it in Pictures folder": "screenshot",
+        }
+        for request, intent in cases.items():
+            with self.subTest(request=request):
+                self.assertEqual(self.matcher.match(request), intent)
+
+    def test_anything_more_than_the_bare_command_is_planned(self):
+        for request in ("cpu usage over the last hour", "what is the cpu usage of chrome",
+                        "plot memory usage as a chart", "take a screenshot of the browser window",
+                        "what is a screenshot", "what is a battery", "how to get system information",
+                        "delete the screenshot", "battery charging"):
+            with self.subTest(request=request):
+                self.assertIsNone(self.matcher.match(request))
+
+class TestFastPath(unittest.TestCase):
+    def test_matched_intent_is_answered_natively(self):
+        system = StandInSystem()
+        fast_path = FastPath(system_factory=lambda: system)
+        intent = fast_path.match("cpu usage")
+        self.assertEqual(fast_path.run(intent), "CPU usage is currently 12.5 percent.")
+        self.assertEqual(fast_path.run(fast_path.match("battery")), "Battery is at 80% and charging.")
+        self.assertIsNone(fast_path.match("cpu usage over the last hour"))
+        stats = fast_path.stats()
+        self.assertEqual((stats["requests"], stats["hits"], stats["hit_rate"]), (3, 2, 2 / 3))
+        self.assertEqual(stats["intents"], {"cpu_usage": 1, "battery": 1})
+
+    def test_failures_fall_back_to_planning(self):
+        fast_path = FastPath(system_factory=lambda: BrokenSystem())
+        self.assertIsNone(fast_path.run(fast_path.match("cpu usage")))
+        unavailable = FastPath(system_factory=lambda: None)
+        self.assertIsNone(unavailable.run(unavailable.match("cpu usage")))
+        self.assertEqual(fast_path.stats()["fallbacks"], 1)
+
+    def test_system_control_is_built_once(self):
+        built = []
+        fast_path = FastPath(system_factory=lambda: built.append(1) or StandInSystem())
+        fast_path.run("cpu_usage")
+        fast_path.run("cpu_usage")
+        self.assertEqual(built, [1])
+
+if __name__ == '__main__':
+    unittest.main()
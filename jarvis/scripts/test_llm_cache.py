@@ -0,0 +1,99 @@
+import os
+import sys
+import time
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from deepseek_integration import DeepSeekIntegration
+from llm_cache import ResponseCache
+from ollama_stand_in import OllamaStandIn
+
+class TestResponseCache(unittest.TestCase):
+    def test_key_depends_on_every_part_of_the_request(self):
+        key = ResponseCache.make_key("generate", "deepseek-r1:8b", "Hi", {"temperature": 0})
+        self.assertEqual(key, ResponseCache.make_key("generate", "deepseek-r1:8b", "Hi", {"temperature": 0}))
+        for other in (ResponseCache.make_key("chat", "deepseek-r1:8b", "Hi", {"temperature": 0}),
+                      ResponseCache.make_key("generate", "llama3", "Hi", {"temperature": 0}),
+                      ResponseCache.make_key("generate", "deepseek-r1:8b", "Hello", {"temperature": 0}),
+                      ResponseCache.make_key("generate", "deepseek-r1:8b", "Hi", {"temperature": 0, "seed": 1})):
+            self.assertNotEqual(key, other)
+
+    def test_only_deterministic_options_are_cacheable(self):
+        self.assertTrue(ResponseCache.is_deterministic({"temperature": 0}))
+        self.assertTrue(ResponseCache.is_deterministic({"temperature": 0.7, "seed": 42}))
+        self.assertFalse(ResponseCache.is_deterministic({"temperature": 0.7}))
+        self.assertFalse(ResponseCache.is_deterministic({}))
+
+    def test_memory_tier_evicts_the_least_recently_used(self):
+        cache = ResponseCache(max_entries=2, db_path=None)
+        cache.set("a", "A")
+        cache.set("b", "B")
+        self.assertEqual(cache.get("a"), "A")
+        cache.set("c", "C")
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual((cache.get("a"), cache.get("c")), ("A", "C"))
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_expired_responses_are_misses(self):
+        cache = ResponseCache(ttl_seconds=0.05, db_path=None)
+        cache.set("a", "A")
+        self.assertEqual(cache.get("a"), "A")
+        time.sleep(0.1)
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.stats()["hit_rate"], 0.5)
+
+    def test_sqlite_tier_survives_a_restart(self):
+        with tempfile.TemporaryDirectory() as directory:
+            db_path = os.path.join(directory, "cache.db")
+            cache = ResponseCache(db_path=db_path)
+            cache.set("a", {"response": "A"})
+            cache.close()
+
+            reopened = ResponseCache(db_path=db_path)
+            self.assertEqual(reopened.get("a"), {"response": "A"})
+            self.assertEqual(reopened.stats()["disk_hits"], 1)
+            # The disk hit is promoted to the memory tier
+            self.assertEqual(reopened.get("a"), {"response": "A"})
+            self.assertEqual(reopened.stats()["memory_hits"], 1)
+            reopened.close()
+
+    def test_sqlite_tier_evicts_over_its_size_limit(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = ResponseCache(max_entries=1, db_path=os.path.join(directory, "cache.db"), max_disk_entries=2)
+            for key in ("a", "b", "c"):
+                cache.set(key, key.upper())
+                time.sleep(0.01)
+            self.assertIsNone(cache.get("a"))
+            self.assertEqual((cache.get("b"), cache.get("c")), ("B", "C"))
+            cache.close()
+
+class TestDeterminismGate(unittest.TestCase):
+    def setUp(self):
+        self.server = OllamaStandIn()
+        self.deepseek = DeepSeekIntegration(ollama_host=self.server.url, check_availability=False,
+                                            cache=ResponseCache(db_path=None))
+
+    def tearDown(self):
+        self.deepseek.close()
+        self.server.stop()
+
+    def test_deterministic_requests_are_served_from_the_cache(self):
+        for _ in range(2):
+            self.assertEqual(self.deepseek.generate("Hi", temperature=0), "Hello there friend")
+        self.assertEqual(len(self.server.bodies()), 1)
+
+    def test_sampled_requests_are_not_cached(self):
+        for _ in range(2):
+            self.assertEqual(self.deepseek.generate("Hi", temperature=0.7), "Hello there friend")
+        self.assertEqual(len(self.server.bodies()), 2)
+
+    def test_use_cache_overrides_the_gate(self):
+        for _ in range(2):
+            self.deepseek.generate("Hi", temperature=0.7, use_cache=True)
+            self.deepseek.generate("Hello", temperature=0, use_cache=False)
+        self.assertEqual([body["prompt"] for body in self.server.bodies()], ["Hi", "Hello", "Hello"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from llm_metrics import MetricsRegistry, percentile
+
+RESPONSE = {"load_duration": 500_000_000, "prompt_eval_count": 20, "prompt_eval_duration": 100_000_000,
+            "eval_count": 40, "eval_duration": 2_000_000_000, "total_duration": 2_600_000_000}
+
+class TestPercentile(unittest.TestCase):
+    def test_interpolates_between_ranks(self):
+        values = [1.0, 2.0, 3.0, 4.0, 5.0]
+        self.assertEqual(percentile(values, 0), 1.0)
+        self.assertEqual(percentile(values, 50), 3.0)
+        self.assertEqual(percentile(values, 100), 5.0)
+        self.assertAlmostEqual(percentile(values, 90), 4.6)
+        self.assertAlmostEqual(percentile([1.0, 2.0], 50), 1.5)
+
+    def test_edge_cases(self):
+        self.assertEqual(percentile([], 50), 0.0)
+        self.assertEqual(percentile([7.0], 99), 7.0)
+
+class TestMetricsRegistry(unittest.TestCase):
+    def test_summary_percentiles(self):
+        metrics = MetricsRegistry()
+        for value in range(1, 101):
+            metrics.observe("ttft_seconds", float(value), "voice")
+        summary = metrics.summary()["voice"]["ttft_seconds"]
+        self.assertEqual((summary["count"], summary["mean"], summary["max"]), (100, 50.5, 100.0))
+        self.assertAlmostEqual(summary["p50"], 50.5)
+        self.assertAlmostEqual(summary["p90"], 90.1)
+        self.assertAlmostEqual(summary["p99"], 99.01)
+
+    def test_samples_are_kept_per_call_site_within_the_window(self):
+        metrics = MetricsRegistry(window=3)
+        for value in (100.0, 1.0, 2.0, 3.0):
+            metrics.observe("queue_seconds", value, "planning")
+        metrics.observe("queue_seconds", 50.0, "voice")
+        self.assertEqual(metrics.summary("planning")["planning"]["queue_seconds"]["max"], 3.0)
+        self.assertEqual(set(metrics.summary()), {"planning", "voice"})
+        self.assertEqual(set(metrics.summary("voice")), {"voice"})
+
+    def test_record_response(self):
+        metrics = MetricsRegistry()
+        metrics.record_response("chat", RESPONSE, queue_time=0.25)
+        summary = metrics.summary()["chat"]
+        self.assertAlmostEqual(summary["queue_seconds"]["p50"], 0.25)
+        # Without a measured TTFT, load plus prompt evaluation is used
+        self.assertAlmostEqual(summary["ttft_seconds"]["p50"], 0.6)
+        self.assertAlmostEqual(summary["load_seconds"]["p50"], 0.5)
+        self.assertAlmostEqual(summary["prompt_tokens_per_second"]["p50"], 200.0)
+        self.assertAlmostEqual(summary["generation_tokens_per_second"]["p50"], 20.0)
+        self.assertAlmostEqual(summary["total_seconds"]["p50"], 2.6)
+        self.assertNotIn("visible_ttft_seconds", summary)
+
+    def test_measured_ttft_wins(self):
+        metrics = MetricsRegistry()
+        metrics.record_response(None, RESPONSE, ttft=0.1, visible_ttft=1.5)
+        summary = metrics.summary()["default"]
+        self.assertAlmostEqual(summary["ttft_seconds"]["p50"], 0.1)
+        self.assertAlmostEqual(summary["visible_ttft_seconds"]["p50"], 1.5)
+
+    def test_report_and_reset(self):
+        metrics = MetricsRegistry()
+        metrics.record_response("voice", RESPONSE)
+        report = metrics.report()
+        self.assertTrue(report.startswith("voice:"))
+        self.assertIn("generation_tokens_per_second", report)
+        metrics.reset()
+        self.assertEqual(metrics.summary(), {})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,135 @@
+import os
+import sys
+import json
+import time
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from generation_options import GenerationOptions
+from llm_router import CHAT, CLASSIFICATION, DEFAULT_ROUTES, LLMBackend, LLMRouter, NoBackendAvailable, OpenAIBackend
+from llm_scheduler import RequestCancelled
+
+class StandInServer:
+    """A local OpenAI-compatible chat completions endpoint"""
+
+    def __init__(self, reply="Hello", status=200, delay=0.0):
+        self.reply = reply
+        self.status = status
+        self.delay = delay
+        self.requests = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                server.requests.append((self.path, body))
+                time.sleep(server.delay)
+                payload = json.dumps({"choices": [{"message": {"role": "assistant", "content": server.reply}}]})
+                self.send_response(server.status)
+                self.send_header("Content-Type", "application/json")
+                self.end_headers()
+                self.wfile.write(payload.encode())
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}/v1"
+        threading.Thread(target=self.httpd.serve_forever, args=(0.05,), daemon=True).start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+def make_backend(name, server):
+    backend = OpenAIBackend(model_name="stand-in", base_url=server.url, timeout=5)
+    backend.name = name
+    return backend
+
+class CancelledBackend(LLMBackend):
+    name = "cancelled"
+
+    def generate(self, prompt, options):
+        raise RequestCancelled("Request was superseded")
+
+class TestLLMRouter(unittest.TestCase):
+    def setUp(self):
+        self.servers = []
+
+    def tearDown(self):
+        for server in self.servers:
+            server.close()
+
+    def server(self, **kwargs):
+        server = StandInServer(**kwargs)
+        self.servers.append(server)
+        return server
+
+    def test_chat_is_sent_to_the_stand_in(self):
+        server = self.server(reply="  Hi there  ")
+        router = LLMRouter([make_backend("local", server)], routes={CHAT: ["local"]})
+        messages = [{"role": "system", "content": "Be brief"}, {"role": "user", "content": "Hello"}]
+        result = router.chat(messages, options=GenerationOptions(num_predict=32, temperature=0.1))
+        self.assertEqual(result.text, "Hi there")
+        self.assertEqual(result.backend, "local")
+        path, body = server.requests[0]
+        self.assertEqual(path, "/v1/chat/completions")
+        self.assertEqual(body["messages"], messages)
+        self.assertEqual(body["max_tokens"], 32)
+        self.assertEqual(body["temperature"], 0.1)
+
+    def test_ranking_prefers_the_faster_backend(self):
+        slow = make_backend("slow", self.server(reply="slow", delay=0.3))
+        fast = make_backend("fast", self.server(reply="fast"))
+        router = LLMRouter([slow, fast], routes={CHAT: ["slow", "fast"], "slow_only": ["slow"], "fast_only": ["fast"]})
+        # With no latency history the preference order decides
+        self.assertEqual(router.rank(CHAT), ["slow", "fast"])
+        router.generate("warm up", request_class="slow_only")
+        router.generate("warm up", request_class="fast_only")
+        self.assertEqual(router.rank(CHAT), ["fast", "slow"])
+        self.assertEqual(router.generate("Hello", request_class=CHAT).backend, "fast")
+
+    def test_falls_back_when_a_backend_fails(self):
+        broken = make_backend("broken", self.server(status=500))
+        working = make_backend("working", self.server(reply="ok"))
+        router = LLMRouter([broken, working], routes={CHAT: ["broken", "working"]})
+        result = router.generate("Hello", request_class=CHAT)
+        self.assertEqual((result.text, result.backend, result.attempts), ("ok", "working", 2))
+        self.assertEqual(router.stats()["broken"]["failures"], 1)
+
+    def test_failed_backend_is_skipped_until_the_cooldown_ends(self):
+        server = self.server(status=500)
+        router = LLMRouter([make_backend("flaky", server)], routes={CHAT: ["flaky"]}, down_cooldown=0.2)
+        with self.assertRaises(NoBackendAvailable):
+            router.generate("Hello", request_class=CHAT)
+        self.assertTrue(router.stats()["flaky"]["down"])
+        self.assertEqual(router.rank(CHAT), [])
+        server.status = 200
+        with self.assertRaises(NoBackendAvailable):
+            router.generate("Hello", request_class=CHAT)
+        self.assertEqual(len(server.requests), 1)
+
+        time.sleep(0.25)
+        self.assertEqual(router.rank(CHAT), ["flaky"])
+        self.assertEqual(router.generate("Hello", request_class=CHAT).backend, "flaky")
+
+    def test_cancelled_request_is_not_a_backend_failure(self):
+        fallback = make_backend("fallback", self.server())
+        router = LLMRouter([CancelledBackend(), fallback], routes={CHAT: ["cancelled", "fallback"]})
+        with self.assertRaises(RequestCancelled):
+            router.generate("Hello", request_class=CHAT)
+        self.assertFalse(router.stats()["cancelled"]["down"])
+        self.assertEqual(router.stats()["cancelled"]["in_flight"], 0)
+        self.assertEqual(self.servers[0].requests, [])
+
+    def test_gpt2_only_serves_classification(self):
+        self.assertIn("gpt2", DEFAULT_ROUTES[CLASSIFICATION])
+        for request_class, route in DEFAULT_ROUTES.items():
+            if request_class != CLASSIFICATION:
+                self.assertNotIn("gpt2", route, request_class)
+
+if __name__ == '__main__':
+    unittest.main()
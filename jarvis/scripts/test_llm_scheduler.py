@@ -0,0 +1,108 @@
+import os
+import sys
+import time
+import asyncio
+import threading
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from llm_scheduler import LLMScheduler, Priority, RequestCancelled
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.005)
+
+class TestLLMScheduler(unittest.TestCase):
+    def setUp(self):
+        self.scheduler = LLMScheduler(max_concurrent=1)
+        self.order = []
+        self.errors = []
+        self.threads = []
+
+    def tearDown(self):
+        for thread in self.threads:
+            thread.join(5)
+
+    def request(self, name, priority=Priority.INTERACTIVE, session=None, supersede=False):
+        def run():
+            try:
+                with self.scheduler.slot(priority, session=session, supersede=supersede):
+                    self.order.append(name)
+            except RequestCancelled:
+                self.errors.append(name)
+
+        thread = threading.Thread(target=run)
+        thread.start()
+        self.threads.append(thread)
+        return thread
+
+    def queued(self):
+        return self.scheduler.stats()["queued"]
+
+    def test_higher_priority_is_admitted_first(self):
+        with self.scheduler.slot(Priority.BACKGROUND):
+            self.request("background", Priority.BACKGROUND)
+            wait_until(lambda: self.queued() == 1)
+            self.request("planning", Priority.PLANNING)
+            wait_until(lambda: self.queued() == 2)
+            self.request("interactive", Priority.INTERACTIVE)
+            wait_until(lambda: self.queued() == 3)
+        for thread in self.threads:
+            thread.join(5)
+        self.assertEqual(self.order, ["interactive", "planning", "background"])
+
+    def test_same_priority_is_first_in_first_out(self):
+        with self.scheduler.slot():
+            for name in ("first", "second", "third"):
+                self.request(name)
+                wait_until(lambda: self.queued() == len(self.threads))
+        for thread in self.threads:
+            thread.join(5)
+        self.assertEqual(self.order, ["first", "second", "third"])
+
+    def test_supersede_cancels_the_sessions_queued_request(self):
+        with self.scheduler.slot():
+            self.request("old", session="user")
+            self.request("other", session="someone else")
+            wait_until(lambda: self.queued() == 2)
+            self.request("new", session="user", supersede=True)
+            wait_until(lambda: self.errors == ["old"])
+        for thread in self.threads:
+            thread.join(5)
+        self.assertEqual(self.errors, ["old"])
+        self.assertEqual(sorted(self.order), ["new", "other"])
+        self.assertEqual(self.scheduler.stats()["interactive"]["cancelled"], 1)
+
+    def test_supersede_flags_the_sessions_running_request(self):
+        with self.scheduler.slot(session="user") as running:
+            self.assertFalse(running.cancelled.is_set())
+            self.request("new", session="user", supersede=True)
+            wait_until(running.cancelled.is_set)
+            self.assertTrue(running.cancelled.is_set())
+        for thread in self.threads:
+            thread.join(5)
+        self.assertEqual(self.order, ["new"])
+
+    def test_cancelled_async_waiter_gives_up_its_place(self):
+        async def run():
+            with self.scheduler.slot():
+                async def waiter():
+                    async with self.scheduler.aslot():
+                        self.order.append("cancelled")
+
+                task = asyncio.create_task(waiter())
+                await asyncio.sleep(0.01)
+                task.cancel()
+                with self.assertRaises(asyncio.CancelledError):
+                    await task
+            async with self.scheduler.aslot() as ticket:
+                return ticket.granted
+
+        self.assertTrue(asyncio.run(run()))
+        self.assertEqual(self.order, [])
+        self.assertEqual(self.scheduler.stats()["running"], 0)
+
+if __name__ == '__main__':
+    unittest.main()
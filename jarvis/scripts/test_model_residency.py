@@ -0,0 +1,40 @@
+import os
+import sys
+import unittest
+from unittest.mock import MagicMock
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from llm_scheduler import Priority
+from model_residency import ModelResidency
+
+class TestModelResidency(unittest.TestCase):
+    def setUp(self):
+        self.deepseek = MagicMock()
+        self.deepseek.model_name = "deepseek-r1:8b"
+        self.residency = ModelResidency(self.deepseek, keep_alive="10m")
+
+    def test_warm_up_is_a_background_request(self):
+        self.deepseek.generate_turn.return_value = {"response": "", "load_duration": 2_000_000_000}
+        self.assertIsNotNone(self.residency.warm_up())
+        self.deepseek.generate_turn.assert_called_once_with("", keep_alive="10m", priority=Priority.BACKGROUND)
+        self.assertEqual(self.residency.metrics["ollama_load_seconds"], 2.0)
+
+    def test_failed_refresh_is_not_counted(self):
+        self.deepseek.generate_turn.return_value = None
+        self.assertFalse(self.residency.refresh())
+        self.deepseek.generate_turn.side_effect = RuntimeError("Circuit open")
+        self.assertFalse(self.residency.refresh())
+        self.assertEqual(self.residency.metrics["refreshes"], 0)
+
+    def test_ttft_is_measured_through_the_integration(self):
+        stream = MagicMock()
+        stream.__iter__.return_value = iter(["<think>"])
+        self.deepseek.iter_generate.return_value = stream
+        self.assertIsNotNone(self.residency.measure_ttft())
+        kwargs = self.deepseek.iter_generate.call_args.kwargs
+        self.assertEqual((kwargs["priority"], kwargs["num_predict"]), (Priority.BACKGROUND, 1))
+        stream.close.assert_called_once()
+
+if __name__ == '__main__':
+    unittest.main()
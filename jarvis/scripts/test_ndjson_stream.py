@@ -0,0 +1,97 @@
+import os
+import sys
+import json
+import time
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from ndjson_stream import NDJSONDecoder, TokenBatcher, batch_tokens, iter_ndjson
+
+CHUNKS = [{"response": "Hel", "done": False}, {"response": "lo é世", "done": False},
+          {"response": "", "done": True, "eval_count": 3}]
+PAYLOAD = b"".join(json.dumps(chunk, ensure_ascii=False).encode("utf-8") + b"\n" for chunk in CHUNKS)
+
+def slow_tokens(tokens, delays, events=None):
+    try:
+        for token, delay in zip(tokens, delays):
+            time.sleep(delay)
+            yield token
+    finally:
+        if events is not None:
+            events.append("closed")
+
+class TestNDJSONDecoder(unittest.TestCase):
+    def test_split_at_every_byte(self):
+        for split in range(1, len(PAYLOAD)):
+            with self.subTest(split=split):
+                self.assertEqual(list(iter_ndjson([PAYLOAD[:split], PAYLOAD[split:]])), CHUNKS)
+
+    def test_unterminated_last_line(self):
+        decoder = NDJSONDecoder()
+        self.assertEqual(decoder.feed(b'{"a": 1}\n{"b"'), [{"a": 1}])
+        self.assertEqual(decoder.feed(b': 2}'), [])
+        self.assertEqual(decoder.close(), [{"b": 2}])
+        self.assertEqual(decoder.close(), [])
+
+    def test_invalid_lines(self):
+        errors = []
+        decoder = NDJSONDecoder(on_error=lambda line, e: errors.append(line))
+        self.assertEqual(decoder.feed(b'{"a": 1}\nnot json\n\n{"b": 2}\n'), [{"a": 1}, {"b": 2}])
+        self.assertEqual(errors, [b"not json"])
+        with self.assertRaises(ValueError):
+            NDJSONDecoder().feed(b"not json\n")
+
+class TestTokenBatcher(unittest.TestCase):
+    def test_first_token_is_emitted_at_once(self):
+        batcher = TokenBatcher(flush_interval=10)
+        self.assertIsNone(batcher.time_to_flush())
+        self.assertEqual(batcher.add("a"), "a")
+        self.assertIsNone(batcher.add("b"))
+        self.assertIsNone(batcher.add("c"))
+        self.assertGreater(batcher.time_to_flush(), 9)
+        self.assertEqual(batcher.flush(), "bc")
+        self.assertIsNone(batcher.flush())
+
+    def test_tokens_are_batched(self):
+        tokens = [str(index) for index in range(1000)]
+        chunks = list(batch_tokens(tokens, flush_interval=10))
+        self.assertEqual("".join(chunks), "".join(tokens))
+        self.assertEqual(chunks[0], "0")
+        self.assertLess(len(chunks), 10)
+
+    def test_pending_tokens_are_flushed_while_the_next_token_is_late(self):
+        start = time.monotonic()
+        received = []
+        for chunk in batch_tokens(slow_tokens(["a", "b", "c"], [0, 0, 0.5]), flush_interval=0.05):
+            received.append((chunk, time.monotonic() - start))
+        self.assertEqual([chunk for chunk, _ in received], ["a", "b", "c"])
+        # "b" goes out on its deadline rather than together with "c"
+        self.assertLess(received[1][1], 0.3)
+
+    def test_closing_stops_the_token_stream(self):
+        events = []
+        chunks = batch_tokens(slow_tokens(["a", "b", "c", "d"], [0, 0, 0.05, 0.05], events), flush_interval=0.01)
+        self.assertEqual(next(chunks), "a")
+        self.assertEqual(next(chunks), "b")
+        chunks.close()
+        deadline = time.monotonic() + 2
+        while not events and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(events, ["closed"])
+
+    def test_errors_reach_the_consumer(self):
+        def failing():
+            yield "a"
+            yield "b"
+            raise RuntimeError("connection reset")
+
+        with self.assertRaises(RuntimeError):
+            list(batch_tokens(failing(), flush_interval=0.05))
+
+    def test_zero_interval_passes_tokens_through(self):
+        self.assertEqual(list(batch_tokens(["a", "b"], flush_interval=0)), ["a", "b"])
+        self.assertEqual(list(batch_tokens([], flush_interval=0.05)), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+import unittest
+import asyncio
+from unittest.mock import MagicMock
+
+from autonomous_agent import ExecutionResult, JarvisAgent, SafetyLevel, TaskStep, TaskType
+from synthesis_policy import SynthesisPolicy
+
+def make_step(step_id, safety_level, dependencies=None):
+    return TaskStep(
+        step_id=step_id,
+        description=f"Step {step_id}",
+        task_type=TaskType.CODE_GENERATION,
+        blackbox_instructions="",
+        expected_output="",
+        safety_level=safety_level,
+        dependencies=dependencies or []
+    )
+
+class TestPlanAndExecute(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        # Only the parts plan_and_execute uses, without starting models or samplers
+        self.agent = JarvisAgent.__new__(JarvisAgent)
+        self.agent.hardware_monitor = MagicMock()
+        self.agent.hardware_monitor.headroom = MagicMock(return_value={"vram_gb": 3.5, "cpu_cores": 8})
+        self.plan = []
+        self.stream_error = None
+        self.agent.stream_execution_plan = self.stream_plan
+        self.agent.execute_step = self.execute_step
+
+    async def stream_plan(self, user_input):
+        for step in self.plan:
+            yield step
+        if self.stream_error is not None:
+            raise self.stream_error
+
+    async def execute_step(self, step):
+        await asyncio.sleep(0.01)
+        return ExecutionResult(success=True, output=f"output of step {step.step_id}")
+
+    async def test_results_follow_plan_order_when_a_step_is_held(self):
+        self.plan = [make_step(1, SafetyLevel.YELLOW), make_step(2, SafetyLevel.GREEN)]
+        plan, results, planning_time, truncated = await self.agent.plan_and_execute("Test input")
+        self.assertEqual([step.step_id for step in plan], [1, 2])
+        self.assertEqual([result.output for result in results], ["output of step 1", "output of step 2"])
+
+    async def test_held_step_dependencies_are_respected(self):
+        self.plan = [make_step(1, SafetyLevel.RED), make_step(2, SafetyLevel.GREEN, [1]), make_step(3, SafetyLevel.GREEN)]
+        plan, results, planning_time, truncated = await self.agent.plan_and_execute("Test input")
+        self.assertEqual([result.output for result in results],
+                         ["output of step 1", "output of step 2", "output of step 3"])
+
+    def test_steps_without_declared_dependencies_are_independent(self):
+        steps = self.agent.parse_plan_steps([{"step_id": 1}, {"step_id": 2}, {"step_id": 3, "dependencies": [1]}])
+        self.assertEqual([step.dependencies for step in steps], [[], [], [1]])
+
+    async def test_truncated_plan_is_reported(self):
+        self.plan = [make_step(1, SafetyLevel.GREEN)]
+        self.stream_error = ValueError("'bogus' is not a valid TaskType")
+        plan, results, planning_time, truncated = await self.agent.plan_and_execute("Test input")
+        self.assertEqual([result.output for result in results], ["output of step 1"])
+        self.assertIn("bogus", truncated)
+
+    def prepare_request(self):
+        self.agent.fast_path = MagicMock()
+        self.agent.fast_path.match = MagicMock(return_value=None)
+        self.agent.hardware_monitor.is_safe_to_proceed = MagicMock(return_value=(True, "OK"))
+        self.agent.plan_cache = MagicMock()
+        self.agent.plan_cache.lookup = MagicMock(return_value=None)
+        self.agent.pipelined_planning = True
+        self.agent.conversation_history = []
+
+    async def test_truncated_plan_is_not_cached(self):
+        self.plan = [make_step(1, SafetyLevel.GREEN)]
+        self.stream_error = ValueError("Stream ended early")
+        self.prepare_request()
+
+        async def synthesize_results(user_input, plan, results, on_sentence=None):
+            return "Done."
+        self.agent.synthesize_results = synthesize_results
+
+        result = await self.agent.process_request("Test input")
+        self.agent.plan_cache.store.assert_not_called()
+        self.assertIn("Planning stopped after 1 steps", result)
+
+    async def test_fallback_reply_follows_the_streamed_warning(self):
+        self.plan = [make_step(1, SafetyLevel.GREEN), make_step(2, SafetyLevel.GREEN)]
+        self.stream_error = ValueError("Stream ended early")
+        self.prepare_request()
+        self.agent.synthesis_policy = SynthesisPolicy()
+
+        async def stream_synthesis(messages):
+            raise ConnectionError("Ollama is down")
+            yield
+        self.agent.stream_synthesis = stream_synthesis
+
+        sentences = []
+        result = await self.agent.process_request("Test input", on_sentence=sentences.append)
+        self.assertEqual(len(sentences), 2)
+        self.assertIn("Planning stopped after 2 steps", sentences[0])
+        self.assertEqual(sentences[1], "Task completed. 2/2 steps executed successfully.")
+        self.assertEqual("".join(sentences), result)
+
+if __name__ == '__main__':
+    unittest.main()
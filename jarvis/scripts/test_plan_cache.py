@@ -0,0 +1,122 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from plan_cache import PlanCache, normalise_intent
+
+PLAN = [{"step_id": 1, "description": "Create report.txt in /tmp/reports", "dependencies": []},
+        {"step_id": 2, "description": "Write 5 lines to report.txt", "dependencies": [1]}]
+
+class TestPlanCache(unittest.TestCase):
+    def test_normalise_intent(self):
+        exact, template, values = normalise_intent('Please create "notes.md" in /tmp/work, Jarvis')
+        self.assertEqual(exact, "create notes md in tmp work")
+        self.assertEqual(template, "create <<p0>> in <<p1>>")
+        self.assertEqual(values, ["notes.md", "/tmp/work"])
+
+    def test_exact_request_reuses_the_plan(self):
+        cache = PlanCache(db_path=None)
+        self.assertIsNone(cache.lookup("Open the browser"))
+        cache.store("Open the browser", PLAN, planning_time=4.0)
+        match = cache.lookup("please open browser")
+        self.assertEqual(match.plan, PLAN)
+        self.assertEqual(match.planning_time, 4.0)
+        self.assertEqual(cache.stats()["hits"], 1)
+        self.assertEqual(cache.stats()["planning_time_saved"], 4.0)
+
+    def test_parameterised_plan_is_filled_in_for_new_values(self):
+        cache = PlanCache(db_path=None)
+        cache.store('Create "report.txt" in /tmp/reports with 5 lines', PLAN, planning_time=3.0)
+        match = cache.lookup('Create "summary.txt" in /home/me/docs with 12 lines')
+        self.assertIsNotNone(match)
+        self.assertEqual(match.plan[0]["description"], "Create summary.txt in /home/me/docs")
+        self.assertEqual(match.plan[1]["description"], "Write 12 lines to summary.txt")
+        # Numbers that are not request values are left alone
+        self.assertEqual(match.plan[1]["step_id"], 2)
+
+    def test_numbers_are_only_replaced_next_to_their_request_word(self):
+        cache = PlanCache(db_path=None)
+        plan = [{"description": "Open 3 browser tabs", "blackbox_instructions": "Use Python 3 and selenium"}]
+        cache.store("Open 3 tabs", plan, planning_time=1.0)
+        match = cache.lookup("Open 5 tabs")
+        self.assertEqual(match.plan, [{"description": "Open 5 browser tabs",
+                                       "blackbox_instructions": "Use Python 3 and selenium"}])
+
+    def test_only_parameter_fields_are_parameterised(self):
+        cache = PlanCache(db_path=None, parameter_fields=("description",))
+        plan = [{"description": "Copy /tmp/a to backup", "expected_output": "Files in /tmp/a are copied"}]
+        cache.store("Back up /tmp/a", plan, planning_time=1.0)
+        match = cache.lookup("Back up /srv/b")
+        self.assertEqual(match.plan[0]["description"], "Copy /srv/b to backup")
+        self.assertEqual(match.plan[0]["expected_output"], "Files in /tmp/a are copied")
+
+    def test_values_missing_from_the_plan_are_not_parameterised(self):
+        cache = PlanCache(db_path=None)
+        cache.store('Search for "python tutorials"', [{"description": "Search the web"}], planning_time=1.0)
+        self.assertIsNone(cache.lookup('Search for "rust tutorials"'))
+        self.assertIsNotNone(cache.lookup('Search for "python tutorials"'))
+
+    def test_failing_plan_stops_being_reused(self):
+        cache = PlanCache(db_path=None, min_confidence=0.6)
+        cache.store("Open the browser", PLAN, planning_time=1.0)
+        match = cache.lookup("Open the browser")
+        cache.record_outcome(match, success=True)
+        cache.record_outcome(match, success=False)
+        # 2 of 3 succeeded
+        self.assertIsNotNone(cache.lookup("Open the browser"))
+        cache.record_outcome(match, success=False)
+        self.assertIsNone(cache.lookup("Open the browser"))
+        self.assertEqual(cache.stats()["reuse_failures"], 2)
+
+        # A fresh successful plan replaces the failing one
+        cache.store("Open the browser", PLAN, planning_time=1.0)
+        self.assertIsNotNone(cache.lookup("Open the browser"))
+
+    def test_least_recently_used_plans_are_evicted(self):
+        cache = PlanCache(db_path=None, max_entries=2)
+        for request in ("Open the browser", "Close the browser", "Lock the screen"):
+            cache.store(request, PLAN, planning_time=1.0)
+        self.assertIsNone(cache.lookup("Open the browser"))
+        self.assertIsNotNone(cache.lookup("Lock the screen"))
+        self.assertEqual(cache.stats()["entries"], 2)
+
+    def test_plan_formats_are_kept_apart(self):
+        with tempfile.TemporaryDirectory() as directory:
+            db_path = os.path.join(directory, "memory.db")
+            master = PlanCache(db_path=db_path, validate=lambda plan: isinstance(plan, dict))
+            master.store("Open the browser", {"execution_plan": [{"step": 1}]}, planning_time=1.0)
+            agent = PlanCache(db_path=db_path, pattern_type="task_steps",
+                              validate=lambda plan: isinstance(plan, list))
+            self.assertIsNone(agent.lookup("Open the browser"))
+            agent.store("Open the browser", PLAN, planning_time=1.0)
+            self.assertEqual(agent.lookup("Open the browser").plan, PLAN)
+            self.assertEqual(master.lookup("Open the browser").plan, {"execution_plan": [{"step": 1}]})
+            master.close()
+            agent.close()
+
+    def test_plans_of_the_wrong_shape_are_dropped(self):
+        cache = PlanCache(db_path=None, validate=lambda plan: isinstance(plan, list))
+        cache.store("Open the browser", {"execution_plan": []}, planning_time=1.0)
+        self.assertIsNone(cache.lookup("Open the browser"))
+        self.assertEqual(cache.stats()["invalid"], 1)
+        self.assertEqual(cache.stats()["entries"], 0)
+
+    def test_plans_persist_in_the_database(self):
+        with tempfile.TemporaryDirectory() as directory:
+            db_path = os.path.join(directory, "memory.db")
+            cache = PlanCache(db_path=db_path)
+            cache.store("Open the browser", PLAN, planning_time=2.0)
+            cache.record_outcome(cache.lookup("Open the browser"), success=True)
+            cache.close()
+
+            reopened = PlanCache(db_path=db_path)
+            match = reopened.lookup("Open the browser")
+            self.assertEqual(match.plan, PLAN)
+            self.assertEqual(match.confidence, 1.0)
+            reopened.close()
+
+if __name__ == '__main__':
+    unittest.main()
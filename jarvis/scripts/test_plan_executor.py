@@ -0,0 +1,95 @@
+import os
+import sys
+import asyncio
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from plan_executor import PlanExecutor, PlanNode
+
+class TestPlanExecutor(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.events = []
+        self.failing = set()
+        self.raising = set()
+        self.delays = {}
+
+    async def execute(self, node):
+        self.events.append(("start", node.node_id))
+        await asyncio.sleep(self.delays.get(node.node_id, 0.01))
+        self.events.append(("end", node.node_id))
+        if node.node_id in self.raising:
+            raise RuntimeError(f"step {node.node_id} crashed")
+        return {"success": node.node_id not in self.failing}
+
+    def executor(self, **kwargs):
+        return PlanExecutor(self.execute, is_failure=lambda result: not result["success"], **kwargs)
+
+    def position(self, event):
+        return self.events.index(event)
+
+    async def test_dependencies_finish_before_dependents_start(self):
+        nodes = [PlanNode(1, "a"), PlanNode(2, "b", [1]), PlanNode(3, "c", [1, 2])]
+        outcomes = await self.executor().run(nodes)
+        self.assertEqual([outcome.node_id for outcome in outcomes], [1, 2, 3])
+        self.assertLess(self.position(("end", 1)), self.position(("start", 2)))
+        self.assertLess(self.position(("end", 2)), self.position(("start", 3)))
+
+    async def test_independent_steps_run_concurrently(self):
+        self.delays = {1: 0.05, 2: 0.01}
+        outcomes = await self.executor().run([PlanNode(1, "slow"), PlanNode(2, "fast"), PlanNode(3, "c", [2])])
+        # Step 3 only waits for step 2, not for the slow step 1
+        self.assertLess(self.position(("start", 3)), self.position(("end", 1)))
+        # Outcomes still follow plan order
+        self.assertEqual([outcome.node_id for outcome in outcomes], [1, 2, 3])
+
+    async def test_dependents_of_a_failed_step_are_skipped(self):
+        self.failing = {1}
+        self.raising = {4}
+        nodes = [PlanNode(1, "a"), PlanNode(2, "b", [1]), PlanNode(3, "c", [2]), PlanNode(4, "d"),
+                 PlanNode(5, "e", [4]), PlanNode(6, "f")]
+        outcomes = {outcome.node_id: outcome for outcome in await self.executor().run(nodes)}
+        self.assertFalse(outcomes[1].skipped)
+        self.assertEqual(outcomes[4].error, "step 4 crashed")
+        for node_id in (2, 3, 5):
+            self.assertTrue(outcomes[node_id].skipped)
+        self.assertIn("step 1", outcomes[2].error)
+        self.assertIn("step 2", outcomes[3].error)
+        self.assertTrue(outcomes[6].result["success"])
+        self.assertNotIn(("start", 2), self.events)
+
+    async def test_unresolvable_dependencies_are_skipped(self):
+        nodes = [PlanNode(1, "a", [99]), PlanNode(2, "b", [3]), PlanNode(3, "c", [2]), PlanNode(4, "d")]
+        outcomes = await self.executor().run(nodes)
+        self.assertEqual([outcome.skipped for outcome in outcomes], [True, True, True, False])
+        self.assertEqual(outcomes[0].error, "Unresolvable dependencies")
+
+    async def test_steps_wait_for_hardware_headroom(self):
+        nodes = [PlanNode(1, "a", requirements={"vram_gb": 3.0}), PlanNode(2, "b", requirements={"vram_gb": 3.0}),
+                 PlanNode(3, "c")]
+        executor = self.executor(headroom=lambda: {"vram_gb": 4.0, "cpu_cores": 8}, recheck_interval=0.01)
+        await executor.run(nodes)
+        # Both GPU steps cannot fit at once, but the step without requirements does not wait
+        self.assertLess(self.position(("end", 1)), self.position(("start", 2)))
+        self.assertLess(self.position(("start", 3)), self.position(("end", 1)))
+
+    async def test_max_concurrent(self):
+        executor = self.executor(max_concurrent=1)
+        await executor.run([PlanNode(1, "a"), PlanNode(2, "b")])
+        self.assertEqual(self.events, [("start", 1), ("end", 1), ("start", 2), ("end", 2)])
+
+    async def test_steps_added_while_running(self):
+        executor = self.executor()
+        executor.add_step(PlanNode(1, "a"))
+        join = asyncio.create_task(executor.join())
+        await asyncio.sleep(0.03)
+        self.assertIn(("end", 1), self.events)
+        executor.add_step(PlanNode(2, "b", [1]))
+        executor.close()
+        outcomes = await join
+        self.assertEqual([outcome.node_id for outcome in outcomes], [1, 2])
+        with self.assertRaises(RuntimeError):
+            executor.add_step(PlanNode(3, "c"))
+
+if __name__ == '__main__':
+    unittest.main()
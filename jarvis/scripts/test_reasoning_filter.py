@@ -0,0 +1,52 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from reasoning_filter import ReasoningFilter, filter_reasoning, strip_reasoning
+
+RESPONSE = "<think>The user wants a greeting.</think>\n\nHello there!"
+
+def run(chunks):
+    reasoning = []
+    visible = "".join(filter_reasoning(chunks, reasoning.append))
+    return visible, "".join(reasoning)
+
+class TestReasoningFilter(unittest.TestCase):
+    def test_complete_response(self):
+        reasoning = []
+        self.assertEqual(strip_reasoning(RESPONSE, reasoning.append), "Hello there!")
+        self.assertEqual(reasoning, ["The user wants a greeting."])
+        self.assertEqual(strip_reasoning("No reasoning here"), "No reasoning here")
+
+    def test_tags_split_at_every_position(self):
+        for split in range(1, len(RESPONSE)):
+            with self.subTest(split=split):
+                visible, reasoning = run([RESPONSE[:split], RESPONSE[split:]])
+                self.assertEqual(visible, "Hello there!")
+                self.assertEqual(reasoning, "The user wants a greeting.")
+
+    def test_one_character_chunks(self):
+        visible, reasoning = run(list(RESPONSE))
+        self.assertEqual(visible, "Hello there!")
+        self.assertEqual(reasoning, "The user wants a greeting.")
+
+    def test_partial_tag_is_held_until_decided(self):
+        reasoning = ReasoningFilter()
+        self.assertEqual(reasoning.feed("a <th"), "a ")
+        self.assertEqual(reasoning.feed("ing>"), "<thing>")
+        self.assertEqual(reasoning.feed(" <thi"), " ")
+        self.assertEqual(reasoning.close(), "<thi")
+
+    def test_unclosed_reasoning_is_not_shown(self):
+        visible, reasoning = run(["<think>Still thin", "king"])
+        self.assertEqual(visible, "")
+        self.assertEqual(reasoning, "Still thinking")
+
+    def test_text_before_reasoning_is_kept(self):
+        visible, _ = run(["Sure. <thi", "nk>hmm</th", "ink> Done."])
+        self.assertEqual(visible, "Sure. Done.")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import os
+import sys
+import time
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from resource_sampler import ResourceSampler
+
+class TestResourceSampler(unittest.TestCase):
+    def setUp(self):
+        self.readings = {"vram_used_gb": 1.5}
+        self.calls = 0
+        self.sampler = ResourceSampler(interval=0.02, readers={"vram_used_gb": self.read_vram})
+
+    def tearDown(self):
+        self.sampler.stop()
+
+    def read_vram(self):
+        self.calls += 1
+        value = self.readings["vram_used_gb"]
+        if isinstance(value, Exception):
+            raise value
+        return value
+
+    def wait_for_sample(self):
+        calls = self.calls
+        deadline = time.monotonic() + 2
+        while self.calls == calls and time.monotonic() < deadline:
+            time.sleep(0.005)
+        time.sleep(0.005)
+
+    def test_snapshot_has_every_reading(self):
+        snapshot = self.sampler.snapshot()
+        for key in ("cpu_percent", "ram_percent", "ram_used_gb", "vram_used_gb", "sampled_at"):
+            self.assertIn(key, snapshot)
+        self.assertEqual(snapshot["vram_used_gb"], 1.5)
+        self.assertGreaterEqual(snapshot["cpu_percent"], 0.0)
+
+    def test_snapshot_is_read_without_sampling(self):
+        self.sampler.start()
+        calls = self.calls
+        start = time.perf_counter()
+        for _ in range(1000):
+            self.sampler.snapshot()
+        self.assertLess(time.perf_counter() - start, 0.1)
+        self.assertLess(self.calls - calls, 10)
+
+    def test_background_thread_refreshes_the_snapshot(self):
+        self.sampler.start()
+        self.readings["vram_used_gb"] = 3.0
+        self.wait_for_sample()
+        self.assertEqual(self.sampler.snapshot()["vram_used_gb"], 3.0)
+        self.assertLess(self.sampler.age(), 1.0)
+
+    def test_failing_reader_keeps_its_previous_value(self):
+        self.sampler.start()
+        self.readings["vram_used_gb"] = RuntimeError("nvidia-smi failed")
+        self.wait_for_sample()
+        self.assertEqual(self.sampler.snapshot()["vram_used_gb"], 1.5)
+
+    def test_stop(self):
+        self.assertEqual(self.sampler.age(), float("inf"))
+        self.sampler.start()
+        self.sampler.stop()
+        calls = self.calls
+        time.sleep(0.1)
+        self.assertEqual(self.calls, calls)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,172 @@
+import os
+import sys
+import time
+import threading
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from deepseek_integration import DeepSeekIntegration
+from single_flight import SingleFlight, request_key
+from ollama_stand_in import OllamaStandIn
+
+class CountingStream:
+    """An underlying stream that records how far it has been read and whether it was closed"""
+
+    def __init__(self, count=10, error=None):
+        self.count = count
+        self.error = error
+        self.produced = 0
+        self.closed = False
+        self.started = 0
+
+    def __call__(self):
+        self.started += 1
+        return self.generate()
+
+    def generate(self):
+        try:
+            for index in range(self.count):
+                self.produced += 1
+                yield f"chunk{index}"
+            if self.error is not None:
+                raise self.error
+        finally:
+            self.closed = True
+
+class TestSingleFlight(unittest.TestCase):
+    def test_do_runs_concurrent_calls_once(self):
+        flight = SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def fn():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return "result"
+
+        results = []
+        leader = threading.Thread(target=lambda: results.append(flight.do("key", fn)))
+        leader.start()
+        started.wait(5)
+        follower = threading.Thread(target=lambda: results.append(flight.do("key", fn)))
+        follower.start()
+        time.sleep(0.05)
+        release.set()
+        leader.join(5)
+        follower.join(5)
+        self.assertEqual(results, ["result", "result"])
+        self.assertEqual(len(calls), 1)
+        self.assertEqual((flight.stats["executed"], flight.stats["coalesced"]), (1, 1))
+
+    def test_late_subscriber_replays_the_stream(self):
+        flight = SingleFlight()
+        source = CountingStream(count=5)
+        first = flight.stream("key", source)
+        self.assertEqual([next(first), next(first)], ["chunk0", "chunk1"])
+        second = flight.stream("key", source)
+        self.assertEqual(list(second), [f"chunk{index}" for index in range(5)])
+        self.assertEqual(list(first), ["chunk2", "chunk3", "chunk4"])
+        self.assertEqual(source.started, 1)
+        self.assertEqual(flight.stats["streams_joined"], 1)
+
+    def test_stream_is_read_only_as_fast_as_it_is_consumed(self):
+        flight = SingleFlight()
+        source = CountingStream(count=1000)
+        stream = flight.stream("key", source)
+        next(stream)
+        time.sleep(0.05)
+        self.assertEqual(source.produced, 1)
+
+    def test_fast_subscriber_waits_for_a_slow_one(self):
+        flight = SingleFlight(max_buffered=4)
+        source = CountingStream(count=100)
+        slow = flight.stream("key", source)
+        next(slow)
+        fast = flight.stream("key", source)
+        received = []
+        reader = threading.Thread(target=lambda: received.extend(fast), daemon=True)
+        reader.start()
+        time.sleep(0.1)
+        self.assertEqual(source.produced, 5)
+        self.assertEqual(len(received), 5)
+
+        # Draining the slow subscriber lets both run to the end
+        self.assertEqual(len(list(slow)), 99)
+        reader.join(5)
+        self.assertEqual(len(received), 100)
+
+    def test_stream_is_not_joined_once_chunks_were_dropped(self):
+        flight = SingleFlight(max_buffered=2)
+        source = CountingStream(count=10)
+        first = flight.stream("key", source)
+        self.assertEqual([next(first) for _ in range(4)], ["chunk0", "chunk1", "chunk2", "chunk3"])
+        second = flight.stream("key", source)
+        self.assertEqual(next(second), "chunk0")
+        self.assertEqual(source.started, 2)
+
+    def test_last_subscriber_leaving_closes_the_stream(self):
+        flight = SingleFlight()
+        source = CountingStream(count=1000)
+        stream = flight.stream("key", source)
+        next(stream)
+        stream.close()
+        self.assertTrue(source.closed)
+        self.assertEqual(source.produced, 1)
+
+        # The next identical request starts afresh
+        self.assertEqual(len(list(flight.stream("key", source))), 1000)
+        self.assertEqual(source.started, 2)
+
+    def test_errors_reach_every_subscriber(self):
+        flight = SingleFlight()
+        source = CountingStream(count=2, error=RuntimeError("model crashed"))
+        first = flight.stream("key", source)
+        next(first)
+        second = flight.stream("key", source)
+        for stream in (first, second):
+            with self.assertRaises(RuntimeError):
+                list(stream)
+
+class TestSessionCoalescing(unittest.TestCase):
+    def setUp(self):
+        self.server = OllamaStandIn(delay=0.05)
+        self.deepseek = DeepSeekIntegration(ollama_host=self.server.url, check_availability=False)
+
+    def tearDown(self):
+        self.deepseek.close()
+        self.server.stop()
+
+    def stream_concurrently(self, sessions):
+        results = []
+
+        def read(session):
+            results.append("".join(self.deepseek.iter_generate("Hi", session=session, flush_interval=0)))
+
+        threads = [threading.Thread(target=read, args=(session,)) for session in sessions]
+        for thread in threads:
+            thread.start()
+            time.sleep(0.02)
+        for thread in threads:
+            thread.join(5)
+        return results
+
+    def test_request_key_includes_the_session(self):
+        data = {"model": "deepseek-r1:8b", "prompt": "Hi"}
+        self.assertEqual(request_key("/api/generate", data), request_key("/api/generate", dict(data)))
+        self.assertNotEqual(request_key("/api/generate", data, "agent-1"), request_key("/api/generate", data))
+        self.assertNotEqual(request_key("/api/generate", data, "agent-1"),
+                            request_key("/api/generate", data, "agent-2"))
+
+    def test_identical_streams_without_a_session_share_one_generation(self):
+        self.assertEqual(self.stream_concurrently([None, None]), ["Hello there friend"] * 2)
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_streams_of_different_sessions_are_not_shared(self):
+        self.assertEqual(self.stream_concurrently(["agent-1", "agent-2"]), ["Hello there friend"] * 2)
+        self.assertEqual(len(self.server.requests), 2)
+
+if __name__ == '__main__':
+    unittest.main()
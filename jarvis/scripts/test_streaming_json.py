@@ -0,0 +1,109 @@
+import os
+import sys
+import json
+import asyncio
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from streaming_json import (IncompleteJSONError, JSONArrayItemScanner, JSONObjectScanner, afirst_json_object,
+                            aiter_json_array, first_json_object, iter_json_array)
+
+PLAN = {"steps": [{"id": 1, "description": "Open {the} file"}, {"id": 2, "description": "Say \"done\" }"}],
+        "notes": ["[not an item]"]}
+RESPONSE = "Let me plan {this}.\n" + json.dumps(PLAN) + "\nThat should work. {\"extra\": true}"
+
+class Stream:
+    """A chunk generator that records how much of it was read"""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.read = 0
+        self.closed = False
+
+    def __iter__(self):
+        return self.generate()
+
+    def generate(self):
+        try:
+            for chunk in self.chunks:
+                self.read += 1
+                yield chunk
+        finally:
+            self.closed = True
+
+async def agenerate(chunks):
+    for chunk in chunks:
+        yield chunk
+
+class TestStreamingJSON(unittest.TestCase):
+    def test_object_split_at_every_position(self):
+        for split in range(1, len(RESPONSE)):
+            with self.subTest(split=split):
+                scanner = JSONObjectScanner()
+                scanner.feed(RESPONSE[:split])
+                self.assertEqual(scanner.feed(RESPONSE[split:]), PLAN)
+
+    def test_object_one_character_at_a_time(self):
+        scanner = JSONObjectScanner()
+        for char in RESPONSE:
+            scanner.feed(char)
+        self.assertEqual(scanner.value, PLAN)
+
+    def test_stream_is_closed_once_the_object_is_complete(self):
+        stream = Stream(["{\"a\": ", "1}", " and then", " more prose"])
+        generator = iter(stream)
+        self.assertEqual(first_json_object(generator), {"a": 1})
+        self.assertEqual(stream.read, 2)
+        self.assertTrue(stream.closed)
+
+    def test_no_object(self):
+        self.assertIsNone(first_json_object(["No JSON {here}", " at all {"]))
+
+    def test_array_items_split_at_every_position(self):
+        for split in range(1, len(RESPONSE)):
+            with self.subTest(split=split):
+                scanner = JSONArrayItemScanner("steps")
+                items = scanner.feed(RESPONSE[:split]) + scanner.feed(RESPONSE[split:])
+                self.assertEqual(items, PLAN["steps"])
+                self.assertEqual(scanner.value, PLAN)
+
+    def test_array_items_are_yielded_as_they_close(self):
+        text = json.dumps(PLAN)
+        first_item_end = text.index("}, {") + 1
+        scanner = JSONArrayItemScanner("steps")
+        self.assertEqual(scanner.feed(text[:first_item_end - 1]), [])
+        self.assertEqual(scanner.feed(text[first_item_end - 1:first_item_end]), [PLAN["steps"][0]])
+        self.assertEqual(scanner.feed(text[first_item_end:]), [PLAN["steps"][1]])
+
+    def test_array_stream_is_closed_once_the_object_is_complete(self):
+        stream = Stream(list(RESPONSE))
+        self.assertEqual(list(iter_json_array(iter(stream), "steps")), PLAN["steps"])
+        self.assertTrue(stream.closed)
+        self.assertEqual(stream.read, RESPONSE.index(json.dumps(PLAN)) + len(json.dumps(PLAN)))
+
+    def test_truncated_array_raises_after_the_completed_items(self):
+        text = json.dumps(PLAN)
+        truncated = text[:text.index("}, {") + 5]
+        items = []
+        with self.assertRaises(IncompleteJSONError):
+            for item in iter_json_array([truncated[:10], truncated[10:]], "steps"):
+                items.append(item)
+        self.assertEqual(items, PLAN["steps"][:1])
+
+    def test_async_versions(self):
+        async def run():
+            chunks = [RESPONSE[i:i + 7] for i in range(0, len(RESPONSE), 7)]
+            value = await afirst_json_object(agenerate(chunks))
+            items = [item async for item in aiter_json_array(agenerate(chunks), "steps")]
+            with self.assertRaises(IncompleteJSONError):
+                async for _ in aiter_json_array(agenerate(chunks[:5]), "steps"):
+                    pass
+            return value, items
+
+        value, items = asyncio.run(run())
+        self.assertEqual(value, PLAN)
+        self.assertEqual(items, PLAN["steps"])
+
+if __name__ == '__main__':
+    unittest.main()
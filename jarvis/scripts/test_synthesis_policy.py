@@ -0,0 +1,91 @@
+import os
+import sys
+import asyncio
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from synthesis_policy import LLM, TEMPLATE, StepDigest, SynthesisPolicy, aiter_sentences
+
+REPLY = "I created report.txt. It has 5 lines!\nNext, you could \"open it.\" Done"
+
+async def agenerate(chunks, error=None):
+    for chunk in chunks:
+        yield chunk
+    if error is not None:
+        raise error
+
+class TestSentences(unittest.TestCase):
+    def sentences(self, chunks):
+        async def run():
+            return [sentence async for sentence in aiter_sentences(agenerate(chunks))]
+        return asyncio.run(run())
+
+    def test_sentences_split_at_every_position(self):
+        expected = ["I created report.txt. ", "It has 5 lines!\n", "Next, you could \"open it.\" ", "Done"]
+        for split in range(1, len(REPLY)):
+            with self.subTest(split=split):
+                self.assertEqual(self.sentences([REPLY[:split], REPLY[split:]]), expected)
+
+    def test_joined_sentences_reproduce_the_text(self):
+        self.assertEqual("".join(self.sentences(list(REPLY))), REPLY)
+
+class TestSynthesisPolicy(unittest.TestCase):
+    def setUp(self):
+        self.policy = SynthesisPolicy(max_template_output=50, max_digest_output=20)
+        self.requests = []
+        self.sentences = []
+
+    def stream(self, chunks, error=None):
+        def stream(messages):
+            self.requests.append(messages)
+            return agenerate(chunks, error)
+        return stream
+
+    def synthesize(self, steps, stream):
+        return asyncio.run(self.policy.synthesize("Make a report", steps, stream, self.sentences.append))
+
+    def test_single_successful_step_uses_the_template(self):
+        steps = [StepDigest("Create report.txt.", True, "Wrote 5 lines")]
+        self.assertEqual(self.policy.choose(steps), TEMPLATE)
+        response = self.synthesize(steps, self.stream(["unused"]))
+        self.assertEqual(response, "Done: Create report.txt.\nWrote 5 lines")
+        self.assertEqual(self.sentences, [response])
+        self.assertEqual(self.requests, [])
+        self.assertEqual(self.policy.template([]), "There was nothing to do for that request.")
+
+    def test_failed_long_or_multi_step_results_use_the_llm(self):
+        for steps in ([StepDigest("a", False, error="boom")], [StepDigest("a", True, "x" * 51)],
+                      [StepDigest("a", True), StepDigest("b", True)]):
+            with self.subTest(steps=steps):
+                self.assertEqual(self.policy.choose(steps), LLM)
+
+    def test_llm_synthesis_streams_sentences(self):
+        steps = [StepDigest("Create report.txt", True, "ok " * 30), StepDigest("Send it", False, error="no network")]
+        response = self.synthesize(steps, self.stream(["Report created. ", "Sending failed."]))
+        self.assertEqual(response, "Report created. Sending failed.")
+        self.assertEqual(self.sentences, ["Report created. ", "Sending failed."])
+        prompt = self.requests[0][1]["content"]
+        self.assertIn("1/2 steps succeeded", prompt)
+        self.assertIn("1. [ok] Create report.txt | output: " + ("ok " * 7)[:20], prompt)
+        self.assertIn("2. [failed] Send it | error: no network", prompt)
+        self.assertEqual(self.policy.stats()[LLM], 1)
+        self.assertIsNotNone(self.policy.stats()["avg_first_sentence"])
+
+    def test_stream_failing_before_any_text_raises(self):
+        steps = [StepDigest("a", True), StepDigest("b", True)]
+        with self.assertRaises(ConnectionError):
+            self.synthesize(steps, self.stream([], ConnectionError("Ollama is down")))
+        self.assertEqual(self.policy.fallback(steps), "Task completed. 2/2 steps executed successfully.")
+        self.assertEqual(self.policy.stats()["fallbacks"], 1)
+
+    def test_text_already_shown_is_kept_when_the_stream_fails(self):
+        steps = [StepDigest("a", True), StepDigest("b", True)]
+        response = self.synthesize(steps, self.stream(["Both steps worked. ", "And"], ConnectionError("reset")))
+        # The unfinished sentence was never shown, so it is left out
+        self.assertEqual(response, "Both steps worked.")
+        self.assertEqual(self.sentences, ["Both steps worked. "])
+        self.assertEqual(self.policy.stats()["fallbacks"], 0)
+
+if __name__ == '__main__':
+    unittest.main()
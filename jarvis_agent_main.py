@@ -18,6 +18,8 @@ from tkinter import scrolledtext, ttk, filedialog, Menu, messagebox
 # Import our custom modules
 try:
     from deepseek_integration import DeepSeekIntegration, AgentSystem
+    from llm_scheduler import RequestCancelled
+    from model_residency import ModelResidency
     from blackbox_integration import BlackboxIntegration
     from system_control import SystemControl, JarvisAssistant
     from voice_control import VoiceAssistant
@@ -112,7 +114,7 @@ class JarvisAgentGUI:
         try:
             # Initialize DeepSeek integration
             self.deepseek = DeepSeekIntegration()
-            self.agent_system = AgentSystem()
+            self.agent_system = AgentSystem(deepseek=self.deepseek)
             
             # Initialize Blackbox integration
             self.blackbox = BlackboxIntegration()
@@ -405,6 +407,10 @@ class JarvisAgentGUI:
             if self.agent_system.initialize():
                 self.connection_status.config(text="✅ DeepSeek R1: Connected")
                 
+                # Preload the model and keep it resident so replies skip the load time
+                self.residency = ModelResidency(self.deepseek)
+                self.residency.start()
+                
                 # Start voice assistant
                 if self.is_voice_enabled:
                     self.voice_assistant.start()
@@ -499,7 +505,7 @@ Try saying "Hey Jarvis, what can you do?" or type a command below!"""
         self.send_message()
         return "break"  # Prevent default behavior
 
-    def process_message(self, message: str):
+    def process_message(self, message: str, call_site: str = "chat"):
         """Process user message and get AI response"""
         try:
             # Check if it's a system command
@@ -514,7 +520,7 @@ Try saying "Hey Jarvis, what can you do?" or type a command below!"""
                 # This would be used for streaming responses
                 pass
             
-            response = self.agent_system.process_request(message)
+            response = self.agent_system.process_request(message, call_site=call_site)
             
             if response:
                 self.add_message("jarvis", response)
@@ -525,6 +531,8 @@ Try saying "Hey Jarvis, what can you do?" or type a command below!"""
             else:
                 self.add_message("error", "I'm having trouble processing your request. Please try again.")
                 
+        except RequestCancelled:
+            logger.info("Request superseded by a newer message")
         except Exception as e:
             logger.error(f"Error processing message: {e}")
             self.add_message("error", f"Error processing message: {str(e)}")
@@ -588,8 +596,8 @@ Try saying "Hey Jarvis, what can you do?" or type a command below!"""
         if not command:
             return "Yes, how can I help you?"
         
-        # Process the command through the normal message processing
-        threading.Thread(target=self.process_message, args=(command,), daemon=True).start()
+        # Process the command through the normal message processing, with a spoken-reply budget
+        threading.Thread(target=self.process_message, args=(command, "voice"), daemon=True).start()
         
         return "Processing your request..."
 
@@ -715,6 +723,8 @@ Disk Usage: {disk['percent']:.1f}%
             # Stop current components
             if self.is_voice_enabled:
                 self.voice_assistant.stop()
+            if hasattr(self, 'residency'):
+                self.residency.stop()
             
             # Reinitialize components
             self.initialize_components()
@@ -1007,6 +1017,14 @@ Disk Usage: {disk['percent']:.1f}%
             report += f"Voice Control: {'Enabled' if self.is_voice_enabled else 'Disabled'}\n"
             report += f"Voice Listening: {'Active' if self.is_listening else 'Inactive'}\n"
             report += f"Blackbox Integration: {'Available' if self.blackbox.is_installed else 'Not Available'}\n"
+            if hasattr(self, 'residency'):
+                residency = self.residency.report()
+                report += f"Model Cold Load: {residency['cold_load_seconds']}s\n"
+                report += f"Warm Time to First Token: {residency['warm_ttft_seconds']}s\n"
+            
+            llm_timings = self.deepseek.metrics.report()
+            if llm_timings:
+                report += f"\nLLM LATENCY BY CALL SITE:\n{llm_timings}\n"
             
             report += f"\nCONVERSATION HISTORY: {len(self.conversation_history)} messages\n"
             
@@ -1182,6 +1200,10 @@ voice recognition (Google Speech API).
             if hasattr(self, 'jarvis'):
                 self.jarvis.stop()
             
+            # Stop refreshing the model keep_alive
+            if hasattr(self, 'residency'):
+                self.residency.stop()
+            
             # Stop system control
             if hasattr(self, 'system_control'):
                 pass  # SystemControl doesn't need explicit stopping
@@ -20,11 +20,22 @@ import sys
 import time
 import psutil
 import GPUtil
-from typing import Dict, List, Any, Optional, Tuple
+from typing import AsyncIterator, Callable, Dict, List, Any, Optional, Tuple
 from dataclasses import dataclass
 from enum import Enum
 import requests
-import ollama
+
+from ollama_async_client import AsyncOllamaClient
+from llm_scheduler import Priority
+from circuit_breaker import CircuitOpenError
+from plan_executor import PlanExecutor, PlanNode, StepOutcome
+from plan_cache import PlanCache
+from resource_sampler import ResourceSampler
+from intent_matcher import FastPath
+from synthesis_policy import StepDigest, SynthesisPolicy
+from confirmation_broker import ConfirmationBroker, ConsoleConfirmations
+from streaming_json import aiter_json_array
+from llm_router import CHAT, LLMRouter, create_default_router
 
 # Configure logging
 logging.basicConfig(
@@ -63,6 +74,7 @@ class TaskStep:
     expected_output: str
     safety_level: SafetyLevel
     hardware_requirements: Dict[str, Any] = None
+    dependencies: Optional[List[int]] = None  # step_ids that must finish first
 
 @dataclass
 class ExecutionResult:
@@ -78,13 +90,23 @@ class ExecutionResult:
 class HardwareMonitor:
     """Monitor hardware constraints for RTX 3050 Ti + i7-12700H"""
     
-    def __init__(self):
+    def __init__(self, sample_interval: float = 1.0):
         self.max_vram_gb = 4.0  # RTX 3050 Ti constraint
         self.max_ram_gb = 16.0  # System RAM
         self.thermal_limit = 85  # Celsius
+        # Resources are sampled on a background thread, so checks read a snapshot instead of blocking
+        self.sampler = ResourceSampler(sample_interval, readers={
+            "vram_used_gb": self.read_vram_usage,
+            "temperature": self.read_cpu_temperature
+        })
+        self.sampler.start()
         
     def check_vram_usage(self) -> float:
         """Check current VRAM usage"""
+        return self.sampler.snapshot()["vram_used_gb"]
+    
+    def read_vram_usage(self) -> float:
+        """Read VRAM usage from the GPU"""
         try:
             gpus = GPUtil.getGPUs()
             if gpus:
@@ -95,16 +117,22 @@ class HardwareMonitor:
     
     def check_system_resources(self) -> Dict[str, float]:
         """Check system resource usage"""
+        return self.sampler.snapshot()
+    
+    def headroom(self) -> Dict[str, float]:
+        """Free VRAM (above the 0.5GB safety margin) and idle CPU cores right now"""
+        resources = self.sampler.snapshot()
         return {
-            "cpu_percent": psutil.cpu_percent(interval=1),
-            "ram_percent": psutil.virtual_memory().percent,
-            "ram_used_gb": psutil.virtual_memory().used / (1024**3),
-            "vram_used_gb": self.check_vram_usage(),
-            "temperature": self.get_cpu_temperature()
+            "vram_gb": 3.5 - resources["vram_used_gb"],
+            "cpu_cores": self.sampler.cpu_count * (1 - resources["cpu_percent"] / 100)
         }
     
     def get_cpu_temperature(self) -> float:
         """Get CPU temperature (if available)"""
+        return self.sampler.snapshot()["temperature"]
+    
+    def read_cpu_temperature(self) -> float:
+        """Read CPU temperature from the sensors (if available)"""
         try:
             temps = psutil.sensors_temperatures()
             if 'coretemp' in temps:
@@ -133,13 +161,30 @@ class JarvisAgent:
     Main JARVIS autonomous agent following the established architecture
     """
     
-    def __init__(self, ollama_host="localhost", ollama_port=11434):
-        self.ollama_client = ollama.Client(host=f"http://{ollama_host}:{ollama_port}")
+    def __init__(self, ollama_host="localhost", ollama_port=11434, pipelined_planning=True):
+        self.ollama_client = AsyncOllamaClient(host=f"http://{ollama_host}:{ollama_port}")
         self.model_name = "deepseek-r1:8b"
         self.conversation_history = []
         self.hardware_monitor = HardwareMonitor()
-        self.blackbox_controller = BlackboxController()
+        # Yellow/red steps and Blackbox hand-offs wait here for a front end while other steps keep running
+        self.confirmations = ConfirmationBroker()
+        self.blackbox_controller = BlackboxController(self.confirmations)
         self.safety_monitor = SafetyMonitor()
+        # Plans that succeeded before are reused instead of asking DeepSeek R1 again. They are lists of
+        # step dicts, kept apart from the master agent's execution_plan objects in the same table
+        self.plan_cache = PlanCache(
+            pattern_type="task_steps",
+            validate=lambda plan: isinstance(plan, list) and all(isinstance(step, dict) for step in plan),
+            parameter_fields=("description", "blackbox_instructions")
+        )
+        # Start safe steps while DeepSeek R1 is still writing the rest of the plan
+        self.pipelined_planning = pipelined_planning
+        # Simple commands ("cpu usage", "take a screenshot") are answered natively without the LLM
+        self.fast_path = FastPath()
+        # Trivial outcomes get a template reply; the rest are summarised by a streamed LLM call
+        self.synthesis_policy = SynthesisPolicy()
+        # Conversational replies go to whichever backend suits them; built on first use
+        self.llm_router: Optional[LLMRouter] = None
         
         # JARVIS system prompt optimized for the established architecture
         self.system_prompt = """You are JARVIS, an autonomous AI assistant. Your role is to:
@@ -169,6 +214,9 @@ SAFETY PROTOCOL:
 - YELLOW: Caution required (ask user confirmation)
 - RED: Dangerous operations (explicit warnings + confirmation)
 
+List in "dependencies" the step_ids whose results a step needs. Steps without
+dependencies on each other run at the same time, so only add the ones that are real.
+
 For each request, respond in JSON format:
 {
     "understanding": "Clear summary of what user wants",
@@ -181,33 +229,91 @@ For each request, respond in JSON format:
             "blackbox_instructions": "Detailed instructions for Blackbox AI to generate code",
             "expected_output": "What should happen when code executes",
             "safety_level": "green|yellow|red",
-            "hardware_requirements": {"vram_gb": 0.5, "cpu_cores": 2}
+            "hardware_requirements": {"vram_gb": 0.5, "cpu_cores": 2},
+            "dependencies": []
         }
     ],
     "overall_goal": "Summary of complete objective",
     "estimated_time": "Expected completion time"
 }"""
 
-    async def process_request(self, user_input: str) -> str:
-        """Main entry point for processing user requests"""
+    async def process_request(self, user_input: str, on_sentence: Optional[Callable[[str], Any]] = None) -> str:
+        """Main entry point for processing user requests; on_sentence receives the reply as it is synthesized"""
         logger.info(f"JARVIS processing request: {user_input}")
         
         try:
+            # Answer simple commands natively, skipping planning, code generation and synthesis
+            intent = self.fast_path.match(user_input)
+            if intent:
+                final_result = await asyncio.to_thread(self.fast_path.run, intent)
+                if final_result is not None:
+                    logger.info(self.fast_path.report())
+                    self.conversation_history.append({
+                        "user_input": user_input,
+                        "plan": [],
+                        "results": [],
+                        "final_result": final_result,
+                        "timestamp": time.time(),
+                        "resources_used": self.hardware_monitor.check_system_resources()
+                    })
+                    return final_result
+            
             # Check system resources first
             safe, message = self.hardware_monitor.is_safe_to_proceed()
             if not safe:
                 return f"⚠️ System resources constrained: {message}. Please wait or restart JARVIS."
             
-            # Use DeepSeek R1 to understand and plan
-            plan = await self.create_execution_plan(user_input)
+            # Reuse a plan that worked for the same request, or use DeepSeek R1 to understand and plan
+            truncated = None
+            plan_match = self.plan_cache.lookup(user_input)
+            if plan_match:
+                try:
+                    cached_plan = self.parse_plan_steps(plan_match.plan)
+                except (AttributeError, KeyError, TypeError, ValueError) as e:
+                    # Counts as a failed reuse, so the plan stops being offered
+                    logger.warning(f"Cached plan could not be parsed, replanning: {e}")
+                    self.plan_cache.record_outcome(plan_match, False)
+                    plan_match = None
+            if plan_match:
+                logger.info(f"Reusing cached plan ({plan_match.confidence:.0%} success rate), "
+                            f"skipping {plan_match.planning_time:.1f}s of planning")
+                plan = cached_plan
+                results = await self.execute_plan(plan) if plan else []
+            elif self.pipelined_planning:
+                # Execute the plan using Blackbox AI while it is being generated
+                plan, results, planning_time, truncated = await self.plan_and_execute(user_input)
+            else:
+                planning_start = time.time()
+                plan = await self.create_execution_plan(user_input)
+                planning_time = time.time() - planning_start
+                # Execute the plan using Blackbox AI
+                results = await self.execute_plan(plan) if plan else []
             if not plan:
-                return "I couldn't understand your request. Could you please rephrase it?"
-            
-            # Execute the plan using Blackbox AI
-            results = await self.execute_plan(plan)
+                # Nothing to execute: answer conversationally on whichever backend suits a chat reply
+                try:
+                    return await self.route_text(user_input, CHAT)
+                except Exception as e:
+                    logger.warning(f"Could not route a chat reply: {e}")
+                    return "I couldn't understand your request. Could you please rephrase it?"
+            
+            # An incomplete plan is never cached or reported as a success
+            succeeded = truncated is None and all(result.success for result in results)
+            if plan_match:
+                self.plan_cache.record_outcome(plan_match, succeeded)
+            elif succeeded:
+                self.plan_cache.store(user_input, self.plan_to_data(plan), planning_time)
+            logger.info(self.plan_cache.report())
+            
+            warning = ""
+            if truncated:
+                warning = (f"⚠️ Planning stopped after {len(plan)} steps ({truncated}), "
+                           f"so only those steps were run.\n")
+                if on_sentence is not None:
+                    on_sentence(warning)
             
             # Synthesize results
-            final_result = await self.synthesize_results(user_input, plan, results)
+            final_result = await self.synthesize_results(user_input, plan, results, on_sentence)
+            final_result = warning + final_result
             
             # Store in history
             self.conversation_history.append({
@@ -221,14 +327,76 @@ For each request, respond in JSON format:
             
             return final_result
             
+        except (CircuitOpenError, ConnectionError) as e:
+            logger.warning(f"DeepSeek R1 unavailable: {e}")
+            return "⚠️ DeepSeek R1 is not reachable right now. Please check that Ollama is running and try again shortly."
         except Exception as e:
             logger.error(f"Error processing request: {e}")
             return f"⚠️ I encountered an error: {str(e)}. Please try again."
 
+    async def route_text(self, prompt: str, request_class: Optional[str] = None, options=None) -> str:
+        """Generate text on the backend best suited to the request, without blocking the event loop"""
+        if self.llm_router is None:
+            self.llm_router = create_default_router()
+        result = await asyncio.to_thread(self.llm_router.generate, prompt, request_class, options)
+        return result.text
+
     async def create_execution_plan(self, user_input: str) -> List[TaskStep]:
         """Use DeepSeek R1 to create detailed execution plan"""
         logger.info("Creating execution plan with DeepSeek R1")
         
+        try:
+            # Stream the plan and stop the generation as soon as its JSON object closes
+            plan_data = await self.ollama_client.chat_json(
+                model=self.model_name,
+                messages=self.build_planning_messages(user_input),
+                call_site="planning",
+                priority=Priority.PLANNING
+            )
+            logger.info(f"DeepSeek R1 planning response: {json.dumps(plan_data)[:200]}...")
+
+            if not plan_data or 'plan' not in plan_data:
+                logger.error("Invalid plan format from DeepSeek R1")
+                return None
+            
+            # Convert to TaskStep objects
+            task_steps = self.parse_plan_steps(plan_data['plan'])
+            
+            logger.info(f"Created execution plan with {len(task_steps)} steps")
+            return task_steps
+            
+        except (CircuitOpenError, ConnectionError):
+            raise
+        except Exception as e:
+            logger.error(f"Error creating execution plan: {e}")
+            return None
+
+    async def stream_execution_plan(self, user_input: str) -> AsyncIterator[TaskStep]:
+        """Use DeepSeek R1 to create the execution plan, yielding each step as soon as it is complete"""
+        logger.info("Streaming execution plan from DeepSeek R1")
+        
+        stream = self.ollama_client.chat_stream(
+            model=self.model_name,
+            messages=self.build_planning_messages(user_input),
+            call_site="planning",
+            priority=Priority.PLANNING
+        )
+        task_steps = []
+        try:
+            async for step_data in aiter_json_array(stream, "plan"):
+                task_step = self.parse_plan_step(step_data, task_steps)
+                logger.info(f"Planned step {task_step.step_id}: {task_step.description}")
+                task_steps.append(task_step)
+                yield task_step
+        except Exception as e:
+            # A bad step, unparseable JSON or a dropped stream means the plan is incomplete
+            logger.error(f"Execution plan stream stopped after {len(task_steps)} steps: {e}")
+            raise
+        
+        logger.info(f"Created execution plan with {len(task_steps)} steps")
+
+    def build_planning_messages(self, user_input: str) -> List[Dict[str, str]]:
+        """Build the DeepSeek R1 planning request for a user request"""
         # Get current system status
         resources = self.hardware_monitor.check_system_resources()
         context = self.build_context()
@@ -249,133 +417,194 @@ USER REQUEST: {user_input}
 
 Create a detailed execution plan that respects hardware constraints and follows safety protocols.
 """
+        return [
+            {"role": "system", "content": self.system_prompt},
+            {"role": "user", "content": prompt}
+        ]
 
-        try:
-            response = self.ollama_client.chat(
-                model=self.model_name,
-                messages=[
-                    {"role": "system", "content": self.system_prompt},
-                    {"role": "user", "content": prompt}
-                ]
-            )
-            
-            response_text = response['message']['content']
-            logger.info(f"DeepSeek R1 planning response: {response_text[:200]}...")
-            
-            # Parse JSON response
-            plan_data = self.extract_json_from_response(response_text)
-            if not plan_data or 'plan' not in plan_data:
-                logger.error("Invalid plan format from DeepSeek R1")
-                return None
-            
-            # Convert to TaskStep objects
-            task_steps = []
-            for step_data in plan_data['plan']:
-                task_step = TaskStep(
-                    step_id=step_data.get('step_id', len(task_steps) + 1),
-                    description=step_data.get('description', ''),
-                    task_type=TaskType(step_data.get('task_type', 'code_generation')),
-                    blackbox_instructions=step_data.get('blackbox_instructions', ''),
-                    expected_output=step_data.get('expected_output', ''),
-                    safety_level=SafetyLevel(step_data.get('safety_level', 'green')),
-                    hardware_requirements=step_data.get('hardware_requirements', {})
-                )
-                task_steps.append(task_step)
-            
-            logger.info(f"Created execution plan with {len(task_steps)} steps")
-            return task_steps
-            
-        except Exception as e:
-            logger.error(f"Error creating execution plan: {e}")
-            return None
+    def parse_plan_steps(self, steps_data: List[Dict[str, Any]]) -> List[TaskStep]:
+        """Convert the JSON plan steps into TaskStep objects"""
+        task_steps = []
+        for step_data in steps_data:
+            task_steps.append(self.parse_plan_step(step_data, task_steps))
+        return task_steps
+
+    def parse_plan_step(self, step_data: Dict[str, Any], previous_steps: List[TaskStep]) -> TaskStep:
+        """Convert one JSON plan step into a TaskStep; steps without declared dependencies run independently"""
+        return TaskStep(
+            step_id=step_data.get('step_id', len(previous_steps) + 1),
+            description=step_data.get('description', ''),
+            task_type=TaskType(step_data.get('task_type', 'code_generation')),
+            blackbox_instructions=step_data.get('blackbox_instructions', ''),
+            expected_output=step_data.get('expected_output', ''),
+            safety_level=SafetyLevel(step_data.get('safety_level', 'green')),
+            hardware_requirements=step_data.get('hardware_requirements', {}),
+            dependencies=step_data.get('dependencies') or []
+        )
+
+    def plan_to_data(self, plan: List[TaskStep]) -> List[Dict[str, Any]]:
+        """Convert TaskStep objects back into JSON plan steps"""
+        return [
+            {
+                "step_id": step.step_id,
+                "description": step.description,
+                "task_type": step.task_type.value,
+                "blackbox_instructions": step.blackbox_instructions,
+                "expected_output": step.expected_output,
+                "safety_level": step.safety_level.value,
+                "hardware_requirements": step.hardware_requirements or {},
+                "dependencies": step.dependencies or []
+            }
+            for step in plan
+        ]
 
     async def execute_plan(self, plan: List[TaskStep]) -> List[ExecutionResult]:
-        """Execute plan using Blackbox AI for code generation"""
+        """Execute plan steps concurrently as far as their dependencies and the hardware allow"""
         logger.info(f"Executing plan with {len(plan)} steps")
+        
+        outcomes = await self.create_plan_executor().run([self.plan_node(step) for step in plan])
+        return self.outcome_results(outcomes)
+
+    async def plan_and_execute(self, user_input: str) -> Tuple[List[TaskStep], List[ExecutionResult], float, Optional[str]]:
+        """
+        Plan with DeepSeek R1 and execute at the same time: green steps start as soon as they
+        are planned, while steps that need confirmation wait until the whole plan is known.
+        Returns the plan, the results in plan order, the planning time, and why planning
+        stopped early (None if the plan is complete).
+        """
+        planning_start = time.time()
+        executor = self.create_plan_executor()
+        execution = asyncio.create_task(executor.join())
+        plan = []
+        held = []
+        truncated = None
+        try:
+            async for step in self.stream_execution_plan(user_input):
+                plan.append(step)
+                if step.safety_level == SafetyLevel.GREEN:
+                    executor.add_step(self.plan_node(step))
+                else:
+                    held.append(step)
+        except (CircuitOpenError, ConnectionError) as e:
+            if not plan:
+                raise
+            truncated = str(e)
+        except Exception as e:
+            truncated = str(e)
+        finally:
+            planning_time = time.time() - planning_start
+            for step in held:
+                executor.add_step(self.plan_node(step))
+            executor.close()
+            outcomes = await execution
+        
+        # The executor reports steps in the order they were added, and held steps were added last
+        by_id = {outcome.node_id: outcome for outcome in outcomes}
+        outcomes = [by_id.get(step.step_id, StepOutcome(step.step_id, error="Step was not executed", skipped=True))
+                    for step in plan]
+        logger.info(f"Plan generated in {planning_time:.1f}s, plan and execution done in {time.time() - planning_start:.1f}s")
+        return plan, self.outcome_results(outcomes), planning_time, truncated
+
+    def create_plan_executor(self) -> PlanExecutor:
+        """Executor running TaskSteps as their dependencies and the hardware allow"""
+        return PlanExecutor(
+            lambda node: self.execute_step(node.payload),
+            headroom=self.hardware_monitor.headroom,
+            is_failure=lambda result: not result.success
+        )
+
+    def plan_node(self, step: TaskStep) -> PlanNode:
+        """Wrap a TaskStep for the plan executor"""
+        return PlanNode(
+            step.step_id,
+            step,
+            dependencies=step.dependencies or [],
+            requirements={
+                resource: float((step.hardware_requirements or {}).get(resource, 0))
+                for resource in ("vram_gb", "cpu_cores")
+            }
+        )
+
+    def outcome_results(self, outcomes: List[StepOutcome]) -> List[ExecutionResult]:
+        """Turn executor outcomes into ExecutionResults, reporting steps that never ran as failures"""
         results = []
+        for outcome in outcomes:
+            if outcome.result is None:
+                results.append(ExecutionResult(success=False, output="", error=outcome.error))
+            else:
+                results.append(outcome.result)
+        return results
+
+    async def execute_step(self, step: TaskStep) -> ExecutionResult:
+        """Validate, confirm and execute a single plan step"""
+        logger.info(f"Executing step {step.step_id}: {step.description}")
         
-        for step in plan:
-            logger.info(f"Executing step {step.step_id}: {step.description}")
-            
-            # Check hardware requirements
-            if not self.check_hardware_requirements(step):
-                result = ExecutionResult(
-                    success=False,
-                    output="",
-                    error="Insufficient hardware resources for this step"
-                )
-                results.append(result)
-                continue
-            
-            # Safety validation
-            if not self.safety_monitor.validate_step(step):
-                result = ExecutionResult(
+        # Check hardware requirements
+        if not self.check_hardware_requirements(step):
+            return ExecutionResult(
+                success=False,
+                output="",
+                error="Insufficient hardware resources for this step"
+            )
+        
+        # Safety validation
+        if not self.safety_monitor.validate_step(step):
+            return ExecutionResult(
+                success=False,
+                output="",
+                error="Step blocked by safety monitor"
+            )
+        
+        # User confirmation for non-green operations
+        if step.safety_level != SafetyLevel.GREEN:
+            if not await self.request_user_confirmation(step):
+                return ExecutionResult(
                     success=False,
                     output="",
-                    error="Step blocked by safety monitor"
+                    error="Step cancelled by user"
                 )
-                results.append(result)
-                continue
-            
-            # User confirmation for non-green operations
-            if step.safety_level != SafetyLevel.GREEN:
-                if not await self.request_user_confirmation(step):
-                    result = ExecutionResult(
-                        success=False,
-                        output="",
-                        error="Step cancelled by user"
-                    )
-                    results.append(result)
-                    continue
-            
-            # Generate and execute code with Blackbox AI
-            start_time = time.time()
-            start_resources = self.hardware_monitor.check_system_resources()
-            
-            execution_result = await self.blackbox_controller.generate_and_execute(step)
-            
-            # Record resource usage
-            end_resources = self.hardware_monitor.check_system_resources()
-            execution_result.execution_time = time.time() - start_time
-            execution_result.vram_usage = end_resources["vram_used_gb"]
-            execution_result.cpu_usage = end_resources["cpu_percent"]
-            
-            results.append(execution_result)
-            
-            # Check if we should continue after failure
-            if not execution_result.success:
-                logger.warning(f"Step {step.step_id} failed: {execution_result.error}")
-                # For now, continue with remaining steps
         
-        return results
+        # Generate and execute code with Blackbox AI
+        start_time = time.time()
+        
+        execution_result = await self.blackbox_controller.generate_and_execute(step)
+        
+        # Record resource usage
+        end_resources = self.hardware_monitor.check_system_resources()
+        execution_result.execution_time = time.time() - start_time
+        execution_result.vram_usage = end_resources["vram_used_gb"]
+        execution_result.cpu_usage = end_resources["cpu_percent"]
+        
+        if not execution_result.success:
+            logger.warning(f"Step {step.step_id} failed: {execution_result.error}")
+        
+        return execution_result
 
     def check_hardware_requirements(self, step: TaskStep) -> bool:
         """Check if hardware can handle the step requirements"""
         if not step.hardware_requirements:
             return True
         
-        resources = self.hardware_monitor.check_system_resources()
+        vram_used_gb = self.hardware_monitor.check_vram_usage()
         required_vram = step.hardware_requirements.get('vram_gb', 0)
         
-        if resources["vram_used_gb"] + required_vram > 3.5:  # 0.5GB safety margin
+        if vram_used_gb + required_vram > 3.5:  # 0.5GB safety margin
             logger.warning(f"Insufficient VRAM for step {step.step_id}")
             return False
         
         return True
 
     async def request_user_confirmation(self, step: TaskStep) -> bool:
-        """Request user confirmation for potentially dangerous operations"""
-        print(f"\n⚠️  JARVIS CONFIRMATION REQUIRED ⚠️")
-        print(f"Step: {step.description}")
-        print(f"Safety Level: {step.safety_level.value.upper()}")
-        print(f"Blackbox Instructions: {step.blackbox_instructions[:100]}...")
-        
+        """Request user confirmation for potentially dangerous operations from the attached front ends"""
+        details = [f"Blackbox Instructions: {step.blackbox_instructions[:100]}..."]
         if step.safety_level == SafetyLevel.RED:
-            print("🚨 WARNING: This operation could be dangerous!")
-            print("🚨 Please review carefully before proceeding!")
+            details.append("🚨 WARNING: This operation could be dangerous! Please review carefully before proceeding!")
         
-        response = input("Proceed with this step? (y/n): ").lower().strip()
-        return response in ['y', 'yes']
+        return await self.confirmations.request(
+            f"Step {step.step_id}: {step.description}",
+            details,
+            level=step.safety_level.value
+        )
 
     def build_context(self) -> str:
         """Build context from recent conversation history"""
@@ -391,81 +620,45 @@ Create a detailed execution plan that respects hardware constraints and follows
         
         return "\n".join(context_parts)
 
-    def extract_json_from_response(self, response_text: str) -> Dict:
-        """Extract JSON from DeepSeek R1 response"""
-        try:
-            start_idx = response_text.find('{')
-            end_idx = response_text.rfind('}') + 1
-            
-            if start_idx != -1 and end_idx != -1:
-                json_str = response_text[start_idx:end_idx]
-                return json.loads(json_str)
-            else:
-                logger.error("No JSON found in response")
-                return None
-                
-        except json.JSONDecodeError as e:
-            logger.error(f"JSON decode error: {e}")
-            return None
-
-    async def synthesize_results(self, user_input: str, plan: List[TaskStep], results: List[ExecutionResult]) -> str:
-        """Use DeepSeek R1 to synthesize results into user-friendly response"""
-        logger.info("Synthesizing results with DeepSeek R1")
-        
-        # Prepare execution summary
-        execution_summary = []
-        for i, (step, result) in enumerate(zip(plan, results)):
-            execution_summary.append({
-                "step": step.description,
-                "success": result.success,
-                "output": result.output[:300] if result.output else "",
-                "error": result.error,
-                "execution_time": f"{result.execution_time:.2f}s",
-                "vram_usage": f"{result.vram_usage:.1f}GB"
-            })
+    async def synthesize_results(self, user_input: str, plan: List[TaskStep], results: List[ExecutionResult],
+                                 on_sentence: Optional[Callable[[str], Any]] = None) -> str:
+        """Turn the results into a user-friendly response, using DeepSeek R1 only when a template will not do"""
+        steps = [StepDigest(step.description, result.success, result.output or "", result.error)
+                 for step, result in zip(plan, results)]
         
-        synthesis_prompt = f"""
-Based on the execution results, provide a clear JARVIS-style response.
-
-User request: {user_input}
-
-Execution summary:
-{json.dumps(execution_summary, indent=2)}
-
-Provide a response that:
-1. Confirms what was accomplished
-2. Highlights any important outputs or files created
-3. Notes any issues encountered
-4. Suggests next steps if applicable
-
-Be conversational and helpful, like JARVIS from Iron Man.
-"""
-
         try:
-            response = self.ollama_client.chat(
-                model=self.model_name,
-                messages=[
-                    {"role": "system", "content": "You are JARVIS. Provide clear, conversational responses about task results."},
-                    {"role": "user", "content": synthesis_prompt}
-                ]
-            )
-            
-            return response['message']['content']
-            
+            return await self.synthesis_policy.synthesize(user_input, steps, self.stream_synthesis, on_sentence)
         except Exception as e:
             logger.error(f"Error synthesizing results: {e}")
-            # Fallback summary
-            successful = sum(1 for r in results if r.success)
-            total = len(results)
-            return f"Task completed. {successful}/{total} steps executed successfully."
+            # Shown the same way as a synthesized response, after anything already streamed
+            fallback = self.synthesis_policy.fallback(steps)
+            if on_sentence is not None:
+                on_sentence(fallback)
+            return fallback
+        finally:
+            logger.info(self.synthesis_policy.report())
+
+    def stream_synthesis(self, messages: List[Dict[str, str]]) -> AsyncIterator[str]:
+        """Stream a DeepSeek R1 synthesis response"""
+        logger.info("Synthesizing results with DeepSeek R1")
+        return self.ollama_client.chat_stream(
+            model=self.model_name,
+            messages=messages,
+            call_site="synthesis",
+            priority=Priority.PLANNING
+        )
 
 class BlackboxController:
     """Enhanced controller for Blackbox AI integration following JARVIS architecture"""
     
-    def __init__(self):
+    def __init__(self, confirmations: Optional[ConfirmationBroker] = None):
         self.vscode_path = self.find_vscode_path()
         self.temp_dir = "/tmp/jarvis_blackbox"
         os.makedirs(self.temp_dir, exist_ok=True)
+        # The user is told through the broker when generated code is ready to run
+        self.confirmations = confirmations or ConfirmationBroker()
+        # Steps run concurrently, but the user works on one Blackbox AI file at a time
+        self.console_lock = asyncio.Lock()
         
     def find_vscode_path(self) -> str:
         """Find VS Code installation path"""
@@ -489,15 +682,23 @@ class BlackboxController:
             # Create Blackbox AI prompt file
             prompt_file = self.create_blackbox_prompt_file(step)
             
-            # Open in VS Code for Blackbox AI generation
-            subprocess.run([self.vscode_path, prompt_file], check=False)
-            
-            # Wait for user to generate code
-            print(f"\n🤖 BLACKBOX AI CODE GENERATION")
-            print(f"Task: {step.description}")
-            print(f"File: {prompt_file}")
-            print("Please use Blackbox AI to generate the code, then press Enter...")
-            input()
+            async with self.console_lock:
+                # Open in VS Code for Blackbox AI generation
+                await asyncio.to_thread(subprocess.run, [self.vscode_path, prompt_file], check=False)
+                
+                # Wait for user to generate code
+                generated = await self.confirmations.request(
+                    f"🤖 BLACKBOX AI CODE GENERATION - Task: {step.description}",
+                    [f"File: {prompt_file}", "Please use Blackbox AI to generate the code, then approve to run it"],
+                    level="handoff",
+                    timeout=1800
+                )
+            if not generated:
+                return ExecutionResult(
+                    success=False,
+                    output="",
+                    error="Blackbox AI code generation was not confirmed"
+                )
             
             # Read and execute generated code
             with open(prompt_file, 'r') as f:
@@ -635,7 +836,8 @@ GENERATE THE COMPLETE CODE BELOW THIS LINE:
                 f.write(code)
             
             # Execute with timeout
-            process = subprocess.run(
+            process = await asyncio.to_thread(
+                subprocess.run,
                 [sys.executable, exec_file],
                 capture_output=True,
                 text=True,
@@ -715,6 +917,7 @@ async def main():
     print("=" * 50)
     
     agent = JarvisAgent()
+    console = ConsoleConfirmations(agent.confirmations)
     
     # Check system readiness
     safe, message = agent.hardware_monitor.is_safe_to_proceed()
@@ -732,9 +935,13 @@ async def main():
     
     while True:
         try:
-            user_input = input("You: ").strip()
+            user_input = (await console.input("You: ")).strip()
             
             if user_input.lower() in ['quit', 'exit', 'goodbye']:
+                print(agent.fast_path.report())
+                print(agent.synthesis_policy.report())
+                print(agent.confirmations.report())
+                print(agent.plan_cache.report())
                 print("JARVIS: Goodbye! Powering down...")
                 break
             
@@ -742,10 +949,21 @@ async def main():
                 continue
             
             print("\n🧠 JARVIS analyzing request...")
-            result = await agent.process_request(user_input)
-            print(f"\n🤖 JARVIS: {result}")
+            streamed = []
+            
+            def show_sentence(sentence: str):
+                if not streamed:
+                    print("\n🤖 JARVIS: ", end="")
+                streamed.append(sentence)
+                print(sentence, end="", flush=True)
+            
+            result = await agent.process_request(user_input, on_sentence=show_sentence)
+            if streamed:
+                print()
+            else:
+                print(f"\n🤖 JARVIS: {result}")
             
-        except KeyboardInterrupt:
+        except (KeyboardInterrupt, EOFError):
             print("\nJARVIS: Goodbye!")
             break
         except Exception as e:
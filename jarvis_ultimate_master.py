@@ -23,7 +23,7 @@ import time
 import psutil
 import requests
 import threading
-from typing import Dict, List, Any, Optional, Tuple
+from typing import AsyncIterator, Callable, Dict, List, Any, Optional, Tuple
 from dataclasses import dataclass
 from enum import Enum
 import sqlite3
@@ -31,6 +31,12 @@ from datetime import datetime
 import base64
 import tempfile
 import shutil
+from contextlib import nullcontext
+
+from plan_executor import PlanExecutor, PlanNode
+from plan_cache import PlanCache
+from resource_sampler import ResourceSampler
+from synthesis_policy import StepDigest, SynthesisPolicy
 
 # Browser automation imports
 try:
@@ -62,9 +68,18 @@ try:
 except ImportError:
     VOICE_AVAILABLE = False
 
+# GPU monitoring import
+try:
+    import GPUtil
+except ImportError:
+    GPUtil = None
+
 # Ollama integration
 try:
     import ollama
+    from ollama_async_client import AsyncOllamaClient
+    from llm_scheduler import Priority
+    from generation_options import GenerationOptions, options_for
     OLLAMA_AVAILABLE = True
 except ImportError:
     OLLAMA_AVAILABLE = False
@@ -438,6 +453,15 @@ print(result)
             logger.error(f"❌ Automation failed: {e}")
             return f"Error: {e}"
 
+# Steps that drive the same device (the single Selenium driver, or the desktop's mouse
+# and keyboard) run one at a time even when the plan lets them run concurrently
+STEP_DEVICES = {
+    "browser_control": "browser",
+    "ai_interaction": "browser",
+    "code_generation": "browser",
+    "system_control": "desktop",
+}
+
 class UltimateJarvisMaster:
     """
     🚀 THE ULTIMATE JARVIS MASTER CONTROLLER 🚀
@@ -452,12 +476,23 @@ class UltimateJarvisMaster:
         self.system_controller = UltimateSystemController()
         self.task_queue = asyncio.Queue()
         self.active_tasks = {}
+        self.device_locks = {device: asyncio.Lock() for device in set(STEP_DEVICES.values())}
         self.knowledge_base = {}
         self.conversation_memory = []
         
         # Initialize database for persistent memory
         self.init_database()
         
+        # Successful plans are reused from learned_patterns instead of asking DeepSeek R1 again
+        self.plan_cache = PlanCache(
+            validate=lambda plan: isinstance(plan, dict) and isinstance(plan.get("execution_plan"), list),
+            parameter_fields=("understanding", "action", "details", "blackbox_instructions")
+        )
+        self.synthesis_policy = SynthesisPolicy()
+        # Resources are sampled on a background thread, so admitting plan steps reads a snapshot
+        self.resource_sampler = ResourceSampler(readers={"vram_free_gb": self.read_free_vram} if GPUtil else None)
+        self.resource_sampler.start()
+        
         # Initialize DeepSeek R1 connection
         self.init_deepseek()
         
@@ -513,33 +548,55 @@ class UltimateJarvisMaster:
             return False
             
         try:
-            self.deepseek_client = ollama.Client(host="http://localhost:11434")
+            self.deepseek_client = AsyncOllamaClient(host="http://localhost:11434")
+            logger.info("✅ DeepSeek R1 client created")
+            return True
+            
+        except Exception as e:
+            logger.error(f"❌ DeepSeek R1 initialization failed: {e}")
+            return False
+    
+    async def check_deepseek_connection(self) -> bool:
+        """Test the DeepSeek R1 connection without blocking the event loop"""
+        if not self.deepseek_client:
+            return False
             
-            # Test connection
-            response = self.deepseek_client.chat(
+        try:
+            await self.deepseek_client.chat(
                 model="deepseek-r1:8b",
-                messages=[{"role": "user", "content": "Hello, are you ready to be autonomous?"}]
+                messages=[{"role": "user", "content": "Hello, are you ready to be autonomous?"}],
+                # Same num_ctx as the real calls, so the check does not load the model twice
+                options=options_for("chat", GenerationOptions(num_predict=1))
             )
             
             logger.info("✅ DeepSeek R1 connection established")
             return True
             
         except Exception as e:
-            logger.error(f"❌ DeepSeek R1 initialization failed: {e}")
+            logger.error(f"❌ DeepSeek R1 connection test failed: {e}")
             return False
     
-    async def process_autonomous_request(self, user_input: str) -> str:
+    async def process_autonomous_request(self, user_input: str, on_sentence: Optional[Callable[[str], Any]] = None) -> str:
         """
         🧠 MAIN AUTONOMOUS PROCESSING ENGINE 🧠
         
         This is where the magic happens - DeepSeek R1 analyzes the request
-        and creates a complete autonomous execution plan.
+        and creates a complete autonomous execution plan. on_sentence receives
+        the response as it is synthesized.
         """
         try:
             logger.info(f"🚀 Processing autonomous request: {user_input}")
             
-            # Step 1: DeepSeek R1 analyzes and plans
-            analysis_prompt = f"""
+            # Step 1: Reuse a plan that worked for the same request, or let DeepSeek R1 analyze and plan
+            plan_match = self.plan_cache.lookup(user_input)
+            generated = False
+            if plan_match:
+                logger.info(f"♻️ Reusing cached plan ({plan_match.confidence:.0%} success rate), "
+                            f"skipping {plan_match.planning_time:.1f}s of planning")
+                plan = plan_match.plan
+            else:
+                planning_start = time.time()
+                analysis_prompt = f"""
 You are JARVIS, the ultimate autonomous AI assistant. Analyze this request and create a complete execution plan:
 
 USER REQUEST: {user_input}
@@ -556,6 +613,9 @@ HARDWARE CONSTRAINTS:
 - i7-12700H CPU - utilize all cores intelligently
 - 16GB RAM - manage memory carefully
 
+List in "dependencies" the step numbers whose results a step needs. Independent steps
+run at the same time, so only add the dependencies that are real.
+
 Respond in JSON format:
 {{
     "understanding": "What the user wants",
@@ -567,7 +627,9 @@ Respond in JSON format:
             "method": "browser_control|system_control|ai_interaction|code_generation",
             "details": "detailed instructions",
             "safety_level": "green|yellow|red",
-            "estimated_time": 30
+            "estimated_time": 30,
+            "dependencies": [],
+            "hardware_requirements": {{"vram_gb": 0, "cpu_cores": 1}}
         }}
     ],
     "expected_outcome": "what will be accomplished",
@@ -576,33 +638,42 @@ Respond in JSON format:
 }}
 """
             
-            # Get DeepSeek R1 analysis
-            response = self.deepseek_client.chat(
-                model="deepseek-r1:8b",
-                messages=[{"role": "user", "content": analysis_prompt}]
-            )
-            
-            plan_text = response['message']['content']
-            
-            # Parse the JSON response
-            try:
-                plan = json.loads(plan_text)
-            except:
-                # If JSON parsing fails, create a basic plan
+                # Get DeepSeek R1 analysis, stopping the generation as soon as the plan's JSON closes
+                plan = await self.deepseek_client.chat_json(
+                    model="deepseek-r1:8b",
+                    messages=[{"role": "user", "content": analysis_prompt}],
+                    call_site="planning",
+                    priority=Priority.BACKGROUND
+                )
+                planning_time = time.time() - planning_start
+                generated = plan is not None
+
+            if plan is None:
+                # If no JSON plan came back, create a basic plan
                 plan = {
                     "understanding": user_input,
                     "autonomy_assessment": "supervised",
-                    "execution_plan": [{"step": 1, "action": "Process request", "method": "system_control", "details": plan_text}],
+                    "execution_plan": [{"step": 1, "action": "Process request", "method": "system_control", "details": user_input}],
                     "expected_outcome": "Task completion",
                     "safety_warnings": [],
                     "blackbox_instructions": ""
                 }
             
             # Step 2: Execute the plan autonomously
+            execution_start = time.time()
             execution_results = await self.execute_autonomous_plan(plan)
+            execution_time = time.time() - execution_start
+            
+            succeeded = all(result["success"] for result in execution_results)
+            if plan_match:
+                self.plan_cache.record_outcome(plan_match, succeeded)
+            elif generated and succeeded:
+                self.plan_cache.store(user_input, plan, planning_time)
+            logger.info(f"📊 {self.plan_cache.report()}")
             
             # Step 3: Synthesize results
-            final_result = await self.synthesize_results(user_input, plan, execution_results)
+            final_result = await self.synthesize_results(user_input, plan, execution_results, execution_time,
+                                                        on_sentence)
             
             # Step 4: Store in memory
             self.store_interaction(user_input, final_result, plan)
@@ -614,80 +685,38 @@ Respond in JSON format:
             return f"I encountered an error while processing your request: {e}"
     
     async def execute_autonomous_plan(self, plan: Dict[str, Any]) -> List[Dict[str, Any]]:
-        """Execute the autonomous plan step by step"""
-        results = []
-        
+        """Execute the autonomous plan, running steps concurrently as far as their dependencies allow"""
         try:
-            for step in plan.get("execution_plan", []):
-                step_result = {"step": step.get("step"), "success": False, "output": "", "error": None}
-                
-                try:
-                    method = step.get("method", "")
-                    action = step.get("action", "")
-                    details = step.get("details", "")
-                    
-                    logger.info(f"🔄 Executing step {step.get('step')}: {action}")
-                    
-                    if method == "browser_control":
-                        if not self.browser_controller.driver:
-                            await self.browser_controller.initialize_browser()
-                        
-                        if "chatgpt" in details.lower():
-                            output = await self.browser_controller.interact_with_chatgpt(details)
-                        elif "research" in details.lower() or "search" in details.lower():
-                            output = await self.browser_controller.autonomous_web_research(details)
-                        else:
-                            output = f"Browser action executed: {action}"
-                        
-                        step_result["output"] = str(output)
-                        step_result["success"] = True
-                        
-                    elif method == "system_control":
-                        if "screenshot" in action.lower():
-                            output = await self.system_controller.take_screenshot()
-                        elif "open" in action.lower() or "close" in action.lower():
-                            app_name = details.split()[-1] if details else "unknown"
-                            action_type = "open" if "open" in action.lower() else "close"
-                            output = await self.system_controller.control_application(app_name, action_type)
-                        else:
-                            output = await self.system_controller.automate_task(details)
-                        
-                        step_result["output"] = output
-                        step_result["success"] = True
-                        
-                    elif method == "ai_interaction":
-                        if "blackbox" in details.lower():
-                            output = await self.browser_controller.interact_with_blackbox(details)
-                        else:
-                            output = f"AI interaction completed: {action}"
-                        
-                        step_result["output"] = output
-                        step_result["success"] = True
-                        
-                    elif method == "code_generation":
-                        # Use Blackbox AI for code generation
-                        blackbox_prompt = plan.get("blackbox_instructions", details)
-                        output = await self.browser_controller.interact_with_blackbox(blackbox_prompt)
-                        
-                        step_result["output"] = output
-                        step_result["success"] = True
-                        
-                    else:
-                        step_result["output"] = f"Executed: {action} - {details}"
-                        step_result["success"] = True
-                    
-                    # Add delay between steps for stability
-                    await asyncio.sleep(1)
-                    
-                except Exception as e:
-                    step_result["error"] = str(e)
-                    step_result["output"] = f"Step failed: {e}"
-                    logger.error(f"❌ Step {step.get('step')} failed: {e}")
-                
+            nodes = []
+            for index, step in enumerate(plan.get("execution_plan", [])):
+                requirements = step.get("hardware_requirements") or {}
+                nodes.append(PlanNode(
+                    step.get("step", index + 1),
+                    step,
+                    dependencies=step.get("dependencies") or [],
+                    requirements={
+                        resource: float(requirements.get(resource, 0))
+                        for resource in ("vram_gb", "cpu_cores")
+                    }
+                ))
+            
+            executor = PlanExecutor(
+                lambda node: self.execute_autonomous_step(node.payload, plan),
+                headroom=self.resource_headroom,
+                is_failure=lambda result: not result["success"]
+            )
+            outcomes = await executor.run(nodes)
+            
+            results = []
+            for node, outcome in zip(nodes, outcomes):
+                step_result = outcome.result
+                if step_result is None:
+                    step_result = {"step": node.payload.get("step"), "success": False,
+                                   "output": f"Step not run: {outcome.error}", "error": outcome.error}
                 results.append(step_result)
                 
                 # Store autonomous action in database
-                self.store_autonomous_action(step, step_result)
+                self.store_autonomous_action(node.payload, step_result)
             
             return results
             
@@ -695,47 +724,133 @@ Respond in JSON format:
             logger.error(f"❌ Plan execution failed: {e}")
             return [{"step": 0, "success": False, "output": f"Execution failed: {e}", "error": str(e)}]
     
-    async def synthesize_results(self, user_input: str, plan: Dict[str, Any], results: List[Dict[str, Any]]) -> str:
-        """Synthesize execution results into a coherent response"""
+    async def execute_autonomous_step(self, step: Dict[str, Any], plan: Dict[str, Any]) -> Dict[str, Any]:
+        """Execute a single step of an autonomous plan"""
+        step_result = {"step": step.get("step"), "success": False, "output": "", "error": None}
+        
         try:
-            synthesis_prompt = f"""
-You are JARVIS. Synthesize the results of autonomous task execution into a clear, helpful response.
-
-ORIGINAL REQUEST: {user_input}
-
-EXECUTION PLAN: {json.dumps(plan, indent=2)}
-
-EXECUTION RESULTS: {json.dumps(results, indent=2)}
-
-Provide a clear, concise summary of what was accomplished, any issues encountered, and next steps if needed.
-Be conversational and helpful, like JARVIS from Iron Man.
-"""
-            
-            response = self.deepseek_client.chat(
-                model="deepseek-r1:8b",
-                messages=[{"role": "user", "content": synthesis_prompt}]
-            )
+            method = step.get("method", "")
+            action = step.get("action", "")
+            details = step.get("details", "")
             
-            synthesis = response['message']['content']
+            logger.info(f"🔄 Executing step {step.get('step')}: {action}")
             
-            # Add execution summary
-            successful_steps = sum(1 for r in results if r.get("success", False))
-            total_steps = len(results)
+            device = STEP_DEVICES.get(method)
+            async with self.device_locks[device] if device else nullcontext():
+                if method == "browser_control":
+                    if not self.browser_controller.driver:
+                        await self.browser_controller.initialize_browser()
+                    
+                    if "chatgpt" in details.lower():
+                        output = await self.browser_controller.interact_with_chatgpt(details)
+                    elif "research" in details.lower() or "search" in details.lower():
+                        output = await self.browser_controller.autonomous_web_research(details)
+                    else:
+                        output = f"Browser action executed: {action}"
+                    
+                    step_result["output"] = str(output)
+                    step_result["success"] = True
+                    
+                elif method == "system_control":
+                    if "screenshot" in action.lower():
+                        output = await self.system_controller.take_screenshot()
+                    elif "open" in action.lower() or "close" in action.lower():
+                        app_name = details.split()[-1] if details else "unknown"
+                        action_type = "open" if "open" in action.lower() else "close"
+                        output = await self.system_controller.control_application(app_name, action_type)
+                    else:
+                        output = await self.system_controller.automate_task(details)
+                    
+                    step_result["output"] = output
+                    step_result["success"] = True
+                    
+                elif method == "ai_interaction":
+                    if "blackbox" in details.lower():
+                        output = await self.browser_controller.interact_with_blackbox(details)
+                    else:
+                        output = f"AI interaction completed: {action}"
+                    
+                    step_result["output"] = output
+                    step_result["success"] = True
+                    
+                elif method == "code_generation":
+                    # Use Blackbox AI for code generation
+                    blackbox_prompt = plan.get("blackbox_instructions", details)
+                    output = await self.browser_controller.interact_with_blackbox(blackbox_prompt)
+                    
+                    step_result["output"] = output
+                    step_result["success"] = True
+                    
+                else:
+                    step_result["output"] = f"Executed: {action} - {details}"
+                    step_result["success"] = True
             
-            final_response = f"""
-{synthesis}
+        except Exception as e:
+            step_result["error"] = str(e)
+            step_result["output"] = f"Step failed: {e}"
+            logger.error(f"❌ Step {step.get('step')} failed: {e}")
+        
+        return step_result
+    
+    def read_free_vram(self) -> Optional[float]:
+        """Read free VRAM in GB from the GPU, or None without one"""
+        gpus = GPUtil.getGPUs()
+        return (gpus[0].memoryTotal - gpus[0].memoryUsed) / 1024 if gpus else None
+    
+    def resource_headroom(self) -> Dict[str, float]:
+        """Idle CPU cores and free VRAM (above a 0.5GB safety margin) for admitting plan steps"""
+        snapshot = self.resource_sampler.snapshot()
+        headroom = {"cpu_cores": self.resource_sampler.cpu_count * (1 - snapshot["cpu_percent"] / 100)}
+        if snapshot.get("vram_free_gb") is not None:
+            headroom["vram_gb"] = snapshot["vram_free_gb"] - 0.5
+        return headroom
+    
+    async def synthesize_results(self, user_input: str, plan: Dict[str, Any], results: List[Dict[str, Any]],
+                                 execution_time: float, on_sentence: Optional[Callable[[str], Any]] = None) -> str:
+        """Synthesize execution results into a coherent response, from a template when the outcome is trivial"""
+        plan_steps = plan.get("execution_plan", [])
+        steps = []
+        for index, result in enumerate(results):
+            plan_step = plan_steps[index] if index < len(plan_steps) else {}
+            description = plan_step.get("action") or plan_step.get("details") or f"Step {result.get('step')}"
+            steps.append(StepDigest(description, result.get("success", False),
+                                    str(result.get("output") or ""), result.get("error")))
+        
+        try:
+            synthesis = await self.synthesis_policy.synthesize(user_input, steps, self.stream_synthesis, on_sentence)
+        except Exception as e:
+            logger.error(f"❌ Result synthesis failed: {e}")
+            # Shown the same way as a synthesized response, after anything already streamed
+            fallback = self.synthesis_policy.fallback(steps)
+            if on_sentence is not None:
+                on_sentence(fallback)
+            return fallback
+        finally:
+            logger.info(f"📊 {self.synthesis_policy.report()}")
+        
+        # Add execution summary
+        successful_steps = sum(1 for r in results if r.get("success", False))
+        total_steps = len(results)
+        
+        summary = f"""
 
 📊 **Execution Summary:**
 - ✅ Successful steps: {successful_steps}/{total_steps}
-- 🕒 Total execution time: ~{total_steps * 2} seconds
+- 🕒 Total execution time: {execution_time:.1f} seconds
 - 🧠 DeepSeek R1 autonomy level: {plan.get('autonomy_assessment', 'supervised')}
 """
-            
-            return final_response
-            
-        except Exception as e:
-            logger.error(f"❌ Result synthesis failed: {e}")
-            return f"Task execution completed with {len([r for r in results if r.get('success')])} successful steps out of {len(results)} total steps."
+        if on_sentence is not None:
+            on_sentence(summary)
+        return synthesis + summary
+    
+    def stream_synthesis(self, messages: List[Dict[str, str]]) -> AsyncIterator[str]:
+        """Stream a DeepSeek R1 synthesis response"""
+        return self.deepseek_client.chat_stream(
+            model="deepseek-r1:8b",
+            messages=messages,
+            call_site="synthesis",
+            priority=Priority.BACKGROUND
+        )
     
     def store_interaction(self, user_input: str, response: str, plan: Dict[str, Any]):
         """Store interaction in persistent memory"""
@@ -780,6 +895,9 @@ Be conversational and helpful, like JARVIS from Iron Man.
         logger.info("🚀 JARVIS ULTIMATE AUTONOMOUS MODE ACTIVATED 🚀")
         
         # Initialize all systems
+        if not await self.check_deepseek_connection():
+            logger.warning("⚠️ DeepSeek R1 is not responding")
+        
         if not await self.browser_controller.initialize_browser():
             logger.warning("⚠️ Browser controller initialization failed")
         
@@ -808,13 +926,24 @@ Be conversational and helpful, like JARVIS from Iron Man.
                 user_input = input("\n🎤 You: ").strip()
                 
                 if user_input.lower() in ['exit', 'quit', 'stop']:
+                    print(f"📊 {self.plan_cache.report()}")
+                    print(f"📊 {self.synthesis_policy.report()}")
                     print("🛑 JARVIS Ultimate Master shutting down...")
                     break
                 
                 if user_input:
                     print("🧠 JARVIS is thinking and planning...")
-                    response = await self.process_autonomous_request(user_input)
-                    print(f"\n🤖 JARVIS: {response}")
+                    streamed = []
+                    
+                    def show_sentence(sentence: str):
+                        if not streamed:
+                            print("\n🤖 JARVIS: ", end="")
+                        streamed.append(sentence)
+                        print(sentence, end="", flush=True)
+                    
+                    response = await self.process_autonomous_request(user_input, on_sentence=show_sentence)
+                    if not streamed:
+                        print(f"\n🤖 JARVIS: {response}")
                 
             except KeyboardInterrupt:
                 print("\n🛑 JARVIS Ultimate Master interrupted by user")
@@ -829,6 +958,7 @@ Be conversational and helpful, like JARVIS from Iron Man.
         
         if hasattr(self, 'db_conn'):
             self.db_conn.close()
+        self.plan_cache.close()
         
         print("👋 JARVIS Ultimate Master has been shut down. Goodbye!")
 
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+LLM Response Cache
+This module provides a two-tier cache for DeepSeek R1 responses: an in-memory LRU tier in
+front of an on-disk SQLite tier, with TTL and size-based eviction on both.
+"""
+
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+class ResponseCache:
+    """
+    Cache of LLM responses keyed on model, request content and generation options.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 24 * 3600,
+                 db_path: Optional[str] = "jarvis_llm_cache.db", max_disk_entries: int = 5000):
+        """
+        Initialize the response cache.
+
+        Args:
+            max_entries (int, optional): Maximum number of responses kept in memory. Defaults to 256.
+            ttl_seconds (float, optional): Seconds a response stays valid. Defaults to one day.
+            db_path (Optional[str], optional): SQLite file for the persistent tier, or None to keep
+                                               the cache in memory only. Defaults to "jarvis_llm_cache.db".
+            max_disk_entries (int, optional): Maximum number of responses kept on disk. Defaults to 5000.
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_disk_entries = max_disk_entries
+        self._memory = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "memory_hits": 0, "disk_hits": 0, "evictions": 0}
+
+        self._db = None
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    value TEXT,
+                    expires_at REAL,
+                    last_used REAL
+                )
+            """)
+            self._db.commit()
+
+    @staticmethod
+    def make_key(endpoint: str, model: str, content: Any, options: Dict[str, Any]) -> str:
+        """
+        Build a cache key for a request.
+
+        Args:
+            endpoint (str): The kind of request ("generate" or "chat").
+            model (str): The model name.
+            content (Any): The prompt or list of chat messages.
+            options (Dict[str, Any]): The generation options that affect the output.
+
+        Returns:
+            str: A stable hex digest identifying the request.
+        """
+        payload = json.dumps(
+            {"endpoint": endpoint, "model": model, "content": content, "options": options},
+            sort_keys=True,
+            ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def is_deterministic(options: Dict[str, Any]) -> bool:
+        """
+        Check whether a request samples deterministically and can therefore be cached.
+
+        Args:
+            options (Dict[str, Any]): The generation options of the request.
+
+        Returns:
+            bool: True if temperature is zero or a fixed seed is given.
+        """
+        return options.get("temperature") == 0 or options.get("seed") is not None
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Look up a cached response.
+
+        Args:
+            key (str): The key from make_key().
+
+        Returns:
+            Optional[Any]: The cached response, or None on a miss.
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    self._counters["hits"] += 1
+                    self._counters["memory_hits"] += 1
+                    return value
+                del self._memory[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, expires_at FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    value_json, expires_at = row
+                    if expires_at > now:
+                        self._db.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+                        self._db.commit()
+                        value = json.loads(value_json)
+                        self._remember(key, expires_at, value)
+                        self._counters["hits"] += 1
+                        self._counters["disk_hits"] += 1
+                        return value
+                    self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._db.commit()
+
+            self._counters["misses"] += 1
+            return None
+
+    def set(self, key: str, value: Any):
+        """
+        Store a response in both tiers.
+
+        Args:
+            key (str): The key from make_key().
+            value (Any): A JSON-serialisable response.
+        """
+        now = time.time()
+        expires_at = now + self.ttl_seconds
+        with self._lock:
+            self._remember(key, expires_at, value)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses (key, value, expires_at, last_used) VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(value), expires_at, now)
+                )
+                self._evict_disk(now)
+                self._db.commit()
+
+    def _remember(self, key: str, expires_at: float, value: Any):
+        """Insert into the memory tier, evicting least recently used entries over the limit."""
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self._counters["evictions"] += 1
+
+    def _evict_disk(self, now: float):
+        """Drop expired rows, then the least recently used rows over the size limit."""
+        self._db.execute("DELETE FROM responses WHERE expires_at <= ?", (now,))
+        excess = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0] - self.max_disk_entries
+        if excess > 0:
+            self._db.execute(
+                "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY last_used ASC LIMIT ?)",
+                (excess,)
+            )
+            self._counters["evictions"] += excess
+
+    def clear(self):
+        """
+        Remove every cached response from both tiers.
+        """
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses")
+                self._db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get the cache hit/miss counters.
+
+        Returns:
+            Dict[str, Any]: Counters plus the hit rate and the number of in-memory entries.
+        """
+        with self._lock:
+            stats = dict(self._counters)
+            stats["memory_entries"] = len(self._memory)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+    def close(self):
+        """
+        Close the SQLite tier.
+        """
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+LLM Metrics
+This module keeps per-call latency and throughput samples for requests to Ollama, tagged by
+call site, and summarizes them as percentiles so it is clear whether time goes to queueing,
+model loading, prompt evaluation or generation.
+"""
+
+import threading
+from collections import deque
+from typing import Any, Dict, List, Mapping, Optional
+
+# Ollama reports durations in nanoseconds
+NANOSECONDS = 1e9
+
+METRICS = (
+    "queue_seconds",
+    "ttft_seconds",
+    "visible_ttft_seconds",
+    "load_seconds",
+    "prompt_tokens_per_second",
+    "generation_tokens_per_second",
+    "total_seconds",
+)
+
+def percentile(values: List[float], q: float) -> float:
+    """
+    Compute a percentile with linear interpolation between the closest ranks.
+
+    Args:
+        values (List[float]): The samples, already sorted.
+        q (float): The percentile, from 0 to 100.
+
+    Returns:
+        float: The percentile value, or 0.0 if there are no samples.
+    """
+    if not values:
+        return 0.0
+    position = (len(values) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+class MetricsRegistry:
+    """
+    In-process store of recent samples per call site and metric.
+    """
+
+    def __init__(self, window: int = 1000):
+        """
+        Initialize the registry.
+
+        Args:
+            window (int, optional): Samples kept per call site and metric. Defaults to 1000.
+        """
+        self.window = window
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def observe(self, metric: str, value: float, call_site: str = "default"):
+        """
+        Record one sample.
+
+        Args:
+            metric (str): The metric name, e.g. "ttft_seconds".
+            value (float): The measured value.
+            call_site (str, optional): The call site the sample belongs to. Defaults to "default".
+        """
+        with self._lock:
+            key = (call_site, metric)
+            if key not in self._samples:
+                self._samples[key] = deque(maxlen=self.window)
+            self._samples[key].append(value)
+
+    def record_response(self, call_site: Optional[str], response: Mapping[str, Any],
+                        queue_time: Optional[float] = None, ttft: Optional[float] = None,
+                        visible_ttft: Optional[float] = None):
+        """
+        Record the timings of one Ollama call from its final response chunk.
+
+        Args:
+            call_site (Optional[str]): The call site, e.g. "planning" or "voice". None is recorded as "default".
+            response (Mapping[str, Any]): The final (or only) response, carrying Ollama's durations.
+            queue_time (Optional[float], optional): Seconds spent waiting for a scheduler slot.
+            ttft (Optional[float], optional): Measured seconds from sending the request to the first
+                token. Defaults to None, in which case Ollama's load plus prompt-eval time is used.
+            visible_ttft (Optional[float], optional): Measured seconds to the first token shown to the
+                user, after reasoning was filtered out. Defaults to None.
+        """
+        call_site = call_site or "default"
+        load = response.get("load_duration")
+        prompt_count = response.get("prompt_eval_count")
+        prompt_duration = response.get("prompt_eval_duration")
+        eval_count = response.get("eval_count")
+        eval_duration = response.get("eval_duration")
+        total = response.get("total_duration")
+
+        if ttft is None and prompt_duration is not None:
+            ttft = ((load or 0) + prompt_duration) / NANOSECONDS
+
+        values = {}
+        if queue_time is not None:
+            values["queue_seconds"] = queue_time
+        if ttft is not None:
+            values["ttft_seconds"] = ttft
+        if visible_ttft is not None:
+            values["visible_ttft_seconds"] = visible_ttft
+        if load is not None:
+            values["load_seconds"] = load / NANOSECONDS
+        if prompt_count and prompt_duration:
+            values["prompt_tokens_per_second"] = prompt_count / (prompt_duration / NANOSECONDS)
+        if eval_count and eval_duration:
+            values["generation_tokens_per_second"] = eval_count / (eval_duration / NANOSECONDS)
+        if total is not None:
+            values["total_seconds"] = total / NANOSECONDS
+        for metric, value in values.items():
+            self.observe(metric, value, call_site)
+
+    def summary(self, call_site: Optional[str] = None) -> Dict[str, Dict[str, Dict[str, float]]]:
+        """
+        Summarize the recorded samples.
+
+        Args:
+            call_site (Optional[str], optional): Only summarize this call site. Defaults to None (all).
+
+        Returns:
+            Dict[str, Dict[str, Dict[str, float]]]: For each call site and metric, the sample count,
+                                                    mean, p50, p90, p99 and max.
+        """
+        with self._lock:
+            samples = {key: sorted(values) for key, values in self._samples.items()
+                       if call_site is None or key[0] == call_site}
+
+        summary = {}
+        for (site, metric), values in sorted(samples.items()):
+            summary.setdefault(site, {})[metric] = {
+                "count": len(values),
+                "mean": sum(values) / len(values),
+                "p50": percentile(values, 50),
+                "p90": percentile(values, 90),
+                "p99": percentile(values, 99),
+                "max": values[-1],
+            }
+        return summary
+
+    def report(self) -> str:
+        """
+        Format the summary as a text table.
+
+        Returns:
+            str: One line per call site and metric.
+        """
+        lines = []
+        for site, metrics in self.summary().items():
+            lines.append(f"{site}:")
+            for metric in METRICS:
+                if metric in metrics:
+                    m = metrics[metric]
+                    lines.append(f"  {metric:30s} n={m['count']:<5d} p50={m['p50']:8.2f} "
+                                 f"p90={m['p90']:8.2f} p99={m['p99']:8.2f}")
+        return "\n".join(lines)
+
+    def reset(self):
+        """
+        Drop all samples.
+        """
+        with self._lock:
+            self._samples.clear()
+
+_default_registry = None
+_default_lock = threading.Lock()
+
+def get_default_registry() -> MetricsRegistry:
+    """
+    Get the metrics registry shared by every LLM client in this process.
+
+    Returns:
+        MetricsRegistry: The process-wide registry.
+    """
+    global _default_registry
+    with _default_lock:
+        if _default_registry is None:
+            _default_registry = MetricsRegistry()
+        return _default_registry
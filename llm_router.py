@@ -0,0 +1,468 @@
+#!/usr/bin/env python3
+"""
+LLM Router
+This module puts the Ollama (DeepSeek R1), local GPT-2 and OpenAI front doors behind one
+backend interface, and routes each request to a backend based on its request class, the
+backend's recent latency and queue depth, and whether it is currently up.
+"""
+
+import os
+import time
+import logging
+import threading
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+import requests
+
+from generation_options import GenerationOptions
+from llm_scheduler import RequestCancelled
+
+logger = logging.getLogger("LLMRouter")
+
+# Request classes, from cheapest to most demanding
+CLASSIFICATION = "classification"
+CHAT = "chat"
+REASONING = "reasoning"
+
+# Backends to try for each request class, in order of preference
+DEFAULT_ROUTES = {
+    CLASSIFICATION: ["gpt2", "ollama", "openai"],
+    # GPT-2 cannot hold a conversation or summarize one, so it only serves classification
+    CHAT: ["ollama", "openai"],
+    REASONING: ["ollama", "openai"],
+}
+
+class BackendError(RuntimeError):
+    """Raised by a backend that could not produce a response."""
+
+class NoBackendAvailable(RuntimeError):
+    """Raised when every backend for a request class is down or failed."""
+
+class LLMBackend:
+    """
+    Interface implemented by every LLM backend.
+    """
+
+    name = "backend"
+
+    def __init__(self, max_concurrent: int = 1):
+        """
+        Initialize the backend.
+
+        Args:
+            max_concurrent (int, optional): Requests the backend serves at once. Defaults to 1.
+        """
+        self.max_concurrent = max_concurrent
+
+    def is_available(self) -> bool:
+        """
+        Check whether the backend can serve requests.
+
+        Returns:
+            bool: True if the backend is usable.
+        """
+        return True
+
+    def queue_depth(self) -> int:
+        """
+        Get the number of requests waiting in front of the backend outside the router.
+
+        Returns:
+            int: Requests queued or running elsewhere in the process.
+        """
+        return 0
+
+    def generate(self, prompt: str, options: GenerationOptions) -> str:
+        """
+        Generate a response for a prompt.
+
+        Args:
+            prompt (str): The prompt to send to the model.
+            options (GenerationOptions): Generation options; backends use the fields they support.
+
+        Returns:
+            str: The generated text.
+
+        Raises:
+            BackendError: If the backend could not produce a response.
+        """
+        raise NotImplementedError
+
+    def chat(self, messages: List[Dict[str, str]], options: GenerationOptions, **kwargs) -> str:
+        """
+        Generate the next assistant message of a conversation.
+
+        Backends without a chat interface see the conversation as a transcript prompt.
+
+        Args:
+            messages (List[Dict[str, str]]): Message dictionaries with 'role' and 'content' keys.
+            options (GenerationOptions): Generation options; backends use the fields they support.
+            **kwargs: Backend-specific parameters (e.g. scheduling for Ollama); ignored by other backends.
+
+        Returns:
+            str: The generated message content.
+
+        Raises:
+            BackendError: If the backend could not produce a response.
+        """
+        transcript = "\n".join(f"{message['role']}: {message['content']}" for message in messages)
+        return self.generate(f"{transcript}\nassistant:", options)
+
+class OllamaBackend(LLMBackend):
+    """
+    DeepSeek R1 through Ollama, via DeepSeekIntegration.
+    """
+
+    name = "ollama"
+
+    def __init__(self, deepseek, max_concurrent: Optional[int] = None):
+        """
+        Initialize the backend.
+
+        Args:
+            deepseek (DeepSeekIntegration): The integration to send requests through.
+            max_concurrent (Optional[int], optional): Defaults to the integration's scheduler limit.
+        """
+        super().__init__(max_concurrent or deepseek.scheduler.max_concurrent)
+        self.deepseek = deepseek
+
+    def is_available(self) -> bool:
+        return self.deepseek.is_available or self.deepseek.refresh_availability()
+
+    def queue_depth(self) -> int:
+        stats = self.deepseek.scheduler.stats()
+        return stats["queued"] + stats["running"]
+
+    def generate(self, prompt: str, options: GenerationOptions) -> str:
+        text = self.deepseek.generate(prompt, options=options)
+        if text is None:
+            raise BackendError("Ollama generation failed")
+        return text
+
+    def chat(self, messages: List[Dict[str, str]], options: GenerationOptions, **kwargs) -> str:
+        message = self.deepseek.chat(messages, options=options, **kwargs)
+        if not message or "content" not in message:
+            raise BackendError("Ollama chat failed")
+        return message["content"]
+
+class LanguageModelBackend(LLMBackend):
+    """
+    The local GPT-2 model from jarvis.scripts.language_model, loaded on first use.
+    """
+
+    name = "gpt2"
+
+    def __init__(self, language_model=None, model_name: str = "gpt2", device: str = "cpu"):
+        """
+        Initialize the backend.
+
+        Args:
+            language_model (Optional[LanguageModel], optional): An already loaded model. Defaults to None
+                                                                (load on first request).
+            model_name (str, optional): GPT-2 variant to load. Defaults to "gpt2".
+            device (str, optional): Torch device. Defaults to "cpu".
+        """
+        super().__init__(max_concurrent=1)
+        self.language_model = language_model
+        self.model_name = model_name
+        self.device = device
+        self._load_lock = threading.Lock()
+        self._load_error = None
+
+    def is_available(self) -> bool:
+        return self._load_error is None
+
+    def load(self):
+        """
+        Load the model if it is not loaded yet.
+
+        Raises:
+            BackendError: If the model cannot be loaded.
+        """
+        with self._load_lock:
+            if self.language_model is not None:
+                return
+            try:
+                from jarvis.scripts.language_model import LanguageModel
+                self.language_model = LanguageModel(self.model_name, self.device)
+            except Exception as e:
+                self._load_error = e
+                raise BackendError(f"Failed to load {self.model_name}: {e}")
+
+    def generate(self, prompt: str, options: GenerationOptions) -> str:
+        self.load()
+        # GPT-2's max_length counts the prompt as well as the continuation
+        max_length = len(prompt) // 4 + (options.num_predict or 100)
+        try:
+            text = self.language_model.generate_text(prompt, max_length=max_length)
+        except Exception as e:
+            raise BackendError(f"GPT-2 generation failed: {e}")
+        return text[len(prompt):].strip() if text.startswith(prompt) else text
+
+class OpenAIBackend(LLMBackend):
+    """
+    Any OpenAI-compatible chat completions endpoint, including OpenAI itself and local stand-ins.
+    """
+
+    name = "openai"
+
+    def __init__(self, model_name: str = "gpt-4", base_url: str = "https://api.openai.com/v1",
+                 api_key: Optional[str] = None, max_concurrent: int = 4, timeout: float = 120.0):
+        """
+        Initialize the backend.
+
+        Args:
+            model_name (str, optional): The model to request. Defaults to "gpt-4".
+            base_url (str, optional): Base URL of the API. Defaults to "https://api.openai.com/v1".
+            api_key (Optional[str], optional): API key. Defaults to the OPENAI_API_KEY environment variable.
+            max_concurrent (int, optional): Requests served at once. Defaults to 4.
+            timeout (float, optional): Seconds to wait for a response. Defaults to 120.0.
+        """
+        super().__init__(max_concurrent)
+        self.model_name = model_name
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key or os.getenv("OPENAI_API_KEY")
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def is_available(self) -> bool:
+        # Local stand-ins do not need a key
+        return bool(self.api_key) or not self.base_url.startswith("https://api.openai.com")
+
+    def generate(self, prompt: str, options: GenerationOptions) -> str:
+        return self.chat([{"role": "user", "content": prompt}], options)
+
+    def chat(self, messages: List[Dict[str, str]], options: GenerationOptions, **kwargs) -> str:
+        data = {"model": self.model_name, "messages": messages}
+        if options.num_predict is not None:
+            data["max_tokens"] = options.num_predict
+        for key in ("temperature", "top_p", "seed", "stop"):
+            if getattr(options, key) is not None:
+                data[key] = getattr(options, key)
+        headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+        try:
+            response = self.session.post(f"{self.base_url}/chat/completions", json=data,
+                                         headers=headers, timeout=self.timeout)
+            response.raise_for_status()
+            content = response.json()["choices"][0]["message"]["content"]
+        except Exception as e:
+            raise BackendError(f"OpenAI request failed: {e}")
+        return (content or "").strip()
+
+@dataclass
+class RouteResult:
+    """The outcome of a routed request."""
+    text: str
+    backend: str
+    latency: float
+    attempts: int
+
+class _BackendState:
+    """Rolling latency and load of one backend, as seen by the router."""
+
+    def __init__(self, window: int):
+        self.latencies = deque(maxlen=window)
+        self.in_flight = 0
+        self.requests = 0
+        self.failures = 0
+        self.down_until = 0.0
+
+class LLMRouter:
+    """
+    Route each request to the best available backend for its class, falling back on failure.
+    """
+
+    def __init__(self, backends: List[LLMBackend], routes: Optional[Dict[str, List[str]]] = None,
+                 latency_window: int = 20, down_cooldown: float = 30.0, default_latency: float = 1.0):
+        """
+        Initialize the router.
+
+        Args:
+            backends (List[LLMBackend]): The backends to route between.
+            routes (Optional[Dict[str, List[str]]], optional): Backend names to try per request class, in
+                                                               order of preference. Defaults to DEFAULT_ROUTES.
+            latency_window (int, optional): Number of recent latencies averaged per backend. Defaults to 20.
+            down_cooldown (float, optional): Seconds a failed backend is skipped. Defaults to 30.0.
+            default_latency (float, optional): Latency assumed for a backend with no history. Defaults to 1.0.
+        """
+        self.backends = {backend.name: backend for backend in backends}
+        self.routes = routes or DEFAULT_ROUTES
+        self.down_cooldown = down_cooldown
+        self.default_latency = default_latency
+        self._lock = threading.Lock()
+        self._state = {name: _BackendState(latency_window) for name in self.backends}
+
+    @staticmethod
+    def classify(prompt: str, options: Optional[GenerationOptions] = None) -> str:
+        """
+        Guess the request class of a prompt.
+
+        Args:
+            prompt (str): The prompt.
+            options (Optional[GenerationOptions], optional): The request's options.
+
+        Returns:
+            str: CLASSIFICATION for short prompts with a small output budget, REASONING for long
+                 prompts or large budgets, otherwise CHAT.
+        """
+        num_predict = options.num_predict if options and options.num_predict else None
+        if len(prompt) <= 400 and num_predict is not None and num_predict <= 16:
+            return CLASSIFICATION
+        if len(prompt) > 4000 or (num_predict is not None and num_predict >= 2048):
+            return REASONING
+        return CHAT
+
+    def generate(self, prompt: str, request_class: Optional[str] = None,
+                 options: Optional[GenerationOptions] = None) -> RouteResult:
+        """
+        Generate a response on the best backend, trying the next one if it fails.
+
+        Args:
+            prompt (str): The prompt to send.
+            request_class (Optional[str], optional): CLASSIFICATION, CHAT or REASONING. Defaults to classify().
+            options (Optional[GenerationOptions], optional): Generation options. Defaults to None.
+
+        Returns:
+            RouteResult: The response and the backend that produced it.
+
+        Raises:
+            NoBackendAvailable: If every candidate backend is down or failed.
+        """
+        options = options or GenerationOptions()
+        request_class = request_class or self.classify(prompt, options)
+        return self._route(request_class, lambda backend: backend.generate(prompt, options))
+
+    def chat(self, messages: List[Dict[str, str]], request_class: Optional[str] = None,
+             options: Optional[GenerationOptions] = None, **kwargs) -> RouteResult:
+        """
+        Generate the next assistant message on the best backend, trying the next one if it fails.
+
+        Args:
+            messages (List[Dict[str, str]]): Message dictionaries with 'role' and 'content' keys.
+            request_class (Optional[str], optional): CLASSIFICATION, CHAT or REASONING. Defaults to classify()
+                                                     on the conversation's text.
+            options (Optional[GenerationOptions], optional): Generation options. Defaults to None.
+            **kwargs: Backend-specific parameters passed to each backend's chat().
+
+        Returns:
+            RouteResult: The response and the backend that produced it.
+
+        Raises:
+            NoBackendAvailable: If every candidate backend is down or failed.
+            RequestCancelled: If the request was superseded; no other backend is tried.
+        """
+        options = options or GenerationOptions()
+        if request_class is None:
+            request_class = self.classify("\n".join(message["content"] for message in messages), options)
+        return self._route(request_class, lambda backend: backend.chat(messages, options, **kwargs))
+
+    def _route(self, request_class: str, call: Callable[[LLMBackend], str]) -> RouteResult:
+        """Run a request on the ranked backends until one succeeds."""
+        errors = []
+        attempts = 0
+        for name in self.rank(request_class):
+            backend = self.backends[name]
+            state = self._state[name]
+            attempts += 1
+            with self._lock:
+                state.in_flight += 1
+                state.requests += 1
+            start = time.perf_counter()
+            try:
+                text = call(backend)
+            except RequestCancelled:
+                # Superseded by the caller, not a backend failure
+                with self._lock:
+                    state.in_flight -= 1
+                raise
+            except Exception as e:
+                with self._lock:
+                    state.in_flight -= 1
+                    state.failures += 1
+                    state.down_until = time.monotonic() + self.down_cooldown
+                logger.warning(f"Backend {name} failed, trying the next one: {e}")
+                errors.append(f"{name}: {e}")
+                continue
+            latency = time.perf_counter() - start
+            with self._lock:
+                state.in_flight -= 1
+                state.latencies.append(latency)
+            return RouteResult(text, name, latency, attempts)
+        raise NoBackendAvailable(f"No backend could serve a {request_class} request: {'; '.join(errors) or 'none available'}")
+
+    def rank(self, request_class: str) -> List[str]:
+        """
+        Order the usable backends for a request class, best first.
+
+        The score is the backend's average recent latency scaled by its load, with a penalty
+        for each step down the preference list.
+
+        Args:
+            request_class (str): The request class.
+
+        Returns:
+            List[str]: Names of the backends to try.
+        """
+        now = time.monotonic()
+        scored = []
+        for rank, name in enumerate(self.routes.get(request_class, self.routes[CHAT])):
+            backend = self.backends.get(name)
+            if backend is None:
+                continue
+            state = self._state[name]
+            if state.down_until > now:
+                continue
+            try:
+                if not backend.is_available():
+                    continue
+            except Exception:
+                continue
+            queued = backend.queue_depth()
+            with self._lock:
+                latency = (sum(state.latencies) / len(state.latencies)) if state.latencies else self.default_latency
+                load = (state.in_flight + queued) / backend.max_concurrent
+            scored.append((latency * (1 + load) * (1 + rank), rank, name))
+        return [name for _, _, name in sorted(scored)]
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get per-backend routing statistics.
+
+        Returns:
+            Dict[str, Any]: Requests, failures, in-flight count, average latency and whether the
+                            backend is currently skipped.
+        """
+        now = time.monotonic()
+        with self._lock:
+            return {
+                name: {
+                    "requests": state.requests,
+                    "failures": state.failures,
+                    "in_flight": state.in_flight,
+                    "avg_latency": (sum(state.latencies) / len(state.latencies)) if state.latencies else None,
+                    "down": state.down_until > now
+                }
+                for name, state in self._state.items()
+            }
+
+def create_default_router(deepseek=None, openai_base_url: Optional[str] = None) -> LLMRouter:
+    """
+    Build a router over the standard Ollama, GPT-2 and OpenAI backends.
+
+    Nothing is loaded or contacted until the first request.
+
+    Args:
+        deepseek (Optional[DeepSeekIntegration], optional): Integration to use for Ollama. Defaults to a
+                                                            new one.
+        openai_base_url (Optional[str], optional): OpenAI-compatible base URL. Defaults to OpenAI.
+
+    Returns:
+        LLMRouter: The router.
+    """
+    if deepseek is None:
+        from deepseek_integration import DeepSeekIntegration
+        deepseek = DeepSeekIntegration(check_availability=False)
+    openai_backend = OpenAIBackend(base_url=openai_base_url) if openai_base_url else OpenAIBackend()
+    return LLMRouter([OllamaBackend(deepseek), LanguageModelBackend(), openai_backend])
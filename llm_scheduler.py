@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+LLM Request Scheduler
+This module orders requests to Ollama by priority and admits only as many at once as
+Ollama has parallel slots, so a short interactive reply is not stuck behind a long
+planning or background generation.
+"""
+
+import os
+import time
+import heapq
+import asyncio
+import threading
+import itertools
+from enum import IntEnum
+from contextlib import contextmanager, asynccontextmanager
+from typing import Any, Dict, Iterator, AsyncIterator, Optional
+
+class Priority(IntEnum):
+    """Request priority classes; lower values are served first."""
+    INTERACTIVE = 0
+    PLANNING = 1
+    BACKGROUND = 2
+
+class RequestCancelled(Exception):
+    """Raised when a request is superseded or cancelled before it completes."""
+
+class Ticket:
+    """
+    A request waiting for, or holding, one of the scheduler's slots.
+    """
+
+    def __init__(self, priority: Priority, session: Optional[str]):
+        self.priority = Priority(priority)
+        self.session = session
+        self.enqueued_at = time.perf_counter()
+        self.queue_time = None
+        self.granted = False
+        self.cancelled = threading.Event()
+        self._ready = threading.Event()
+        self._loop = None
+        self._future = None
+
+    def _wake(self):
+        """Wake the waiting caller, whether it is a thread or a coroutine."""
+        self._ready.set()
+        if self._future is not None:
+            self._loop.call_soon_threadsafe(self._resolve)
+
+    def _resolve(self):
+        if not self._future.done():
+            self._future.set_result(None)
+
+class LLMScheduler:
+    """
+    Priority queue with admission control in front of Ollama.
+    """
+
+    def __init__(self, max_concurrent: Optional[int] = None):
+        """
+        Initialize the scheduler.
+
+        Args:
+            max_concurrent (Optional[int], optional): Number of requests sent to Ollama at once.
+                                                      Defaults to OLLAMA_NUM_PARALLEL, or 1 if unset.
+        """
+        if max_concurrent is None:
+            max_concurrent = int(os.environ.get("OLLAMA_NUM_PARALLEL", "1") or 1)
+        self.max_concurrent = max(1, max_concurrent)
+        self._lock = threading.Lock()
+        self._queue = []
+        self._counter = itertools.count()
+        self._running = set()
+        self._metrics = {
+            priority.name.lower(): {"requests": 0, "cancelled": 0, "total_queue_time": 0.0, "max_queue_time": 0.0}
+            for priority in Priority
+        }
+
+    @contextmanager
+    def slot(self, priority: Priority = Priority.INTERACTIVE, session: Optional[str] = None,
+             supersede: bool = False) -> Iterator[Ticket]:
+        """
+        Wait for a slot, blocking the calling thread.
+
+        Args:
+            priority (Priority, optional): Priority class of the request. Defaults to INTERACTIVE.
+            session (Optional[str], optional): Conversation the request belongs to. Defaults to None.
+            supersede (bool, optional): Cancel the session's earlier requests. Defaults to False.
+
+        Yields:
+            Ticket: The admitted ticket; streaming callers should stop once ticket.cancelled is set.
+
+        Raises:
+            RequestCancelled: If the request is superseded while it waits.
+        """
+        ticket = self._enqueue(priority, session, supersede)
+        ticket._ready.wait()
+        self._admit(ticket)
+        try:
+            yield ticket
+        finally:
+            self._release(ticket)
+
+    @asynccontextmanager
+    async def aslot(self, priority: Priority = Priority.INTERACTIVE, session: Optional[str] = None,
+                    supersede: bool = False) -> AsyncIterator[Ticket]:
+        """
+        Wait for a slot without blocking the event loop.
+
+        Args:
+            priority (Priority, optional): Priority class of the request. Defaults to INTERACTIVE.
+            session (Optional[str], optional): Conversation the request belongs to. Defaults to None.
+            supersede (bool, optional): Cancel the session's earlier requests. Defaults to False.
+
+        Yields:
+            Ticket: The admitted ticket; streaming callers should stop once ticket.cancelled is set.
+
+        Raises:
+            RequestCancelled: If the request is superseded while it waits.
+        """
+        ticket = Ticket(priority, session)
+        ticket._loop = asyncio.get_running_loop()
+        ticket._future = ticket._loop.create_future()
+        self._enqueue(priority, session, supersede, ticket)
+        try:
+            await ticket._future
+        except asyncio.CancelledError:
+            self._cancel(ticket)
+            if ticket.granted:
+                # The slot was granted just before the coroutine went away
+                self._release(ticket)
+            raise
+        self._admit(ticket)
+        try:
+            yield ticket
+        finally:
+            self._release(ticket)
+
+    def cancel_session(self, session: str) -> int:
+        """
+        Cancel every queued or running request of a session.
+
+        Queued requests raise RequestCancelled; running requests have ticket.cancelled set so
+        streams can stop early. A running non-streaming request cannot be interrupted.
+
+        Args:
+            session (str): The session to cancel.
+
+        Returns:
+            int: Number of requests cancelled.
+        """
+        with self._lock:
+            tickets = [t for _, _, t in self._queue if t.session == session]
+            tickets += [t for t in self._running if t.session == session]
+        for ticket in tickets:
+            self._cancel(ticket)
+        return len(tickets)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get queue-time metrics per priority class.
+
+        Returns:
+            Dict[str, Any]: Request counts, cancellations and queue times, plus current load.
+        """
+        with self._lock:
+            stats = {name: dict(metrics) for name, metrics in self._metrics.items()}
+            queued = sum(1 for _, _, t in self._queue if not t.cancelled.is_set())
+            running = len(self._running)
+        for metrics in stats.values():
+            admitted = metrics["requests"]
+            metrics["avg_queue_time"] = metrics["total_queue_time"] / admitted if admitted else 0.0
+        stats["queued"] = queued
+        stats["running"] = running
+        stats["max_concurrent"] = self.max_concurrent
+        return stats
+
+    def _enqueue(self, priority: Priority, session: Optional[str], supersede: bool,
+                 ticket: Optional[Ticket] = None) -> Ticket:
+        """Add a ticket to the queue, cancelling the session's earlier requests if asked."""
+        if supersede and session is not None:
+            self.cancel_session(session)
+        ticket = ticket or Ticket(priority, session)
+        with self._lock:
+            heapq.heappush(self._queue, (int(priority), next(self._counter), ticket))
+            self._dispatch()
+        return ticket
+
+    def _admit(self, ticket: Ticket):
+        """Record queue time for a woken ticket, or raise if it was cancelled while queued."""
+        if not ticket.granted:
+            with self._lock:
+                self._metrics[ticket.priority.name.lower()]["cancelled"] += 1
+            raise RequestCancelled("Request was superseded before it started")
+        with self._lock:
+            ticket.queue_time = time.perf_counter() - ticket.enqueued_at
+            metrics = self._metrics[ticket.priority.name.lower()]
+            metrics["requests"] += 1
+            metrics["total_queue_time"] += ticket.queue_time
+            metrics["max_queue_time"] = max(metrics["max_queue_time"], ticket.queue_time)
+
+    def _cancel(self, ticket: Ticket):
+        """Cancel a ticket; a queued ticket is woken so its caller can raise."""
+        with self._lock:
+            ticket.cancelled.set()
+            if not ticket.granted:
+                self._queue = [entry for entry in self._queue if entry[2] is not ticket]
+                heapq.heapify(self._queue)
+                ticket._wake()
+
+    def _release(self, ticket: Ticket):
+        """Return a ticket's slot and admit the next waiting request."""
+        with self._lock:
+            self._running.discard(ticket)
+            self._dispatch()
+
+    def _dispatch(self):
+        """Grant free slots to the highest-priority waiting tickets. Called with the lock held."""
+        while self._queue and len(self._running) < self.max_concurrent:
+            _, _, ticket = heapq.heappop(self._queue)
+            if ticket.cancelled.is_set():
+                continue
+            ticket.granted = True
+            self._running.add(ticket)
+            ticket._wake()
+
+_default_scheduler = None
+_default_lock = threading.Lock()
+
+def get_default_scheduler() -> LLMScheduler:
+    """
+    Get the scheduler shared by every LLM client in this process.
+
+    Returns:
+        LLMScheduler: The process-wide scheduler.
+    """
+    global _default_scheduler
+    with _default_lock:
+        if _default_scheduler is None:
+            _default_scheduler = LLMScheduler()
+        return _default_scheduler
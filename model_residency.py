@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Model Residency Manager
+This module keeps DeepSeek R1 loaded in Ollama: it preloads the model at startup, refreshes
+its keep_alive while the agent is in use, caches availability checks for a short time, and
+reports the cold-load time against the warm time to first token.
+"""
+
+import time
+import logging
+import threading
+from typing import Any, Callable, Dict, Optional, Union
+
+from llm_scheduler import Priority
+
+logger = logging.getLogger("ModelResidency")
+
+_availability = {}  # (host, model) -> (checked_at, available)
+_availability_lock = threading.Lock()
+
+def cached_availability(host: str, model: str, check: Callable[[], bool], ttl: float) -> bool:
+    """
+    Return a recent availability result for a model, running check() only when it is stale.
+
+    Args:
+        host (str): The Ollama host URL.
+        model (str): The model name.
+        check (Callable[[], bool]): Queries Ollama for the model.
+        ttl (float): Seconds a result stays valid.
+
+    Returns:
+        bool: True if the model is available.
+    """
+    key = (host, model)
+    with _availability_lock:
+        entry = _availability.get(key)
+    if entry is not None and time.monotonic() - entry[0] < ttl:
+        return entry[1]
+    available = check()
+    with _availability_lock:
+        _availability[key] = (time.monotonic(), available)
+    return available
+
+def invalidate_availability(host: str, model: str):
+    """
+    Forget the cached availability of a model, e.g. after pulling it.
+
+    Args:
+        host (str): The Ollama host URL.
+        model (str): The model name.
+    """
+    with _availability_lock:
+        _availability.pop((host, model), None)
+
+class ModelResidency:
+    """
+    Preload a model and keep it resident in Ollama while the agent is active.
+    """
+
+    def __init__(self, deepseek, keep_alive: Union[str, int] = "30m", refresh_interval: float = 240.0,
+                 active_window: float = 900.0):
+        """
+        Initialize the residency manager.
+
+        Args:
+            deepseek (DeepSeekIntegration): The integration whose model should stay loaded.
+            keep_alive (Union[str, int], optional): How long Ollama keeps the model loaded after a
+                                                    request. Defaults to "30m".
+            refresh_interval (float, optional): Seconds between keep_alive refreshes. Defaults to 240.0.
+            active_window (float, optional): Seconds since the last request during which the agent
+                                             counts as active. Defaults to 900.0.
+        """
+        self.deepseek = deepseek
+        self.keep_alive = keep_alive
+        self.refresh_interval = refresh_interval
+        self.active_window = active_window
+        self.metrics = {
+            "cold_load_seconds": None,
+            "ollama_load_seconds": None,
+            "warm_ttft_seconds": None,
+            "refreshes": 0,
+            "last_refresh": None
+        }
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """
+        Warm the model up in the background and start refreshing its keep_alive.
+        """
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stop refreshing the keep_alive. The model stays loaded until keep_alive runs out.
+        """
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def warm_up(self) -> Optional[float]:
+        """
+        Load the model with an empty prompt, which makes Ollama load it without generating.
+
+        Returns:
+            Optional[float]: Seconds the load took, or None if it failed.
+        """
+        start = time.perf_counter()
+        result = self._load()
+        if result is None:
+            return None
+        elapsed = time.perf_counter() - start
+        self.metrics["cold_load_seconds"] = elapsed
+        if result.get("load_duration") is not None:
+            self.metrics["ollama_load_seconds"] = result["load_duration"] / 1e9
+        logger.info(f"Model {self.deepseek.model_name} loaded in {elapsed:.2f}s")
+        return elapsed
+
+    def refresh(self) -> bool:
+        """
+        Reset the model's keep_alive timer in Ollama.
+
+        Returns:
+            bool: True if the refresh succeeded.
+        """
+        if self._load() is None:
+            return False
+        self.metrics["refreshes"] += 1
+        self.metrics["last_refresh"] = time.time()
+        return True
+
+    def measure_ttft(self, prompt: str = "Hi") -> Optional[float]:
+        """
+        Measure the time to first token of a short request against the loaded model. The request
+        waits behind user requests, so a busy agent adds its queue time to the measurement.
+
+        Args:
+            prompt (str, optional): The prompt to send. Defaults to "Hi".
+
+        Returns:
+            Optional[float]: Seconds until the first token arrived, or None if the request failed.
+        """
+        stream = self.deepseek.iter_generate(prompt, num_predict=1, keep_alive=self.keep_alive,
+                                             priority=Priority.BACKGROUND, flush_interval=0, show_reasoning=True)
+        try:
+            start = time.perf_counter()
+            for _ in stream:
+                ttft = time.perf_counter() - start
+                self.metrics["warm_ttft_seconds"] = ttft
+                return ttft
+        except Exception as e:
+            logger.warning(f"Failed to measure time to first token: {e}")
+        finally:
+            stream.close()
+        return None
+
+    def is_active(self) -> bool:
+        """
+        Check whether the agent has used the model recently.
+
+        Returns:
+            bool: True if the last request was within the active window.
+        """
+        return time.monotonic() - self.deepseek.last_used < self.active_window
+
+    def report(self) -> Dict[str, Any]:
+        """
+        Get the residency metrics.
+
+        Returns:
+            Dict[str, Any]: Cold-load time, Ollama's own load time, warm time to first token
+                            and keep_alive refresh counters.
+        """
+        report = dict(self.metrics)
+        cold, warm = report["cold_load_seconds"], report["warm_ttft_seconds"]
+        report["cold_to_warm_ratio"] = cold / warm if cold and warm else None
+        return report
+
+    def _load(self) -> Optional[Dict[str, Any]]:
+        """Send an empty prompt so Ollama loads the model and resets its keep_alive, queued behind user requests."""
+        try:
+            result = self.deepseek.generate_turn("", keep_alive=self.keep_alive, priority=Priority.BACKGROUND)
+        except Exception as e:
+            logger.warning(f"Failed to load model {self.deepseek.model_name}: {e}")
+            return None
+        if result is None:
+            logger.warning(f"Failed to load model {self.deepseek.model_name}")
+        return result
+
+    def _run(self):
+        """Warm up once, then refresh the keep_alive while the agent is active."""
+        if not self.deepseek.ensure_available():
+            logger.warning(f"Model {self.deepseek.model_name} is not available; skipping warm-up")
+            return
+        if self.warm_up() is not None:
+            self.measure_ttft()
+            logger.info(f"Model residency: {self.report()}")
+        while not self._stop_event.wait(self.refresh_interval):
+            if self.is_active():
+                self.refresh()
@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+NDJSON Stream Decoding
+This module decodes Ollama's newline-delimited JSON streams straight from the raw bytes
+of the response and batches the decoded tokens, so a fast stream costs one callback per
+flush interval instead of one per token. orjson is used when it is installed.
+"""
+
+import json
+import time
+import queue
+import threading
+from typing import Any, Callable, Iterable, Iterator, List, Optional
+
+try:
+    import orjson
+    _loads = orjson.loads
+    JSON_BACKEND = "orjson"
+except ImportError:
+    _loads = json.loads
+    JSON_BACKEND = "json"
+
+class NDJSONDecoder:
+    """
+    Incremental decoder that turns arbitrary byte chunks into decoded JSON objects.
+    """
+
+    def __init__(self, on_error: Optional[Callable[[bytes, Exception], None]] = None):
+        """
+        Initialize the decoder.
+
+        Args:
+            on_error (Optional[Callable[[bytes, Exception], None]], optional): Called with a line that
+                is not valid JSON; the line is then skipped. Defaults to None (raise the error).
+        """
+        self.on_error = on_error
+        self._buffer = b""
+
+    def feed(self, data: bytes) -> List[Any]:
+        """
+        Decode every complete line in the data received so far.
+
+        Args:
+            data (bytes): The next chunk of the stream.
+
+        Returns:
+            List[Any]: The objects decoded from the completed lines.
+        """
+        buffer = self._buffer + data if self._buffer else data
+        objects = []
+        start = 0
+        while True:
+            end = buffer.find(b"\n", start)
+            if end < 0:
+                break
+            if end > start:
+                self._decode(buffer[start:end], objects)
+            start = end + 1
+        self._buffer = buffer[start:]
+        return objects
+
+    def close(self) -> List[Any]:
+        """
+        Decode a final line that was not terminated by a newline.
+
+        Returns:
+            List[Any]: The object decoded from the remaining data, if any.
+        """
+        objects = []
+        if self._buffer.strip():
+            self._decode(self._buffer, objects)
+        self._buffer = b""
+        return objects
+
+    def _decode(self, line: bytes, objects: List[Any]):
+        """Decode one line into objects, reporting invalid JSON through on_error."""
+        try:
+            objects.append(_loads(line))
+        except ValueError as e:
+            if self.on_error is None:
+                raise
+            self.on_error(line, e)
+
+def iter_ndjson(chunks: Iterable[bytes], on_error: Optional[Callable[[bytes, Exception], None]] = None) -> Iterator[Any]:
+    """
+    Decode a stream of byte chunks into JSON objects.
+
+    Args:
+        chunks (Iterable[bytes]): Raw response data, e.g. response.iter_content(chunk_size=None).
+        on_error (Optional[Callable[[bytes, Exception], None]], optional): See NDJSONDecoder.
+
+    Yields:
+        Any: Each decoded object.
+    """
+    decoder = NDJSONDecoder(on_error)
+    for chunk in chunks:
+        yield from decoder.feed(chunk)
+    yield from decoder.close()
+
+class TokenBatcher:
+    """
+    Join tokens into larger chunks, emitting at most one chunk per flush interval.
+
+    The first token is emitted immediately so time to first token is unaffected. Pending
+    tokens are due once the interval has passed; time_to_flush() tells a reader how long it
+    may wait for the next token before flushing them.
+    """
+
+    def __init__(self, flush_interval: float = 0.05):
+        """
+        Initialize the batcher.
+
+        Args:
+            flush_interval (float, optional): Minimum seconds between emitted chunks. Defaults to 0.05.
+        """
+        self.flush_interval = flush_interval
+        self._pending = []
+        self._last_flush = None
+
+    def add(self, token: str) -> Optional[str]:
+        """
+        Add a token.
+
+        Args:
+            token (str): The next token.
+
+        Returns:
+            Optional[str]: A chunk to emit if the flush interval has passed, otherwise None.
+        """
+        self._pending.append(token)
+        if self._last_flush is None or time.monotonic() - self._last_flush >= self.flush_interval:
+            return self.flush()
+        return None
+
+    def time_to_flush(self) -> Optional[float]:
+        """
+        Get how long the pending tokens may still wait.
+
+        Returns:
+            Optional[float]: Seconds until the pending tokens are due (zero if overdue), or None if
+                             nothing is pending.
+        """
+        if not self._pending:
+            return None
+        return max(0.0, self._last_flush + self.flush_interval - time.monotonic())
+
+    def flush(self) -> Optional[str]:
+        """
+        Emit whatever is pending.
+
+        Returns:
+            Optional[str]: The pending tokens joined together, or None if there are none.
+        """
+        if not self._pending:
+            return None
+        chunk = "".join(self._pending)
+        self._pending.clear()
+        self._last_flush = time.monotonic()
+        return chunk
+
+def batch_tokens(tokens: Iterable[str], flush_interval: float = 0.05, max_buffered: int = 16) -> Iterator[str]:
+    """
+    Batch a token stream by flush interval.
+
+    After the first token, tokens are read and batched on a worker thread, and the caller
+    flushes pending tokens itself once the flush interval has passed, instead of holding
+    them until the next token arrives. Closing the generator stops the worker, which closes
+    the token stream after the token it is waiting for.
+
+    Args:
+        tokens (Iterable[str]): The token stream.
+        flush_interval (float, optional): Minimum seconds between emitted chunks. Defaults to 0.05.
+                                          Zero or less passes tokens through unchanged.
+        max_buffered (int, optional): Maximum number of chunks batched ahead of the consumer.
+                                      Defaults to 16.
+
+    Yields:
+        str: The batched chunks.
+    """
+    iterator = iter(tokens)
+    if flush_interval <= 0:
+        yield from iterator
+        return
+    batcher = TokenBatcher(flush_interval)
+    # The first token is read and emitted on the caller's thread, so it has no hand-off delay
+    # and a stream abandoned at its first token is closed at once
+    done = object()
+    first = next(iterator, done)
+    if first is done:
+        return
+    try:
+        yield batcher.add(first)
+    except GeneratorExit:
+        _close(iterator)
+        raise
+
+    lock = threading.Lock()
+    buffer = queue.Queue(maxsize=max_buffered)
+    stop = threading.Event()
+    # Tells the caller that tokens are pending, so it starts timing their deadline
+    pending = object()
+
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produce():
+        outcome = done
+        try:
+            for token in iterator:
+                with lock:
+                    was_idle = batcher.time_to_flush() is None
+                    chunk = batcher.add(token)
+                if chunk is not None or was_idle:
+                    if not put(pending if chunk is None else chunk):
+                        break
+        except Exception as e:
+            outcome = e
+        finally:
+            _close(iterator)
+        put(outcome)
+
+    threading.Thread(target=produce, name="TokenBatcher", daemon=True).start()
+    try:
+        while True:
+            with lock:
+                timeout = batcher.time_to_flush()
+            try:
+                item = buffer.get(timeout=timeout)
+            except queue.Empty:
+                # The next token is late; emit what is pending instead of holding it back, unless
+                # a chunk was queued meanwhile and has to go out first
+                with lock:
+                    chunk = batcher.flush() if buffer.empty() else None
+                if chunk is not None:
+                    yield chunk
+                continue
+            if item is pending:
+                continue
+            if item is done:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()
+    chunk = batcher.flush()
+    if chunk is not None:
+        yield chunk
+
+def _close(iterator: Iterator):
+    """Close an iterator if it is a generator or otherwise closable."""
+    close = getattr(iterator, "close", None)
+    if close is not None:
+        close()
+
+def _benchmark(tokens: int = 200000):
+    """Compare per-token overhead of line-by-line json.loads with the incremental decoder."""
+    lines = [
+        json.dumps({"model": "deepseek-r1:8b", "created_at": "2025-01-01T00:00:00Z",
+                    "response": f" tok{i}", "done": False}).encode("utf-8")
+        for i in range(tokens)
+    ]
+    payload = b"\n".join(lines) + b"\n"
+    # Network reads arrive in arbitrary slices; 1 KiB is typical for a local socket
+    chunks = [payload[i:i + 1024] for i in range(0, len(payload), 1024)]
+
+    def callback(text):
+        pass
+
+    def line_by_line():
+        calls = 0
+        for line in b"".join(chunks).split(b"\n"):
+            if not line:
+                continue
+            chunk = json.loads(line)
+            if chunk.get("response"):
+                callback(chunk["response"])
+                calls += 1
+        return calls
+
+    def incremental():
+        calls = 0
+        texts = (chunk["response"] for chunk in iter_ndjson(chunks) if chunk.get("response"))
+        for text in batch_tokens(texts, flush_interval=0.05):
+            callback(text)
+            calls += 1
+        return calls
+
+    for name, run in (("iter_lines + json.loads", line_by_line),
+                      (f"NDJSONDecoder ({JSON_BACKEND}) + batching", incremental)):
+        start = time.perf_counter()
+        calls = run()
+        elapsed = time.perf_counter() - start
+        print(f"{name:40s} {elapsed * 1e6 / tokens:7.2f} us/token  {calls:7d} callbacks")
+
+if __name__ == "__main__":
+    _benchmark()
@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+Asynchronous Ollama Client
+This module provides an asyncio-native client for DeepSeek R1 through Ollama, so the
+async agents can plan, synthesize and run other coroutines without blocking the event loop.
+"""
+
+import time
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Mapping, Optional
+
+try:
+    import ollama
+except ImportError:
+    ollama = None
+
+from llm_scheduler import LLMScheduler, Priority, RequestCancelled, get_default_scheduler
+from generation_options import GenerationOptions, options_for
+from circuit_breaker import get_breaker
+from llm_metrics import MetricsRegistry, get_default_registry
+from reasoning_filter import ReasoningFilter, strip_reasoning
+from streaming_json import afirst_json_object
+
+logger = logging.getLogger("AsyncOllamaClient")
+
+class AsyncOllamaClient:
+    """
+    Awaitable chat/generate calls with async-iterator streaming on top of ``ollama.AsyncClient``.
+    """
+
+    def __init__(self, host: str = "http://localhost:11434", model_name: str = "deepseek-r1:8b",
+                 timeout: Optional[float] = 300.0, scheduler: Optional[LLMScheduler] = None,
+                 retries: int = 2, metrics: Optional[MetricsRegistry] = None, show_reasoning: bool = False,
+                 reasoning_sink: Optional[Callable[[str], None]] = None):
+        """
+        Initialize the async client.
+
+        Args:
+            host (str, optional): The Ollama host URL. Defaults to "http://localhost:11434".
+            model_name (str, optional): Model used when a call does not name one. Defaults to "deepseek-r1:8b".
+            timeout (Optional[float], optional): Seconds to wait for a response. Defaults to 300.0.
+            scheduler (Optional[LLMScheduler], optional): Scheduler that orders and limits requests to
+                                                          Ollama. Defaults to the process-wide scheduler.
+            retries (int, optional): Extra attempts for a non-streaming request that could not connect.
+                                     Defaults to 2.
+            metrics (Optional[MetricsRegistry], optional): Registry that receives per-call latency and
+                                                           throughput. Defaults to the process-wide registry.
+            show_reasoning (bool, optional): Keep the model's <think> blocks in responses. Defaults to False.
+            reasoning_sink (Optional[Callable[[str], None]], optional): Receives the reasoning text that is
+                                                                        filtered out. Defaults to None.
+        """
+        if ollama is None:
+            raise ImportError("Ollama module is not installed or not found")
+        self.host = host.rstrip("/")
+        self.model_name = model_name
+        self._client = ollama.AsyncClient(host=self.host, timeout=timeout)
+        self.scheduler = scheduler or get_default_scheduler()
+        # Shared with DeepSeekIntegration, so either client notices an outage for both
+        self.breaker = get_breaker(self.host)
+        self.retries = retries
+        self.metrics = metrics or get_default_registry()
+        self.show_reasoning = show_reasoning
+        self.reasoning_sink = reasoning_sink
+
+    async def chat(self, messages: List[Dict[str, str]], model: Optional[str] = None,
+                   priority: Priority = Priority.INTERACTIVE, session: Optional[str] = None,
+                   supersede: bool = False, call_site: Optional[str] = None, **kwargs) -> Mapping[str, Any]:
+        """
+        Generate a response for a chat conversation.
+
+        Args:
+            messages (List[Dict[str, str]]): List of message dictionaries with 'role' and 'content' keys.
+            model (Optional[str], optional): Model to use. Defaults to the client's model.
+            priority (Priority, optional): Scheduling class of the request. Defaults to INTERACTIVE.
+            session (Optional[str], optional): Conversation the request belongs to. Defaults to None.
+            supersede (bool, optional): Cancel the session's earlier requests. Defaults to False.
+            call_site (Optional[str], optional): "planning", "synthesis", "chat", "voice" or "summary"; tags
+                the call's timings and supplies the default options. Defaults to None.
+            **kwargs: Additional arguments for ``ollama.AsyncClient.chat`` (options, format, keep_alive);
+                      options may be a GenerationOptions.
+
+        Returns:
+            Mapping[str, Any]: The Ollama response; the reply is in ``response['message']['content']``.
+
+        Raises:
+            RequestCancelled: If the request was superseded before it started.
+            CircuitOpenError: If Ollama has been failing and is not being called.
+        """
+        async with self.scheduler.aslot(priority, session, supersede) as ticket:
+            response = await self._call(lambda: self._client.chat(model=model or self.model_name, messages=messages,
+                                                                  **_request_kwargs(kwargs, call_site)))
+        self.metrics.record_response(call_site, response, queue_time=ticket.queue_time)
+        if not self.show_reasoning:
+            response["message"]["content"] = strip_reasoning(response["message"]["content"], self.reasoning_sink)
+        return response
+
+    async def generate(self, prompt: str, model: Optional[str] = None,
+                       priority: Priority = Priority.INTERACTIVE, session: Optional[str] = None,
+                       supersede: bool = False, call_site: Optional[str] = None, **kwargs) -> Mapping[str, Any]:
+        """
+        Generate a response for a single prompt.
+
+        Args:
+            prompt (str): The prompt to send to the model.
+            model (Optional[str], optional): Model to use. Defaults to the client's model.
+            priority (Priority, optional): Scheduling class of the request. Defaults to INTERACTIVE.
+            session (Optional[str], optional): Conversation the request belongs to. Defaults to None.
+            supersede (bool, optional): Cancel the session's earlier requests. Defaults to False.
+            call_site (Optional[str], optional): "planning", "synthesis", "chat", "voice" or "summary"; tags
+                the call's timings and supplies the default options. Defaults to None.
+            **kwargs: Additional arguments for ``ollama.AsyncClient.generate``.
+
+        Returns:
+            Mapping[str, Any]: The Ollama response; the text is in ``response['response']``.
+
+        Raises:
+            RequestCancelled: If the request was superseded before it started.
+            CircuitOpenError: If Ollama has been failing and is not being called.
+        """
+        async with self.scheduler.aslot(priority, session, supersede) as ticket:
+            response = await self._call(lambda: self._client.generate(model=model or self.model_name, prompt=prompt,
+                                                                      **_request_kwargs(kwargs, call_site)))
+        self.metrics.record_response(call_site, response, queue_time=ticket.queue_time)
+        if not self.show_reasoning:
+            response["response"] = strip_reasoning(response["response"], self.reasoning_sink)
+        return response
+
+    async def chat_stream(self, messages: List[Dict[str, str]], model: Optional[str] = None,
+                          priority: Priority = Priority.INTERACTIVE, session: Optional[str] = None,
+                          supersede: bool = False, call_site: Optional[str] = None,
+                          **kwargs) -> AsyncIterator[str]:
+        """
+        Stream a chat response chunk by chunk.
+
+        Args:
+            messages (List[Dict[str, str]]): List of message dictionaries with 'role' and 'content' keys.
+            model (Optional[str], optional): Model to use. Defaults to the client's model.
+            priority (Priority, optional): Scheduling class of the request. Defaults to INTERACTIVE.
+            session (Optional[str], optional): Conversation the request belongs to. Defaults to None.
+            supersede (bool, optional): Cancel the session's earlier requests. Defaults to False.
+            call_site (Optional[str], optional): "planning", "synthesis", "chat", "voice" or "summary"; tags
+                the call's timings and supplies the default options. Defaults to None.
+            **kwargs: Additional arguments for ``ollama.AsyncClient.chat``.
+
+        Yields:
+            str: Each content chunk as it is generated.
+
+        Raises:
+            RequestCancelled: If the request was superseded.
+            CircuitOpenError: If Ollama has been failing and is not being called.
+        """
+        async with self.scheduler.aslot(priority, session, supersede) as ticket:
+            sent = time.monotonic()
+            ttft = visible_ttft = None
+            reasoning = None if self.show_reasoning else ReasoningFilter(self.reasoning_sink)
+            stream = await self._call(lambda: self._client.chat(model=model or self.model_name, messages=messages,
+                                                                stream=True, **_request_kwargs(kwargs, call_site)),
+                                      retries=0)
+            try:
+                async for part in stream:
+                    if ticket.cancelled.is_set():
+                        raise RequestCancelled("Request was superseded")
+                    content = part["message"]["content"]
+                    if content and ttft is None:
+                        ttft = time.monotonic() - sent
+                    if reasoning is not None:
+                        content = reasoning.feed(content or "")
+                        if part.get("done"):
+                            content += reasoning.close()
+                    if content:
+                        if visible_ttft is None:
+                            visible_ttft = time.monotonic() - sent
+                        yield content
+                    if part.get("done"):
+                        self.metrics.record_response(call_site, part, queue_time=ticket.queue_time, ttft=ttft,
+                                                     visible_ttft=visible_ttft)
+            finally:
+                # Closing the response early makes Ollama stop generating
+                await stream.aclose()
+
+    async def generate_stream(self, prompt: str, model: Optional[str] = None,
+                              priority: Priority = Priority.INTERACTIVE, session: Optional[str] = None,
+                              supersede: bool = False, call_site: Optional[str] = None,
+                              **kwargs) -> AsyncIterator[str]:
+        """
+        Stream a generated response chunk by chunk.
+
+        Args:
+            prompt (str): The prompt to send to the model.
+            model (Optional[str], optional): Model to use. Defaults to the client's model.
+            priority (Priority, optional): Scheduling class of the request. Defaults to INTERACTIVE.
+            session (Optional[str], optional): Conversation the request belongs to. Defaults to None.
+            supersede (bool, optional): Cancel the session's earlier requests. Defaults to False.
+            call_site (Optional[str], optional): "planning", "synthesis", "chat", "voice" or "summary"; tags
+                the call's timings and supplies the default options. Defaults to None.
+            **kwargs: Additional arguments for ``ollama.AsyncClient.generate``.
+
+        Yields:
+            str: Each response chunk as it is generated.
+
+        Raises:
+            RequestCancelled: If the request was superseded.
+            CircuitOpenError: If Ollama has been failing and is not being called.
+        """
+        async with self.scheduler.aslot(priority, session, supersede) as ticket:
+            sent = time.monotonic()
+            ttft = visible_ttft = None
+            reasoning = None if self.show_reasoning else ReasoningFilter(self.reasoning_sink)
+            stream = await self._call(lambda: self._client.generate(model=model or self.model_name, prompt=prompt,
+                                                                    stream=True, **_request_kwargs(kwargs, call_site)),
+                                      retries=0)
+            try:
+                async for part in stream:
+                    if ticket.cancelled.is_set():
+                        raise RequestCancelled("Request was superseded")
+                    chunk = part["response"]
+                    if chunk and ttft is None:
+                        ttft = time.monotonic() - sent
+                    if reasoning is not None:
+                        chunk = reasoning.feed(chunk or "")
+                        if part.get("done"):
+                            chunk += reasoning.close()
+                    if chunk:
+                        if visible_ttft is None:
+                            visible_ttft = time.monotonic() - sent
+                        yield chunk
+                    if part.get("done"):
+                        self.metrics.record_response(call_site, part, queue_time=ticket.queue_time, ttft=ttft,
+                                                     visible_ttft=visible_ttft)
+            finally:
+                await stream.aclose()
+
+    async def chat_json(self, messages: List[Dict[str, str]], **kwargs) -> Optional[Dict[str, Any]]:
+        """
+        Stream a chat response and return the first JSON object in it, stopping the generation
+        as soon as the object is complete.
+
+        Args:
+            messages (List[Dict[str, str]]): List of message dictionaries with 'role' and 'content' keys.
+            **kwargs: Arguments for chat_stream (model, priority, session, supersede, call_site, options).
+
+        Returns:
+            Optional[Dict[str, Any]]: The object, or None if the response did not contain one.
+
+        Raises:
+            RequestCancelled: If the request was superseded.
+            CircuitOpenError: If Ollama has been failing and is not being called.
+        """
+        return await afirst_json_object(self.chat_stream(messages, **kwargs))
+
+    async def list_models(self) -> List[str]:
+        """
+        List the models installed in Ollama.
+
+        Returns:
+            List[str]: Names of the installed models.
+        """
+        response = await self._call(self._client.list)
+        return [model.get("model") or model.get("name") for model in response["models"]]
+
+    async def _call(self, request: Callable[[], Awaitable[Any]], retries: Optional[int] = None) -> Any:
+        """
+        Make a request through the circuit breaker, retrying connection failures.
+
+        Args:
+            request (Callable[[], Awaitable[Any]]): Returns the coroutine to await.
+            retries (Optional[int], optional): Extra attempts. Defaults to the client's retries.
+
+        Returns:
+            Any: The result of the request.
+        """
+        return await self.breaker.acall(request, retries=self.retries if retries is None else retries,
+                                        retry_on=(ConnectionError,), ignore=(ollama.ResponseError,))
+
+    async def close(self):
+        """
+        Close the underlying HTTP connections.
+        """
+        close = getattr(self._client, "close", None)
+        if close is not None:
+            await close()
+
+def _request_kwargs(kwargs: Dict[str, Any], call_site: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Expand a GenerationOptions passed as options into the client's options/keep_alive/format arguments.
+
+    Args:
+        kwargs (Dict[str, Any]): Keyword arguments given by the caller.
+        call_site (Optional[str], optional): Call site whose default options apply when the caller
+                                             gave none. Defaults to None.
+
+    Returns:
+        Dict[str, Any]: Keyword arguments for ``ollama.AsyncClient``.
+    """
+    options = kwargs.get("options")
+    if options is None and call_site is not None:
+        options = options_for(call_site)
+    if isinstance(options, GenerationOptions):
+        kwargs = dict(kwargs)
+        kwargs.pop("options", None)
+        kwargs.update(options.to_request())
+    return kwargs
+
+async def main():
+    """
+    Run a planning-sized and a chat-sized request concurrently to show the loop stays free.
+    """
+    client = AsyncOllamaClient()
+
+    async def heartbeat():
+        for _ in range(3):
+            print("[event loop is responsive]")
+            await asyncio.sleep(1)
+
+    async def stream_answer():
+        async for chunk in client.chat_stream([{"role": "user", "content": "Say hello in one sentence."}]):
+            print(chunk, end="", flush=True)
+        print()
+
+    try:
+        await asyncio.gather(heartbeat(), stream_answer())
+    finally:
+        await client.close()
+
+if __name__ == "__main__":
+    asyncio.run(main())
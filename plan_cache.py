@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+"""
+JARVIS Plan Cache
+This module remembers execution plans that succeeded, keyed on the normalised intent of the
+request, so a repeated request can reuse its plan instead of paying for another DeepSeek R1
+planning generation. Plans are kept in the learned_patterns table of the JARVIS memory
+database under a pattern type per plan format, and requests that differ only in quoted text,
+URLs, paths or numbers share one parameterised plan.
+"""
+
+import re
+import json
+import time
+import sqlite3
+import threading
+from datetime import datetime
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+PATTERN_TYPE = "execution_plan"
+
+# Values that can change between otherwise identical requests
+_SLOT_PATTERN = re.compile(
+    r'"([^"]+)"'                      # "double quoted"
+    r"|'([^']+)'"                     # 'single quoted'
+    r"|(https?://\S+)"                # URLs
+    r"|((?:~|\.{1,2})?/[\w.~/-]+)"    # paths
+    r"|(?<![\w.])(\d+(?:\.\d+)?)(?![\w])"  # numbers
+)
+_PLACEHOLDER = "<<p{}>>"
+_PLACEHOLDER_PATTERN = re.compile(r"<<p(\d+)>>")
+
+# Words that do not change what a request asks for
+_FILLER_WORDS = {
+    "a", "an", "the", "please", "jarvis", "hey", "can", "could", "would", "you", "me",
+    "for", "now", "just", "kindly"
+}
+
+def _normalise_words(text: str) -> str:
+    words = re.sub(r"[^\w<>]+", " ", text.lower()).split()
+    return " ".join(word for word in words if word not in _FILLER_WORDS)
+
+def normalise_intent(text: str) -> Tuple[str, str, List[str]]:
+    """
+    Normalise a request into cache keys.
+
+    Args:
+        text (str): The user's request.
+
+    Returns:
+        Tuple[str, str, List[str]]: The exact intent, the intent with its variable values
+                                    replaced by placeholders, and those values in order.
+    """
+    values: List[str] = []
+
+    def slot(match: re.Match) -> str:
+        value = next(group for group in match.groups() if group is not None).rstrip(".,;:!?")
+        values.append(value)
+        return f" {_PLACEHOLDER.format(len(values) - 1)} "
+
+    return _normalise_words(text), _normalise_words(_SLOT_PATTERN.sub(slot, text)), values
+
+def _value_patterns(text: str) -> List[re.Pattern]:
+    """
+    Build a pattern for each variable value of a request, in the order normalise_intent() returns them.
+
+    Values match as whole tokens, so "5" does not match inside "0.5" or "15". A bare number is too
+    common to replace wherever it appears ("Python 3" in a plan for "open 3 tabs"), so it only
+    matches next to the word it had beside it in the request.
+    """
+    patterns = []
+    for match in _SLOT_PATTERN.finditer(text):
+        value = next(group for group in match.groups() if group is not None).rstrip(".,;:!?")
+        token = rf"(?<![\w.]){re.escape(value)}(?!\w|\.\w)"
+        if match.group(5) is None:
+            patterns.append(re.compile(token))
+            continue
+        before = re.search(r"(\w+)\W*$", text[:match.start()])
+        after = re.search(r"^\W*(\w+)", text[match.end():])
+        contexts = []
+        if before:
+            contexts.append(rf"(?<=\b{re.escape(before.group(1))}\s){token}")
+        if after:
+            contexts.append(rf"{token}(?=\s+{re.escape(after.group(1))}\b)")
+        patterns.append(re.compile("|".join(contexts) or token, re.IGNORECASE))
+    return patterns
+
+def _map_strings(data: Any, transform, fields: Optional[Iterable[str]] = None, inside: bool = False) -> Any:
+    """Apply transform to every string inside a JSON-like structure, or only to those under the given keys."""
+    if isinstance(data, str):
+        return transform(data) if fields is None or inside else data
+    if isinstance(data, list):
+        return [_map_strings(item, transform, fields, inside) for item in data]
+    if isinstance(data, dict):
+        return {key: _map_strings(item, transform, fields, inside or (fields is not None and key in fields))
+                for key, item in data.items()}
+    return data
+
+def _contains(data: Any, pattern: re.Pattern, fields: Optional[Iterable[str]] = None, inside: bool = False) -> bool:
+    if isinstance(data, str):
+        return (fields is None or inside) and pattern.search(data) is not None
+    if isinstance(data, list):
+        return any(_contains(item, pattern, fields, inside) for item in data)
+    if isinstance(data, dict):
+        return any(_contains(item, pattern, fields, inside or (fields is not None and key in fields))
+                   for key, item in data.items())
+    return False
+
+@dataclass
+class PlanMatch:
+    """A cached plan selected for reuse"""
+    key: str
+    plan: Any
+    confidence: float
+    planning_time: float
+
+class PlanCache:
+    """
+    Cache of successful execution plans, backed by the learned_patterns table.
+    """
+
+    def __init__(self, db_path: Optional[str] = "jarvis_ultimate_memory.db", min_confidence: float = 0.8,
+                 max_entries: int = 500, pattern_type: str = PATTERN_TYPE,
+                 validate: Optional[Callable[[Any], bool]] = None,
+                 parameter_fields: Optional[Iterable[str]] = None):
+        """
+        Initialize the plan cache.
+
+        Args:
+            db_path (Optional[str], optional): SQLite file holding the learned_patterns table, or None to
+                                               keep plans in memory only. Defaults to "jarvis_ultimate_memory.db".
+            min_confidence (float, optional): Lowest success rate at which a cached plan is reused.
+                                              Defaults to 0.8.
+            max_entries (int, optional): Maximum number of cached plans. Defaults to 500.
+            pattern_type (str, optional): learned_patterns type the plans are stored under. Callers with
+                                          different plan formats must use different types. Defaults to
+                                          "execution_plan".
+            validate (Optional[Callable[[Any], bool]], optional): Checks that a cached plan has the format
+                the caller expects; plans that fail are dropped instead of returned. Defaults to None
+                (accept any plan).
+            parameter_fields (Optional[Iterable[str]], optional): Keys of the plan fields that restate the
+                request, the only ones in which request values are replaced by placeholders. Defaults to
+                None (every string in the plan).
+        """
+        self.min_confidence = min_confidence
+        self.max_entries = max_entries
+        self.pattern_type = pattern_type
+        self.validate = validate
+        self.parameter_fields = set(parameter_fields) if parameter_fields is not None else None
+        self._entries: Dict[str, Dict[str, Any]] = {}  # key -> pattern data (with its row id)
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "stored": 0, "reuse_successes": 0, "reuse_failures": 0,
+                          "invalid": 0}
+        self._planning_time_saved = 0.0
+
+        self._db = None
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute("""
+                CREATE TABLE IF NOT EXISTS learned_patterns (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    pattern_type TEXT,
+                    pattern_data TEXT,
+                    success_rate REAL,
+                    last_used TEXT
+                )
+            """)
+            self._db.commit()
+            rows = self._db.execute(
+                "SELECT id, pattern_data FROM learned_patterns WHERE pattern_type = ?", (pattern_type,)
+            ).fetchall()
+            for row_id, pattern_data in rows:
+                try:
+                    entry = json.loads(pattern_data)
+                except json.JSONDecodeError:
+                    continue
+                entry["id"] = row_id
+                self._entries[entry["key"]] = entry
+
+    @staticmethod
+    def _confidence(entry: Dict[str, Any]) -> float:
+        attempts = entry["successes"] + entry["failures"]
+        return entry["successes"] / attempts if attempts else 0.0
+
+    def lookup(self, user_input: str) -> Optional[PlanMatch]:
+        """
+        Find a cached plan for a request.
+
+        Args:
+            user_input (str): The user's request.
+
+        Returns:
+            Optional[PlanMatch]: The plan to reuse, with its values filled in for this request, or None
+                                 if no plan is cached with enough confidence.
+        """
+        exact, template, values = normalise_intent(user_input)
+        with self._lock:
+            for key in (exact, template):
+                entry = self._entries.get(key)
+                if entry is None or self._confidence(entry) < self.min_confidence:
+                    continue
+                if self.validate is not None and not self.validate(entry["plan"]):
+                    self._counters["invalid"] += 1
+                    self._remove(entry)
+                    continue
+                plan = entry["plan"]
+                if entry["parameterized"]:
+                    plan = _map_strings(plan, lambda text: _PLACEHOLDER_PATTERN.sub(
+                        lambda match: values[int(match.group(1))], text))
+                self._counters["hits"] += 1
+                self._planning_time_saved += entry["planning_time"]
+                self._touch(entry)
+                return PlanMatch(key, plan, self._confidence(entry), entry["planning_time"])
+            self._counters["misses"] += 1
+            return None
+
+    def store(self, user_input: str, plan: Any, planning_time: float):
+        """
+        Remember a freshly generated plan that executed successfully.
+
+        Args:
+            user_input (str): The request the plan was made for.
+            plan (Any): The JSON-serialisable plan.
+            planning_time (float): Seconds the planning generation took.
+        """
+        exact, template, values = normalise_intent(user_input)
+        patterns = _value_patterns(user_input)
+        fields = self.parameter_fields
+        # Only parameterise when every value is distinct and appears in the plan, so that
+        # filling in new values reproduces the whole plan for the new request
+        parameterized = bool(values) and len(set(values)) == len(values) and all(
+            _contains(plan, pattern, fields) for pattern in patterns)
+        if parameterized:
+            key = template
+            for index, pattern in enumerate(patterns):
+                placeholder = _PLACEHOLDER.format(index)
+                plan = _map_strings(plan, lambda text: pattern.sub(placeholder, text), fields)
+        else:
+            key = exact
+
+        with self._lock:
+            entry = self._entries.get(key, {})
+            entry.update({
+                "key": key,
+                "plan": plan,
+                "parameterized": parameterized,
+                "planning_time": planning_time,
+                "successes": 1,
+                "failures": 0
+            })
+            self._entries[key] = entry
+            self._counters["stored"] += 1
+            self._touch(entry)
+            self._evict()
+
+    def record_outcome(self, match: PlanMatch, success: bool):
+        """
+        Record how a reused plan went; plans that keep failing stop being reused.
+
+        Args:
+            match (PlanMatch): The match returned by lookup().
+            success (bool): Whether every step of the reused plan succeeded.
+        """
+        with self._lock:
+            self._counters["reuse_successes" if success else "reuse_failures"] += 1
+            entry = self._entries.get(match.key)
+            if entry is None:
+                return
+            entry["successes" if success else "failures"] += 1
+            self._touch(entry)
+
+    def _touch(self, entry: Dict[str, Any]):
+        """Write an entry back with a fresh last_used time."""
+        entry["last_used"] = time.time()
+        if self._db is None:
+            return
+        pattern_data = json.dumps({key: value for key, value in entry.items() if key != "id"})
+        last_used = datetime.fromtimestamp(entry["last_used"]).isoformat()
+        if "id" in entry:
+            self._db.execute(
+                "UPDATE learned_patterns SET pattern_data = ?, success_rate = ?, last_used = ? WHERE id = ?",
+                (pattern_data, self._confidence(entry), last_used, entry["id"])
+            )
+        else:
+            cursor = self._db.execute(
+                "INSERT INTO learned_patterns (pattern_type, pattern_data, success_rate, last_used) VALUES (?, ?, ?, ?)",
+                (self.pattern_type, pattern_data, self._confidence(entry), last_used)
+            )
+            entry["id"] = cursor.lastrowid
+        self._db.commit()
+
+    def _evict(self):
+        """Drop the least recently used plans over the size limit."""
+        excess = len(self._entries) - self.max_entries
+        if excess <= 0:
+            return
+        oldest = sorted(self._entries.values(), key=lambda entry: entry["last_used"])[:excess]
+        for entry in oldest:
+            self._remove(entry)
+
+    def _remove(self, entry: Dict[str, Any]):
+        """Forget a plan, in memory and in the database."""
+        del self._entries[entry["key"]]
+        if self._db is not None and "id" in entry:
+            self._db.execute("DELETE FROM learned_patterns WHERE id = ?", (entry["id"],))
+            self._db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get the plan cache counters.
+
+        Returns:
+            Dict[str, Any]: Counters plus the hit rate, the planning time saved and the number of cached plans.
+        """
+        with self._lock:
+            stats = dict(self._counters)
+            stats["entries"] = len(self._entries)
+            stats["planning_time_saved"] = self._planning_time_saved
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+    def report(self) -> str:
+        """
+        Summarise the plan cache in one line.
+
+        Returns:
+            str: Hits, hit rate and the planning time saved.
+        """
+        stats = self.stats()
+        return (f"Plan cache: {stats['hits']}/{stats['hits'] + stats['misses']} hits "
+                f"({stats['hit_rate']:.0%}), {stats['planning_time_saved']:.1f}s of planning saved, "
+                f"{stats['entries']} plans cached")
+
+    def close(self):
+        """
+        Close the SQLite connection.
+        """
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+JARVIS Plan Executor
+Runs the steps of an execution plan as a dependency graph: every step whose dependencies
+have finished starts at once, as long as its declared VRAM and CPU needs fit in the live
+hardware headroom, so a plan takes roughly as long as its critical path.
+"""
+
+import time
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional
+
+logger = logging.getLogger("PlanExecutor")
+
+# Hardware requirements a step can declare, and that a headroom function reports as free
+RESOURCES = ("vram_gb", "cpu_cores")
+
+@dataclass
+class PlanNode:
+    """A step of a plan together with what it waits for and what it needs"""
+    node_id: Hashable
+    payload: Any
+    dependencies: List[Hashable] = field(default_factory=list)
+    requirements: Dict[str, float] = field(default_factory=dict)
+
+@dataclass
+class StepOutcome:
+    """What happened to one step"""
+    node_id: Hashable
+    result: Any = None
+    error: Optional[str] = None
+    skipped: bool = False
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+    @property
+    def duration(self) -> float:
+        if self.started_at is None or self.finished_at is None:
+            return 0.0
+        return self.finished_at - self.started_at
+
+class PlanExecutor:
+    """
+    Dependency-aware executor with hardware admission control.
+
+    Steps can be added while the executor is running, so execution can start before the
+    whole plan is known; call close() once the last step has been added.
+    """
+
+    def __init__(self, execute: Callable[[PlanNode], Awaitable[Any]],
+                 headroom: Optional[Callable[[], Dict[str, float]]] = None,
+                 is_failure: Optional[Callable[[Any], bool]] = None,
+                 max_concurrent: int = 4, recheck_interval: float = 0.5):
+        """
+        Args:
+            execute: Coroutine function that runs one step and returns its result
+            headroom: Returns the free amount of each resource in RESOURCES. It is called from a
+                worker thread. None admits steps on max_concurrent alone
+            is_failure: Tells whether a result counts as a failure; dependents of a failed or
+                raising step are skipped
+            max_concurrent: Maximum number of steps running at once
+            recheck_interval: Seconds between headroom checks while a step waits for resources
+        """
+        self.execute = execute
+        self.headroom = headroom
+        self.is_failure = is_failure or (lambda result: False)
+        self.max_concurrent = max(1, max_concurrent)
+        self.recheck_interval = recheck_interval
+        self.outcomes: Dict[Hashable, StepOutcome] = {}
+        self._nodes: Dict[Hashable, PlanNode] = {}
+        self._order: List[Hashable] = []
+        self._running: Dict[Hashable, asyncio.Task] = {}
+        self._closed = False
+        self._changed = asyncio.Event()
+
+    def add_step(self, node: PlanNode):
+        """Add a step; it starts as soon as its dependencies are done and resources allow"""
+        if self._closed:
+            raise RuntimeError("Cannot add steps to a closed plan")
+        if node.node_id in self._nodes:
+            raise ValueError(f"Duplicate step id: {node.node_id}")
+        self._nodes[node.node_id] = node
+        self._order.append(node.node_id)
+        self._changed.set()
+
+    def close(self):
+        """Declare that no more steps will be added"""
+        self._closed = True
+        self._changed.set()
+
+    async def run(self, nodes: List[PlanNode]) -> List[StepOutcome]:
+        """Run a complete plan and return the outcomes in plan order"""
+        for node in nodes:
+            self.add_step(node)
+        self.close()
+        return await self.join()
+
+    async def join(self) -> List[StepOutcome]:
+        """Run steps until the plan is closed and every step has an outcome"""
+        while True:
+            # Clear before scanning so a step finishing during the scan still wakes us
+            self._changed.clear()
+            waiting_for_resources = await self._start_ready_steps()
+            if self._closed and not self._running:
+                if not self._pending():
+                    break
+                if not waiting_for_resources:
+                    # Nothing can run any more: unknown dependencies or a cycle
+                    for node_id in self._pending():
+                        self._skip(node_id, "Unresolvable dependencies")
+                    break
+            timeout = self.recheck_interval if waiting_for_resources else None
+            try:
+                await asyncio.wait_for(self._changed.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return [self.outcomes[node_id] for node_id in self._order]
+
+    def _pending(self) -> List[Hashable]:
+        """Steps that have neither started nor finished"""
+        return [node_id for node_id in self._order
+                if node_id not in self.outcomes and node_id not in self._running]
+
+    async def _start_ready_steps(self) -> bool:
+        """Start every ready step that fits; return True if one is waiting for resources"""
+        ready = []
+        for node_id in self._pending():
+            node = self._nodes[node_id]
+            blocked_by = [dep for dep in node.dependencies
+                          if dep in self.outcomes and self._failed(self.outcomes[dep])]
+            if blocked_by:
+                self._skip(node_id, f"Skipped because step {blocked_by[0]} did not succeed")
+            elif all(dep in self.outcomes for dep in node.dependencies):
+                ready.append(node)
+        if not ready:
+            return False
+
+        free = None
+        if self.headroom is not None and any(node.requirements for node in ready):
+            free = await asyncio.to_thread(self.headroom)
+            # Running steps may not have allocated yet, so count their reservations as used
+            for running_id in self._running:
+                for resource in RESOURCES:
+                    free[resource] = free.get(resource, 0.0) - self._nodes[running_id].requirements.get(resource, 0.0)
+
+        waiting = False
+        for node in ready:
+            if len(self._running) >= self.max_concurrent:
+                return True
+            if free is not None and self._running and not self._fits(node, free):
+                waiting = True
+                continue
+            if free is not None:
+                for resource in RESOURCES:
+                    free[resource] = free.get(resource, 0.0) - node.requirements.get(resource, 0.0)
+            self._start(node)
+        return waiting
+
+    @staticmethod
+    def _fits(node: PlanNode, free: Dict[str, float]) -> bool:
+        return all(node.requirements.get(resource, 0.0) <= free.get(resource, 0.0) for resource in RESOURCES)
+
+    def _failed(self, outcome: StepOutcome) -> bool:
+        return outcome.skipped or outcome.error is not None or self.is_failure(outcome.result)
+
+    def _skip(self, node_id: Hashable, reason: str):
+        logger.info(f"Step {node_id}: {reason}")
+        self.outcomes[node_id] = StepOutcome(node_id, error=reason, skipped=True)
+
+    def _start(self, node: PlanNode):
+        outcome = StepOutcome(node.node_id, started_at=time.monotonic())
+        self._running[node.node_id] = asyncio.create_task(self._run_step(node, outcome))
+
+    async def _run_step(self, node: PlanNode, outcome: StepOutcome):
+        try:
+            outcome.result = await self.execute(node)
+        except Exception as e:
+            logger.error(f"Step {node.node_id} raised: {e}")
+            outcome.error = str(e)
+        finally:
+            outcome.finished_at = time.monotonic()
+            self.outcomes[node.node_id] = outcome
+            del self._running[node.node_id]
+            self._changed.set()
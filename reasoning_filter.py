@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Reasoning Filter
+This module separates deepseek-r1's <think>...</think> reasoning from the answer, both for
+complete responses and incrementally for streams, so reasoning is not shown, spoken, stored
+or resent as context unless a caller asks for it.
+"""
+
+from typing import Callable, Iterable, Iterator, Optional
+
+OPEN_TAG = "<think>"
+CLOSE_TAG = "</think>"
+
+def _partial_suffix(text: str, tag: str) -> int:
+    """Length of the longest suffix of text that is a proper prefix of tag."""
+    for length in range(min(len(tag) - 1, len(text)), 0, -1):
+        if text.endswith(tag[:length]):
+            return length
+    return 0
+
+class ReasoningFilter:
+    """
+    Incremental filter that drops reasoning blocks from a stream of text.
+
+    Tags split across chunks are recognised: text that could be the start of a tag is held
+    back until the next chunk decides it.
+    """
+
+    def __init__(self, sink: Optional[Callable[[str], None]] = None,
+                 open_tag: str = OPEN_TAG, close_tag: str = CLOSE_TAG):
+        """
+        Initialize the filter.
+
+        Args:
+            sink (Optional[Callable[[str], None]], optional): Receives the reasoning text, e.g. a debug
+                                                              log. Defaults to None (discard it).
+            open_tag (str, optional): Tag that starts a reasoning block. Defaults to "<think>".
+            close_tag (str, optional): Tag that ends a reasoning block. Defaults to "</think>".
+        """
+        self.sink = sink
+        self.open_tag = open_tag
+        self.close_tag = close_tag
+        self.in_reasoning = False
+        self.reasoning_chars = 0
+        self._pending = ""
+        self._strip_leading = False
+
+    def feed(self, text: str) -> str:
+        """
+        Filter the next piece of the stream.
+
+        Args:
+            text (str): The next chunk.
+
+        Returns:
+            str: The visible text that can be released, possibly empty.
+        """
+        buffer = self._pending + text
+        visible = []
+        while buffer:
+            tag = self.close_tag if self.in_reasoning else self.open_tag
+            index = buffer.find(tag)
+            if index < 0:
+                keep = _partial_suffix(buffer, tag)
+                self._emit(buffer[:len(buffer) - keep], visible)
+                buffer = buffer[len(buffer) - keep:]
+                break
+            self._emit(buffer[:index], visible)
+            buffer = buffer[index + len(tag):]
+            self.in_reasoning = not self.in_reasoning
+            # The answer usually follows the closing tag after a blank line
+            self._strip_leading = not self.in_reasoning
+        self._pending = buffer
+        return "".join(visible)
+
+    def close(self) -> str:
+        """
+        Release any text held back at the end of the stream.
+
+        Returns:
+            str: The remaining visible text, possibly empty.
+        """
+        pending, self._pending = self._pending, ""
+        visible = []
+        self._emit(pending, visible)
+        return "".join(visible)
+
+    def _emit(self, text: str, visible: list):
+        """Route text to the sink or to the visible output."""
+        if not text:
+            return
+        if self.in_reasoning:
+            self.reasoning_chars += len(text)
+            if self.sink is not None:
+                self.sink(text)
+            return
+        if self._strip_leading:
+            text = text.lstrip()
+            if not text:
+                return
+            self._strip_leading = False
+        visible.append(text)
+
+def strip_reasoning(text: str, sink: Optional[Callable[[str], None]] = None) -> str:
+    """
+    Remove reasoning blocks from a complete response.
+
+    Args:
+        text (str): The response text.
+        sink (Optional[Callable[[str], None]], optional): Receives the reasoning text. Defaults to None.
+
+    Returns:
+        str: The answer without reasoning.
+    """
+    if OPEN_TAG not in text:
+        return text
+    reasoning = ReasoningFilter(sink)
+    return reasoning.feed(text) + reasoning.close()
+
+def filter_reasoning(chunks: Iterable[str], sink: Optional[Callable[[str], None]] = None) -> Iterator[str]:
+    """
+    Remove reasoning blocks from a stream of text.
+
+    Args:
+        chunks (Iterable[str]): The streamed text.
+        sink (Optional[Callable[[str], None]], optional): Receives the reasoning text. Defaults to None.
+
+    Yields:
+        str: Each non-empty piece of visible text.
+    """
+    reasoning = ReasoningFilter(sink)
+    for chunk in chunks:
+        text = reasoning.feed(chunk)
+        if text:
+            yield text
+    text = reasoning.close()
+    if text:
+        yield text
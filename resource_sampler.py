@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Background Resource Sampler
+This module samples CPU, RAM and any extra readings (VRAM, temperature) on a daemon thread at
+a fixed rate, so callers read a recent snapshot instantly instead of blocking on
+psutil.cpu_percent(interval=1) inside async code.
+"""
+
+import time
+import logging
+import threading
+from typing import Callable, Dict, Optional
+
+import psutil
+
+logger = logging.getLogger("ResourceSampler")
+
+class ResourceSampler:
+    """
+    Keeps a fresh snapshot of system resource usage.
+
+    CPU usage in a snapshot is the average over the time since the previous sample, which
+    at the default rate matches what psutil.cpu_percent(interval=1) used to report.
+    """
+
+    def __init__(self, interval: float = 1.0, readers: Optional[Dict[str, Callable[[], float]]] = None):
+        """
+        Initialize the sampler.
+
+        Args:
+            interval (float, optional): Seconds between samples. Defaults to 1.0.
+            readers (Optional[Dict[str, Callable[[], float]]], optional): Extra readings to sample, by
+                snapshot key (e.g. "vram_used_gb"). A reader that raises keeps its previous value.
+                Defaults to None.
+        """
+        self.interval = interval
+        self.readers = dict(readers or {})
+        self.cpu_count = psutil.cpu_count() or 1
+        self._snapshot: Optional[Dict[str, float]] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """
+        Take a first sample and start sampling in the background.
+        """
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            # A short blocking reading for the first snapshot also starts the interval the
+            # next background reading covers
+            self._snapshot = self._sample(cpu_percent=psutil.cpu_percent(interval=0.1))
+            self._thread = threading.Thread(target=self._run, name="ResourceSampler", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """
+        Stop the background thread.
+        """
+        self._stop.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout=self.interval + 1)
+        self._thread = None
+
+    def snapshot(self) -> Dict[str, float]:
+        """
+        Get the latest sample.
+
+        Returns:
+            Dict[str, float]: cpu_percent, ram_percent, ram_used_gb, one entry per reader, and
+                              sampled_at (time.time() of the sample). Starts the sampler if needed.
+        """
+        snapshot = self._snapshot
+        if snapshot is None:
+            self.start()
+            snapshot = self._snapshot
+        return dict(snapshot)
+
+    def age(self) -> float:
+        """
+        Get the age of the latest sample.
+
+        Returns:
+            float: Seconds since the latest sample, or infinity if nothing was sampled yet.
+        """
+        snapshot = self._snapshot
+        return time.time() - snapshot["sampled_at"] if snapshot else float("inf")
+
+    def _sample(self, cpu_percent: Optional[float] = None) -> Dict[str, float]:
+        """Read every resource once."""
+        memory = psutil.virtual_memory()
+        previous = self._snapshot or {}
+        snapshot = {
+            "cpu_percent": psutil.cpu_percent(interval=None) if cpu_percent is None else cpu_percent,
+            "ram_percent": memory.percent,
+            "ram_used_gb": memory.used / (1024**3),
+        }
+        for key, reader in self.readers.items():
+            try:
+                snapshot[key] = reader()
+            except Exception as e:
+                logger.debug(f"Reading {key} failed: {e}")
+                snapshot[key] = previous.get(key, 0.0)
+        snapshot["sampled_at"] = time.time()
+        return snapshot
+
+    def _run(self):
+        """Sample until stopped."""
+        while not self._stop.wait(self.interval):
+            try:
+                self._snapshot = self._sample()
+            except Exception as e:
+                logger.error(f"Resource sampling failed: {e}")
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Single-Flight Request Coalescing
+This module lets concurrent identical LLM requests share one in-flight generation: callers
+that arrive while a request is running wait for its result, and streaming subscribers
+replay the chunks produced so far and then follow the live stream.
+"""
+
+import json
+import hashlib
+import threading
+from typing import Any, Callable, Dict, Generator, Hashable, Iterator, Optional
+
+def request_key(url: str, data: Dict[str, Any], session: Optional[Hashable] = None) -> str:
+    """
+    Build the key identifying a request to Ollama.
+
+    Args:
+        url (str): The endpoint the request is sent to.
+        data (Dict[str, Any]): The request body.
+        session (Optional[Hashable], optional): Scheduler session the request belongs to. Requests of
+            a session only coalesce with each other, so superseding one never cancels a generation
+            another caller is waiting on. Defaults to None.
+
+    Returns:
+        str: A stable hex digest of the endpoint, body and session.
+    """
+    request = {"url": url, "data": data}
+    if session is not None:
+        request["session"] = repr(session)
+    payload = json.dumps(request, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+_MISSING = object()
+
+class _Call:
+    """A blocking call shared by every caller with the same key."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class _Stream:
+    """A streaming call whose chunks are buffered for every subscriber."""
+
+    def __init__(self, factory: Callable[[], Iterator[str]]):
+        self.condition = threading.Condition()
+        self.factory = factory
+        self.iterator = None
+        self.chunks = []
+        # Absolute index of chunks[0]; chunks before it were read by every subscriber and dropped
+        self.base = 0
+        # Absolute index of the next chunk for each subscriber
+        self.positions = {}
+        self.pulling = False
+        self.finished = False
+        self.error = None
+
+class SingleFlight:
+    """
+    Coalesce concurrent identical requests into one execution.
+    """
+
+    def __init__(self, max_buffered: int = 256):
+        """
+        Initialize the single-flight group.
+
+        Args:
+            max_buffered (int, optional): Most chunks a stream holds for its subscribers. The stream is
+                                          not read further while its slowest subscriber is this far
+                                          behind. Defaults to 256.
+        """
+        self.max_buffered = max_buffered
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._streams = {}
+        self.stats = {"executed": 0, "coalesced": 0, "streams_started": 0, "streams_joined": 0}
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        """
+        Run fn once for all concurrent callers with the same key.
+
+        Args:
+            key (str): Identifies the request, e.g. from request_key().
+            fn (Callable[[], Any]): Performs the request.
+
+        Returns:
+            Any: The value returned by fn, shared by every caller.
+
+        Raises:
+            Exception: Whatever fn raised, re-raised in every caller.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.stats["executed"] += 1
+            else:
+                self.stats["coalesced"] += 1
+
+        if leader:
+            try:
+                call.result = fn()
+            except Exception as e:
+                call.error = e
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+        else:
+            call.done.wait()
+
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def stream(self, key: str, factory: Callable[[], Iterator[str]]) -> Generator[str, None, None]:
+        """
+        Subscribe to the stream for key, starting it if nothing is in flight.
+
+        There is no reader thread: a subscriber that needs a chunk nobody has read yet pulls it
+        from the underlying iterator on behalf of all of them, so the stream is only read as fast
+        as it is consumed. A subscriber may run up to max_buffered chunks ahead of the slowest one.
+        Late subscribers replay the chunks produced so far; once chunks have been dropped to stay
+        within max_buffered, an identical request starts a stream of its own instead. The underlying
+        iterator is closed as soon as the last subscriber goes away.
+
+        Args:
+            key (str): Identifies the request, e.g. from request_key().
+            factory (Callable[[], Iterator[str]]): Creates the underlying chunk iterator.
+
+        Yields:
+            str: Every chunk of the stream, starting from the first one.
+
+        Raises:
+            Exception: Whatever the underlying iterator raised.
+        """
+        subscriber = object()
+        with self._lock:
+            flight = self._streams.get(key)
+            joined = False
+            if flight is not None:
+                with flight.condition:
+                    if flight.base == 0:
+                        flight.positions[subscriber] = 0
+                        joined = True
+            if joined:
+                self.stats["streams_joined"] += 1
+            else:
+                flight = self._streams[key] = _Stream(factory)
+                flight.positions[subscriber] = 0
+                self.stats["streams_started"] += 1
+
+        try:
+            while True:
+                with flight.condition:
+                    while True:
+                        position = flight.positions[subscriber]
+                        if position < flight.base + len(flight.chunks):
+                            chunk = flight.chunks[position - flight.base]
+                            flight.positions[subscriber] = position + 1
+                            # The slowest subscriber may have moved, making room for the next chunk
+                            flight.condition.notify_all()
+                            pull = False
+                            break
+                        if flight.finished:
+                            chunk = None
+                            pull = False
+                            break
+                        if not flight.pulling and self._has_room(flight):
+                            flight.pulling = True
+                            pull = True
+                            break
+                        flight.condition.wait()
+                if pull:
+                    self._pull(key, flight)
+                    continue
+                if chunk is None:
+                    break
+                yield chunk
+            if flight.error is not None:
+                raise flight.error
+        finally:
+            self._leave(key, flight, subscriber)
+
+    def _has_room(self, flight: _Stream) -> bool:
+        """Drop chunks every subscriber has read once the buffer is full; called with the condition held."""
+        if len(flight.chunks) < self.max_buffered:
+            return True
+        consumed = min(flight.positions.values()) - flight.base
+        if consumed > 0:
+            del flight.chunks[:consumed]
+            flight.base += consumed
+        return len(flight.chunks) < self.max_buffered
+
+    def _pull(self, key: str, flight: _Stream):
+        """Read the next chunk of the underlying iterator into the shared buffer."""
+        chunk = _MISSING
+        try:
+            if flight.iterator is None:
+                flight.iterator = iter(flight.factory())
+            chunk = next(flight.iterator)
+        except StopIteration:
+            self._finish(key, flight)
+        except Exception as e:
+            self._finish(key, flight, e)
+        finally:
+            with flight.condition:
+                flight.pulling = False
+                if chunk is not _MISSING:
+                    flight.chunks.append(chunk)
+                flight.condition.notify_all()
+
+    def _finish(self, key: str, flight: _Stream, error: Exception = None):
+        """Mark the stream as ended and close the underlying iterator."""
+        with self._lock:
+            finishing = self._end(key, flight, error)
+        if finishing:
+            self._close(flight)
+
+    def _leave(self, key: str, flight: _Stream, subscriber: object):
+        """Unsubscribe, closing the stream at once if nobody else is reading it."""
+        with self._lock:
+            with flight.condition:
+                del flight.positions[subscriber]
+                flight.condition.notify_all()
+                if flight.positions:
+                    return
+            # Ended under the same lock as joins, so nobody can join a stream that is being closed
+            finishing = self._end(key, flight)
+        if finishing:
+            self._close(flight)
+
+    def _end(self, key: str, flight: _Stream, error: Exception = None) -> bool:
+        """Stop new subscribers from joining and wake the current ones; called with the lock held."""
+        if self._streams.get(key) is flight:
+            del self._streams[key]
+        with flight.condition:
+            if flight.finished:
+                return False
+            flight.error = error
+            flight.finished = True
+            flight.condition.notify_all()
+        return True
+
+    def _close(self, flight: _Stream):
+        """Close the underlying iterator, e.g. to release the HTTP response and scheduler slot."""
+        close = getattr(flight.iterator, "close", None)
+        if close is not None:
+            close()
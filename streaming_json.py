@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+Streaming JSON Extraction
+This module finds the first complete top-level JSON object in streamed model output, so a
+caller can stop the generation as soon as the object closes instead of paying for the prose
+the model keeps writing after it. It can also hand out the items of one of the object's
+arrays as each item closes, so a caller can act on them while the rest is still generated.
+"""
+
+import json
+from typing import Any, AsyncIterator, Dict, Iterable, Iterator, List, Optional, Tuple
+
+class IncompleteJSONError(ValueError):
+    """The stream ended before the JSON object being read was complete"""
+
+class JSONObjectScanner:
+    """
+    Incremental scanner for the first JSON object in a stream of text.
+
+    Braces inside strings are ignored, and a brace-delimited span that turns out not to be
+    valid JSON (e.g. "{name}" in prose) is skipped so scanning resumes after its opening brace.
+    """
+
+    def __init__(self):
+        """
+        Initialize the scanner.
+        """
+        self.value = None
+        self._reset()
+
+    def _reset(self):
+        """Forget the object being scanned."""
+        self._buffer = []
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+
+    def feed(self, text: str) -> Optional[Dict[str, Any]]:
+        """
+        Scan the next piece of the stream.
+
+        Args:
+            text (str): The next chunk.
+
+        Returns:
+            Optional[Dict[str, Any]]: The object once it is complete, otherwise None.
+        """
+        while text and self.value is None:
+            text = self._scan(text)
+        return self.value
+
+    def _scan(self, text: str) -> str:
+        """Scan text; return text that still has to be scanned after a false start."""
+        for index, char in enumerate(text):
+            if not self._buffer:
+                if char == "{":
+                    self._buffer.append(char)
+                    self._depth = 1
+                continue
+
+            self._buffer.append(char)
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    candidate, rest = "".join(self._buffer), text[index + 1:]
+                    self._reset()
+                    value, ok = _parse_object(candidate)
+                    if ok:
+                        self.value = value
+                        return ""
+                    # Not JSON after all; look again from just past its opening brace
+                    return candidate[1:] + rest
+        return ""
+
+class JSONArrayItemScanner:
+    """
+    Incremental scanner for the items of one array in the first JSON object of a stream.
+
+    Object items of the array stored under the given top-level key are returned as soon as
+    each one closes. A brace-delimited span that turns out not to be valid JSON is skipped.
+    """
+
+    def __init__(self, key: str):
+        """
+        Initialize the scanner.
+
+        Args:
+            key (str): The top-level key of the array whose items are wanted.
+        """
+        self.key = key
+        self.value = None
+        self._reset()
+
+    def _reset(self):
+        """Forget the object being scanned."""
+        self._buffer = []
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string = []
+        self._last_string = None
+        self._current_key = None
+        self._in_array = False
+        self._item = []
+
+    def feed(self, text: str) -> List[Any]:
+        """
+        Scan the next piece of the stream.
+
+        Args:
+            text (str): The next chunk.
+
+        Returns:
+            List[Any]: The array items completed by this chunk.
+        """
+        items = []
+        for char in text:
+            if self.value is not None:
+                break
+            self._scan(char, items)
+        return items
+
+    def _scan(self, char: str, items: List[Any]):
+        """Advance the state machine by one character."""
+        if self._depth == 0 and char != "{":
+            return
+        self._buffer.append(char)
+        if self._item:
+            self._item.append(char)
+
+        if self._in_string:
+            if self._escape:
+                self._escape = False
+            elif char == "\\":
+                self._escape = True
+            elif char == '"':
+                self._in_string = False
+                if self._depth == 1:
+                    self._last_string = "".join(self._string)
+            elif self._depth == 1:
+                self._string.append(char)
+        elif char == '"':
+            self._in_string = True
+            self._string = []
+        elif char in "{[":
+            self._depth += 1
+            if self._depth == 2 and char == "[" and self._current_key == self.key:
+                self._in_array = True
+            elif self._depth == 3 and self._in_array and char == "{" and not self._item:
+                self._item = [char]
+        elif char in "}]":
+            self._depth -= 1
+            if self._depth == 2 and self._item:
+                value, ok = _parse_object("".join(self._item))
+                if ok:
+                    items.append(value)
+                self._item = []
+            elif self._depth == 1:
+                self._in_array = False
+            elif self._depth == 0:
+                value, ok = _parse_object("".join(self._buffer))
+                if ok:
+                    self.value = value
+                self._reset()
+        elif self._depth == 1:
+            if char == ":":
+                self._current_key = self._last_string
+            elif char == ",":
+                self._current_key = None
+
+def _parse_object(text: str) -> Tuple[Optional[Dict[str, Any]], bool]:
+    """Parse text as a JSON object, reporting whether it was one."""
+    try:
+        value = json.loads(text)
+    except ValueError:
+        return None, False
+    return value, isinstance(value, dict)
+
+def first_json_object(chunks: Iterable[str]) -> Optional[Dict[str, Any]]:
+    """
+    Read a text stream until its first JSON object is complete, then close the stream.
+
+    Args:
+        chunks (Iterable[str]): The streamed text. Generators are closed early, which for the
+                                LLM clients' streams closes the connection and stops generation.
+
+    Returns:
+        Optional[Dict[str, Any]]: The object, or None if the stream ended without one.
+    """
+    scanner = JSONObjectScanner()
+    try:
+        for chunk in chunks:
+            if scanner.feed(chunk) is not None:
+                break
+    finally:
+        close = getattr(chunks, "close", None)
+        if close is not None:
+            close()
+    return scanner.value
+
+async def afirst_json_object(chunks: AsyncIterator[str]) -> Optional[Dict[str, Any]]:
+    """
+    Async version of first_json_object.
+
+    Args:
+        chunks (AsyncIterator[str]): The streamed text. Async generators are closed early.
+
+    Returns:
+        Optional[Dict[str, Any]]: The object, or None if the stream ended without one.
+    """
+    scanner = JSONObjectScanner()
+    try:
+        async for chunk in chunks:
+            if scanner.feed(chunk) is not None:
+                break
+    finally:
+        aclose = getattr(chunks, "aclose", None)
+        if aclose is not None:
+            await aclose()
+    return scanner.value
+
+def iter_json_array(chunks: Iterable[str], key: str) -> Iterator[Any]:
+    """
+    Yield the items of an array in the first JSON object of a text stream as each one
+    completes, then close the stream once the object is complete.
+
+    Args:
+        chunks (Iterable[str]): The streamed text. Generators are closed early.
+        key (str): The top-level key of the array.
+
+    Yields:
+        Any: Each object item of the array.
+
+    Raises:
+        IncompleteJSONError: If the stream ended before the object was complete, so the items
+                             yielded may not be all of them.
+    """
+    scanner = JSONArrayItemScanner(key)
+    try:
+        for chunk in chunks:
+            yield from scanner.feed(chunk)
+            if scanner.value is not None:
+                break
+    finally:
+        close = getattr(chunks, "close", None)
+        if close is not None:
+            close()
+    if scanner.value is None:
+        raise IncompleteJSONError(f"Stream ended before the object holding '{key}' was complete")
+
+async def aiter_json_array(chunks: AsyncIterator[str], key: str) -> AsyncIterator[Any]:
+    """
+    Async version of iter_json_array.
+
+    Args:
+        chunks (AsyncIterator[str]): The streamed text. Async generators are closed early.
+        key (str): The top-level key of the array.
+
+    Yields:
+        Any: Each object item of the array.
+
+    Raises:
+        IncompleteJSONError: If the stream ended before the object was complete.
+    """
+    scanner = JSONArrayItemScanner(key)
+    try:
+        async for chunk in chunks:
+            for item in scanner.feed(chunk):
+                yield item
+            if scanner.value is not None:
+                break
+    finally:
+        aclose = getattr(chunks, "aclose", None)
+        if aclose is not None:
+            await aclose()
+    if scanner.value is None:
+        raise IncompleteJSONError(f"Stream ended before the object holding '{key}' was complete")
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Result Synthesis Policy
+This module decides how executed plan results are turned into the reply. Trivial outcomes
+(a single successful step) are answered with a deterministic template, while multi-step or
+failed plans are summarised by DeepSeek R1 from a compact results digest. LLM synthesis is
+streamed sentence by sentence, so the first sentence reaches the user while the rest is
+still being generated.
+"""
+
+import re
+import time
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+
+logger = logging.getLogger("SynthesisPolicy")
+
+TEMPLATE = "template"
+LLM = "llm"
+
+SYSTEM_PROMPT = "You are JARVIS. Provide clear, conversational responses about task results."
+
+# A sentence ends at ., ! or ? (plus any closing quotes or brackets) followed by whitespace,
+# or at a line break
+_SENTENCE_END = re.compile(r"[.!?][\"')\]]*\s+|\n+")
+
+@dataclass
+class StepDigest:
+    """The parts of an executed step that synthesis needs"""
+    description: str
+    success: bool
+    output: str = ""
+    error: Optional[str] = None
+
+async def aiter_sentences(chunks: AsyncIterator[str]) -> AsyncIterator[str]:
+    """
+    Regroup streamed text into sentences.
+
+    Args:
+        chunks (AsyncIterator[str]): Text chunks as they are generated.
+
+    Yields:
+        str: Each sentence with the whitespace that follows it, so joining them reproduces the text.
+    """
+    buffer = ""
+    async for chunk in chunks:
+        buffer += chunk
+        end = 0
+        for match in _SENTENCE_END.finditer(buffer):
+            # Whitespace at the very end may continue in the next chunk
+            if match.end() == len(buffer):
+                break
+            yield buffer[end:match.end()]
+            end = match.end()
+        buffer = buffer[end:]
+    if buffer:
+        yield buffer
+
+class SynthesisPolicy:
+    """
+    Chooses between template and LLM synthesis and keeps statistics on both.
+    """
+
+    def __init__(self, max_template_output: int = 500, max_digest_output: int = 200):
+        """
+        Initialize the policy.
+
+        Args:
+            max_template_output (int, optional): Longest step output that is returned verbatim by a
+                                                 template; longer outputs are summarised. Defaults to 500.
+            max_digest_output (int, optional): Characters of each step's output and error included in the
+                                               LLM digest. Defaults to 200.
+        """
+        self.max_template_output = max_template_output
+        self.max_digest_output = max_digest_output
+        self._lock = threading.Lock()
+        self._counters = {TEMPLATE: 0, LLM: 0, "fallbacks": 0}
+        self._first_sentence_times: List[float] = []
+
+    def choose(self, steps: List[StepDigest]) -> str:
+        """
+        Decide how to synthesize a set of results.
+
+        Args:
+            steps (List[StepDigest]): The executed steps in plan order.
+
+        Returns:
+            str: TEMPLATE for an empty plan or a single successful step with short output, otherwise LLM.
+        """
+        if not steps:
+            return TEMPLATE
+        if len(steps) == 1 and steps[0].success and len(steps[0].output.strip()) <= self.max_template_output:
+            return TEMPLATE
+        return LLM
+
+    def template(self, steps: List[StepDigest]) -> str:
+        """
+        Build the deterministic response for a trivial outcome.
+
+        Args:
+            steps (List[StepDigest]): The executed steps, as accepted by choose().
+
+        Returns:
+            str: The response.
+        """
+        if not steps:
+            return "There was nothing to do for that request."
+        step = steps[0]
+        response = f"Done: {step.description.strip().rstrip('.')}."
+        output = step.output.strip()
+        if output:
+            response += f"\n{output}"
+        return response
+
+    def digest(self, steps: List[StepDigest]) -> str:
+        """
+        Summarise the results in one line per step.
+
+        Args:
+            steps (List[StepDigest]): The executed steps in plan order.
+
+        Returns:
+            str: Numbered lines with each step's status, description and truncated output or error.
+        """
+        lines = []
+        for index, step in enumerate(steps, 1):
+            line = f"{index}. [{'ok' if step.success else 'failed'}] {step.description.strip()}"
+            output = " ".join(step.output.split())[:self.max_digest_output]
+            if output:
+                line += f" | output: {output}"
+            if step.error:
+                line += f" | error: {' '.join(step.error.split())[:self.max_digest_output]}"
+            lines.append(line)
+        return "\n".join(lines)
+
+    def messages(self, user_input: str, steps: List[StepDigest]) -> List[Dict[str, str]]:
+        """
+        Build the DeepSeek R1 synthesis request.
+
+        Args:
+            user_input (str): The user's request.
+            steps (List[StepDigest]): The executed steps in plan order.
+
+        Returns:
+            List[Dict[str, str]]: The chat messages.
+        """
+        succeeded = sum(1 for step in steps if step.success)
+        prompt = f"""User request: {user_input}
+
+Results ({succeeded}/{len(steps)} steps succeeded):
+{self.digest(steps)}
+
+Reply in a few sentences: confirm what was accomplished, mention important outputs or files,
+note any failures and suggest next steps if useful. Start with the most important point."""
+        return [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ]
+
+    async def synthesize(self, user_input: str, steps: List[StepDigest],
+                         stream: Callable[[List[Dict[str, str]]], AsyncIterator[str]],
+                         on_sentence: Optional[Callable[[str], Any]] = None) -> str:
+        """
+        Produce the response for a set of results.
+
+        Args:
+            user_input (str): The user's request.
+            steps (List[StepDigest]): The executed steps in plan order.
+            stream (Callable[[List[Dict[str, str]]], AsyncIterator[str]]): Streams a chat response for the
+                given messages; only called when LLM synthesis is needed.
+            on_sentence (Optional[Callable[[str], Any]], optional): Receives the response as it becomes
+                available, one sentence at a time for LLM synthesis. Defaults to None.
+
+        Returns:
+            str: The full response.
+
+        Raises:
+            Exception: Whatever the stream raised before producing any text.
+        """
+        mode = self.choose(steps)
+        if mode == TEMPLATE:
+            response = self.template(steps)
+            with self._lock:
+                self._counters[TEMPLATE] += 1
+            if on_sentence is not None:
+                on_sentence(response)
+            return response
+
+        start = time.monotonic()
+        sentences = []
+        try:
+            async for sentence in aiter_sentences(stream(self.messages(user_input, steps))):
+                if not sentences:
+                    first_sentence_time = time.monotonic() - start
+                    logger.info(f"First synthesis sentence after {first_sentence_time:.2f}s")
+                    with self._lock:
+                        self._first_sentence_times = (self._first_sentence_times + [first_sentence_time])[-1000:]
+                sentences.append(sentence)
+                if on_sentence is not None:
+                    on_sentence(sentence)
+        except Exception as e:
+            # Text already shown to the user is kept rather than replaced by a fallback
+            if not sentences:
+                raise
+            logger.error(f"Synthesis stream ended early: {e}")
+        with self._lock:
+            self._counters[LLM] += 1
+        return "".join(sentences).strip()
+
+    def fallback(self, steps: List[StepDigest]) -> str:
+        """
+        Build the response used when LLM synthesis fails.
+
+        Args:
+            steps (List[StepDigest]): The executed steps in plan order.
+
+        Returns:
+            str: A one-line success count.
+        """
+        with self._lock:
+            self._counters["fallbacks"] += 1
+        successful = sum(1 for step in steps if step.success)
+        return f"Task completed. {successful}/{len(steps)} steps executed successfully."
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get the synthesis counters.
+
+        Returns:
+            Dict[str, Any]: Template, LLM and fallback counts and the average time to the first LLM sentence.
+        """
+        with self._lock:
+            stats = dict(self._counters)
+            times = list(self._first_sentence_times)
+        stats["avg_first_sentence"] = sum(times) / len(times) if times else None
+        return stats
+
+    def report(self) -> str:
+        """
+        Summarise synthesis in one line.
+
+        Returns:
+            str: Template and LLM counts and the average time to the first LLM sentence.
+        """
+        stats = self.stats()
+        first = (f", first sentence after {stats['avg_first_sentence']:.1f}s avg"
+                 if stats["avg_first_sentence"] is not None else "")
+        return f"Synthesis: {stats[TEMPLATE]} templated, {stats[LLM]} by LLM{first}"